@@ -0,0 +1,141 @@
+"""Batch checks over many IFC models.
+
+A sweep over hundreds of revisions is throughput-bound, so models, not
+checks, are the unit of parallelism: a pool of worker processes each takes
+one model at a time, ingests it into its own temp dir and runs every check
+serially in-process. The pool is forked after the check registry is built,
+so every worker starts with the checkers already imported. Results are
+yielded per model as they finish, followed by a throughput summary.
+
+Like parallel.py, at most `workers` models are in flight so each has a known
+start time; one exceeding the per-model timeout is reported as an error and
+the pool is recycled, and models caught in a crashed pool are retried once.
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import uuid
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+from concurrent.futures import ProcessPoolExecutor
+
+import ingest
+import model_cache
+from orchestrator import discover_checks, run_all_checks
+from parallel import CANCEL_POLL_SECONDS, _kill_pool, _mp_context, _pool_state, _prepare_fork
+
+logger = logging.getLogger("ifcore")
+
+BATCH_WORKERS = int(os.environ.get("IFCORE_BATCH_WORKERS", "0")) or os.cpu_count() or 1
+BATCH_MODEL_TIMEOUT = float(os.environ.get("IFCORE_BATCH_MODEL_TIMEOUT", "1800"))
+MAX_BATCH = int(os.environ.get("IFCORE_MAX_BATCH", "500"))
+
+
+def _init_worker():
+    # Each worker sees a model once; caching parsed models would only hold memory
+    model_cache.set_budget(0)
+    discover_checks()
+
+
+def _check_model(source, job_id, project_id):
+    """Worker: ingest one source and run every check on it."""
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "model.ifc")
+        if source.get("ifc_b64"):
+            model_key = ingest.write_b64(source["ifc_b64"], path)
+        else:
+            model_key = ingest.download(source["ifc_url"], path)
+        results = run_all_checks(path, job_id, project_id, workers=0, model_key=model_key)
+    results["elapsed_s"] = round(time.perf_counter() - started, 3)
+    return results
+
+
+def _new_pool(workers):
+    return ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context(), initializer=_init_worker)
+
+
+async def run_batch(sources, project_id=None, workers=None, timeout=BATCH_MODEL_TIMEOUT):
+    """Check every source; yields one event per model as it finishes, then a summary.
+
+    `sources` are dicts with `ifc_url` or `ifc_b64` and an optional `name`.
+    Model events carry the model's job_id, status and check/element results
+    (a ResultBuffer); the summary carries counts and throughput.
+    """
+    batch_id = str(uuid.uuid4())
+    workers = max(1, min(workers or BATCH_WORKERS, len(sources)))
+    await asyncio.to_thread(_prepare_fork)
+    logger.info(f"[batch {batch_id}] {len(sources)} models on {workers} workers")
+
+    started = time.perf_counter()
+    todo = deque(range(len(sources)))
+    running = {}  # asyncio future -> (index, started_at)
+    retried = set()
+    done_count = errors = elements = 0
+    pool = _new_pool(workers)
+
+    def event(i, status, **fields):
+        return {"type": "model", "index": i, "name": sources[i].get("name"),
+                "job_id": f"{batch_id}-{i}", "status": status, **fields}
+
+    try:
+        while todo or running:
+            while todo and len(running) < workers:
+                i = todo.popleft()
+                fut = pool.submit(_check_model, sources[i], f"{batch_id}-{i}", project_id)
+                running[asyncio.wrap_future(fut)] = (i, time.monotonic())
+
+            done, _ = await asyncio.wait(running, timeout=CANCEL_POLL_SECONDS,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            for fut in done:
+                i, _ = running.pop(fut)
+                try:
+                    results = fut.result()
+                except BrokenProcessPool as exc:
+                    if i not in retried:
+                        retried.add(i)
+                        todo.appendleft(i)
+                        continue
+                    errors += 1
+                    yield event(i, "error", error=f"worker crashed: {exc}"[:200])
+                except Exception as exc:
+                    errors += 1
+                    yield event(i, "error", error=str(exc)[:200])
+                else:
+                    done_count += 1
+                    elements += len(results["element_results"])
+                    yield event(i, "done", **results)
+
+            now = time.monotonic()
+            expired = [f for f, (_, t) in running.items() if now - t >= timeout]
+            for fut in expired:
+                i, _ = running.pop(fut)
+                fut.cancel()
+                errors += 1
+                logger.warning(f"[batch {batch_id}] model {i} timed out after {timeout:.0f}s")
+                yield event(i, "error", error=f"Timed out after {timeout:.0f}s")
+            if expired or _pool_state(pool)[1]:
+                todo.extendleft(reversed([i for i, _ in running.values()]))
+                for fut in running:
+                    fut.cancel()
+                running.clear()
+                _kill_pool(pool)
+                pool = _new_pool(workers)
+    finally:
+        # Also reached when the client disconnects mid-stream
+        for fut in running:
+            fut.cancel()
+        if running:
+            _kill_pool(pool)
+        else:
+            pool.shutdown(wait=False)
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"[batch {batch_id}] {done_count} done, {errors} errors in {elapsed:.1f}s")
+    yield {"type": "summary", "batch_id": batch_id, "models": len(sources), "done": done_count,
+           "errors": errors, "workers": workers, "elapsed_s": round(elapsed, 3),
+           "models_per_min": round(len(sources) / elapsed * 60, 2) if elapsed else None,
+           "elements": elements,
+           "elements_per_s": round(elements / elapsed, 1) if elapsed else None}
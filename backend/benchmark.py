@@ -0,0 +1,360 @@
+"""Benchmark harness for the orchestrator and the discovered checks.
+
+Generates synthetic IFC models of increasing size, then for each size runs
+every discovered `check_*` on its own and `run_all_checks` as a whole. The
+JSON report records model-open time, per-check wall/CPU time, peak RSS and
+result size. Compare a report against a saved baseline to catch regressions:
+
+    python benchmark.py run --sizes 1000,10000,100000 --out bench.json
+    python benchmark.py compare baseline.json bench.json --threshold 0.2
+    python benchmark.py run --baseline baseline.json   # run, then compare
+
+Each size is measured in a fresh interpreter so peak RSS is per model.
+Generated models are kept under IFCORE_CACHE_DIR/bench and reused.
+"""
+import argparse
+import contextlib
+import fnmatch
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCH_DIR = os.path.join(
+    os.environ.get("IFCORE_CACHE_DIR") or os.path.join(os.environ.get("TMPDIR", "/tmp"), "ifcore-cache"),
+    "bench")
+DEFAULT_SIZES = [1000, 10000, 100000]
+GENERATOR_VERSION = 2
+
+# Element mix of the synthetic models: (IFC class, share, pset, properties, qto, quantities)
+ELEMENT_MIX = [
+    ("IfcWall", 0.30, "Pset_WallCommon", {"IsExternal": True, "LoadBearing": True, "FireRating": "EI60"},
+     "Qto_WallBaseQuantities", {"Length": 4.0, "Height": 2.8, "Width": 0.2}),
+    ("IfcDoor", 0.10, "Pset_DoorCommon", {"IsExternal": False, "FireRating": "EI30", "HandicapAccessible": True},
+     "Qto_DoorBaseQuantities", {"Width": 0.9, "Height": 2.1}),
+    ("IfcWindow", 0.15, "Pset_WindowCommon", {"IsExternal": True, "ThermalTransmittance": 1.1},
+     "Qto_WindowBaseQuantities", {"Width": 1.2, "Height": 1.4}),
+    ("IfcSlab", 0.05, "Pset_SlabCommon", {"IsExternal": False, "LoadBearing": True},
+     "Qto_SlabBaseQuantities", {"Width": 0.25, "NetArea": 20.0}),
+    ("IfcColumn", 0.10, "Pset_ColumnCommon", {"LoadBearing": True},
+     "Qto_ColumnBaseQuantities", {"Length": 2.8}),
+    ("IfcBeam", 0.10, "Pset_BeamCommon", {"LoadBearing": True},
+     "Qto_BeamBaseQuantities", {"Length": 5.0}),
+    ("IfcSpace", 0.10, "Pset_SpaceCommon", {"IsExternal": False, "Reference": "Office"},
+     "Qto_SpaceBaseQuantities", {"NetFloorArea": 12.0, "Height": 2.8}),
+    ("IfcStair", 0.02, "Pset_StairCommon", {"NumberOfRiser": 16, "RiserHeight": 0.175},
+     "Qto_StairBaseQuantities", {"Length": 4.5}),
+    ("IfcRailing", 0.03, "Pset_RailingCommon", {"Height": 1.1},
+     "Qto_RailingBaseQuantities", {"Length": 3.0}),
+    ("IfcFurniture", 0.05, None, {}, None, {}),
+]
+ELEMENTS_PER_STOREY = 2000
+
+# Metrics compared against a baseline, with the noise floor below which a change is ignored
+COMPARED = {"open_s": 0.05, "total_s": 0.05, "duration_ms": 5.0, "peak_rss_kb": 20 * 1024,
+            "result_bytes": 1024}
+
+
+# ── synthetic models ──────────────────────────────────────────────────
+
+def model_path(n, geometry=True):
+    suffix = "" if geometry else "-nogeom"
+    return os.path.join(BENCH_DIR, f"synthetic-v{GENERATOR_VERSION}-{n}{suffix}.ifc")
+
+
+def generate_model(n, path, geometry=True):
+    """Write an IFC4 model with `n` building elements spread over storeys.
+
+    The spatial skeleton, units and contexts use ifcopenshell.api; the bulk
+    elements are created directly on the file, which is orders of magnitude
+    faster at 100k elements than one api call per relationship.
+    """
+    import ifcopenshell
+    import ifcopenshell.api
+    import ifcopenshell.guid
+
+    model = ifcopenshell.file(schema="IFC4")
+    api = ifcopenshell.api.run
+    project = api("root.create_entity", model, ifc_class="IfcProject", name="Benchmark")
+    api("unit.assign_unit", model)
+    ctx = api("context.add_context", model, context_type="Model")
+    body = api("context.add_context", model, context_type="Model", context_identifier="Body",
+               target_view="MODEL_VIEW", parent=ctx)
+    site = api("root.create_entity", model, ifc_class="IfcSite", name="Site")
+    building = api("root.create_entity", model, ifc_class="IfcBuilding", name="Building")
+    api("aggregate.assign_object", model, relating_object=project, products=[site])
+    api("aggregate.assign_object", model, relating_object=site, products=[building])
+
+    # One shared box representation per element class
+    shapes = {}
+    if geometry:
+        for ifc_class, *_ in ELEMENT_MIX:
+            rep = api("geometry.add_wall_representation", model, context=body,
+                      length=4.0, height=2.8, thickness=0.2)
+            shapes[ifc_class] = rep
+
+    counts = [(spec, max(1, round(n * spec[1]))) for spec in ELEMENT_MIX]
+    classes = [spec for spec, count in counts for _ in range(count)][:n]
+    classes += [ELEMENT_MIX[0]] * (n - len(classes))
+    random.Random(0).shuffle(classes)  # mixed storeys, same model on every run
+    n_storeys = max(1, -(-n // ELEMENTS_PER_STOREY))
+
+    def guid():
+        return ifcopenshell.guid.new()
+
+    def value(v):
+        if isinstance(v, bool):
+            return model.createIfcBoolean(v)
+        if isinstance(v, int):
+            return model.createIfcInteger(v)
+        if isinstance(v, float):
+            return model.createIfcReal(v)
+        return model.createIfcLabel(v)
+
+    for s in range(n_storeys):
+        storey = api("root.create_entity", model, ifc_class="IfcBuildingStorey", name=f"L{s:02d}")
+        storey.Elevation = s * 3000.0
+        storey.ObjectPlacement = model.createIfcLocalPlacement(None, model.createIfcAxis2Placement3D(
+            model.createIfcCartesianPoint((0.0, 0.0, s * 3000.0))))
+        api("aggregate.assign_object", model, relating_object=building, products=[storey])
+        contained, spaces = [], []
+        for i, (ifc_class, _, pset, props, qto, quantities) in enumerate(
+                classes[s * ELEMENTS_PER_STOREY:(s + 1) * ELEMENTS_PER_STOREY]):
+            point = model.createIfcCartesianPoint(((i % 50) * 5000.0, (i // 50) * 4000.0, 0.0))
+            placement = model.createIfcLocalPlacement(storey.ObjectPlacement,
+                                                      model.createIfcAxis2Placement3D(point))
+            shape = (model.createIfcProductDefinitionShape(None, None, [shapes[ifc_class]])
+                     if geometry else None)
+            element = model.create_entity(ifc_class, GlobalId=guid(), Name=f"{ifc_class[3:]}-{s}-{i}",
+                                          ObjectPlacement=placement, Representation=shape)
+            (spaces if ifc_class == "IfcSpace" else contained).append(element)
+            if pset:
+                single = [model.createIfcPropertySingleValue(k, None, value(v), None) for k, v in props.items()]
+                model.createIfcRelDefinesByProperties(guid(), None, None, None, [element],
+                                                      model.createIfcPropertySet(guid(), None, pset, None, single))
+            if qto:
+                qs = [model.createIfcQuantityLength(k, None, None, v) if k in ("Length", "Height", "Width")
+                      else model.createIfcQuantityArea(k, None, None, v) for k, v in quantities.items()]
+                model.createIfcRelDefinesByProperties(guid(), None, None, None, [element],
+                                                      model.createIfcElementQuantity(guid(), None, qto, None, None, qs))
+        if contained:
+            model.createIfcRelContainedInSpatialStructure(guid(), None, None, None, contained, storey)
+        if spaces:
+            model.createIfcRelAggregates(guid(), None, None, None, storey, spaces)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    model.write(tmp)
+    os.replace(tmp, path)
+
+
+def ensure_model(n, geometry=True):
+    path = model_path(n, geometry)
+    if not os.path.exists(path):
+        t0 = time.perf_counter()
+        generate_model(n, path, geometry)
+        print(f"[bench] generated {n} elements in {time.perf_counter() - t0:.1f}s -> {path}",
+              file=sys.stderr)
+    return path
+
+
+# ── measurement (runs in a child interpreter per size) ───────────────
+
+def _maxrss_kb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def measure(path, check_filter=None, workers=0):
+    """Open the model, run each check alone, then run_all_checks. Returns a dict."""
+    import ifcopenshell
+    import orchestrator
+
+    rss_start = _maxrss_kb()
+    t0 = time.perf_counter()
+    model = ifcopenshell.open(path)
+    open_s = time.perf_counter() - t0
+    open_rss_kb = _maxrss_kb() - rss_start
+
+    checks = [(team, name, func) for team, name, func in orchestrator.discover_checks()
+              if not check_filter or fnmatch.fnmatch(f"{team}/{name}", check_filter)]
+    per_check = {}
+    for team, name, func in checks:
+        kind, payload, stats = orchestrator.run_check(func, model)
+        per_check[f"{team}/{name}"] = {
+            "status": kind,
+            "elements": len(payload) if kind == "ok" else 0,
+            "result_bytes": len(json.dumps(payload, default=str)) if kind == "ok" else 0,
+            **stats,
+        }
+    del model
+
+    t0 = time.perf_counter()
+    results = orchestrator.run_all_checks(path, "bench", "bench", workers=workers)
+    total_s = time.perf_counter() - t0
+    elements = results["element_results"]
+    return {
+        "file_bytes": os.path.getsize(path),
+        "open_s": round(open_s, 4),
+        "open_rss_kb": open_rss_kb,
+        "checks": per_check,
+        "run_all": {
+            "total_s": round(total_s, 4),
+            "checks": len(results["check_results"]),
+            "elements": len(elements),
+            "result_bytes": len(json.dumps(elements.rows(), default=str)),
+            "columnar_bytes": len(json.dumps(elements.to_columns(), default=str)),
+        },
+        "peak_rss_kb": _maxrss_kb(),
+    }
+
+
+def run(sizes, check_filter=None, workers=0, geometry=True):
+    import ifcopenshell
+
+    report = {
+        "meta": {
+            "created_at": int(time.time()),
+            "python": platform.python_version(),
+            "ifcopenshell": ifcopenshell.version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "workers": workers,
+            "geometry": geometry,
+            "check_filter": check_filter,
+        },
+        "sizes": {},
+    }
+    for n in sizes:
+        path = ensure_model(n, geometry)
+        cmd = [sys.executable, os.path.abspath(__file__), "_measure", path, "--workers", str(workers)]
+        if check_filter:
+            cmd += ["--checks", check_filter]
+        # Memoized results would hide check time; the model cache is unused with no content key
+        env = {**os.environ, "IFCORE_RESULT_CACHE_MB": "0"}
+        proc = subprocess.run(cmd, cwd=BASE_DIR, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            report["sizes"][str(n)] = {"error": proc.stderr.strip()[-2000:]}
+            print(f"[bench] {n}: measurement failed (exit {proc.returncode})", file=sys.stderr)
+            continue
+        result = json.loads(proc.stdout)
+        report["sizes"][str(n)] = result
+        print(f"[bench] {n}: open {result['open_s']:.2f}s, run_all {result['run_all']['total_s']:.2f}s, "
+              f"peak RSS {result['peak_rss_kb'] // 1024} MB", file=sys.stderr)
+    return report
+
+
+# ── baseline comparison ──────────────────────────────────────────────
+
+def _flatten(report):
+    """{(size, metric path): value} for every compared metric in a report."""
+    flat = {}
+    for size, result in report.get("sizes", {}).items():
+        if "error" in result:
+            continue
+        flat[(size, "open_s")] = result["open_s"]
+        flat[(size, "peak_rss_kb")] = result["peak_rss_kb"]
+        flat[(size, "run_all.total_s")] = result["run_all"]["total_s"]
+        flat[(size, "run_all.result_bytes")] = result["run_all"]["result_bytes"]
+        for check, stats in result["checks"].items():
+            flat[(size, f"{check}.duration_ms")] = stats["duration_ms"]
+            flat[(size, f"{check}.result_bytes")] = stats["result_bytes"]
+    return flat
+
+
+def compare(baseline, current, threshold=0.2):
+    """Metrics that grew by more than `threshold` (and past the noise floor).
+
+    A size that errored or is missing in `current` counts as a regression too,
+    so a crashed or OOM-killed run never passes as "no regressions".
+    """
+    base, cur = _flatten(baseline), _flatten(current)
+    regressions = []
+    for size, before in sorted(baseline.get("sizes", {}).items(), key=lambda item: int(item[0])):
+        result = current.get("sizes", {}).get(size)
+        if result is None or "error" in result:
+            error = result["error"].splitlines()[-1] if result and result["error"] else "missing"
+            regressions.append({"size": size, "metric": "measurement",
+                                "baseline": "failed" if "error" in before else "ok",
+                                "current": "failed", "change": None, "error": error[:200]})
+    for key in sorted(base.keys() & cur.keys()):
+        old, new = base[key], cur[key]
+        floor = COMPARED[key[1].rsplit(".", 1)[-1]]
+        if new - old > floor and new > old * (1 + threshold):
+            regressions.append({"size": key[0], "metric": key[1], "baseline": old, "current": new,
+                                "change": round(new / old - 1, 3) if old else None})
+    return regressions
+
+
+def _print_regressions(regressions, threshold):
+    if not regressions:
+        print(f"no regressions above {threshold:.0%}")
+        return
+    print(f"{len(regressions)} regression(s) above {threshold:.0%}:")
+    for r in regressions:
+        if "error" in r:
+            print(f"  {r['size']:>7}  {r['metric']:<50} failed: {r['error']}")
+            continue
+        change = f"+{r['change']:.0%}" if r["change"] is not None else "new"
+        print(f"  {r['size']:>7}  {r['metric']:<50} {r['baseline']} -> {r['current']} ({change})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_p = sub.add_parser("run", help="generate models and measure")
+    run_p.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)))
+    run_p.add_argument("--checks", help="fnmatch pattern on team/check_name")
+    run_p.add_argument("--workers", type=int, default=0, help="process pool size for run_all_checks")
+    run_p.add_argument("--no-geometry", action="store_true", help="models without shape representations")
+    run_p.add_argument("--out", default="bench.json")
+    run_p.add_argument("--baseline", help="compare against this report after running")
+    run_p.add_argument("--threshold", type=float, default=0.2)
+
+    cmp_p = sub.add_parser("compare", help="diff a report against a baseline")
+    cmp_p.add_argument("baseline")
+    cmp_p.add_argument("current")
+    cmp_p.add_argument("--threshold", type=float, default=0.2)
+
+    measure_p = sub.add_parser("_measure")
+    measure_p.add_argument("path")
+    measure_p.add_argument("--checks")
+    measure_p.add_argument("--workers", type=int, default=0)
+
+    args = parser.parse_args(argv)
+    if args.command == "_measure":
+        sys.path.insert(0, BASE_DIR)
+        with contextlib.redirect_stdout(sys.stderr):  # checks may print; stdout carries the result
+            result = measure(args.path, args.checks, args.workers)
+        print(json.dumps(result))
+        return 0
+
+    if args.command == "run":
+        sizes = [int(s) for s in args.sizes.split(",") if s]
+        current = run(sizes, args.checks, args.workers, not args.no_geometry)
+        with open(args.out, "w") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+        print(f"report written to {args.out}")
+        if not args.baseline:
+            return 0
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+
+    regressions = compare(baseline, current, args.threshold)
+    _print_regressions(regressions, args.threshold)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Response cache and request coalescing for the compliance chat.
+
+Users ask the same few questions ("what fails?", "summarize") about the
+same job, and each answer is a full model round trip. Answers are cached
+per (results fingerprint, normalized message) in an LRU with a TTL, and
+identical questions that arrive while the first is still running wait for
+that one model call instead of starting their own. The deterministic tool
+outputs are memoized the same way so a cache miss still skips them.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+CHAT_CACHE_SIZE = int(os.environ.get("IFCORE_CHAT_CACHE_SIZE", "256"))
+CHAT_CACHE_TTL = float(os.environ.get("IFCORE_CHAT_CACHE_TTL", "3600"))
+
+CHAT_REQUESTS = metrics.Counter("ifcore_chat_requests_total",
+                                "Chat answers by source (model, cache hit, coalesced)", ("source",))
+
+
+def normalize_message(message):
+    """Case, whitespace and trailing punctuation don't make a different question."""
+    return re.sub(r"\s+", " ", message.lower()).strip().rstrip("?!. ")
+
+
+def results_fingerprint(check_results, element_results):
+    """Content hash of results posted inline with a chat request."""
+    payload = json.dumps([check_results, list(element_results)], sort_keys=True, default=str)
+    return "inline:" + hashlib.sha256(payload.encode()).hexdigest()
+
+
+class TTLCache:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, stored_at)
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "hits": self.hits, "misses": self.misses}
+
+
+class ChatCache:
+    def __init__(self, max_entries=CHAT_CACHE_SIZE, ttl=CHAT_CACHE_TTL):
+        self._answers = TTLCache(max_entries, ttl)
+        self._tools = TTLCache(max_entries * 8, ttl)
+        self._inflight = {}  # key -> asyncio.Task (event loop thread only)
+
+    async def answer(self, fingerprint, message, run):
+        """Cached answer for this question on these results, else `await run()` once.
+
+        Concurrent callers with the same key share one task; a caller that
+        gives up (timeout, disconnect) does not cancel it for the others.
+        Only successful answers are cached.
+        """
+        key = (fingerprint, normalize_message(message))
+        cached = self._answers.get(key)
+        if cached is not None:
+            CHAT_REQUESTS.inc(source="cache")
+            return cached
+        task = self._inflight.get(key)
+        if task is not None:
+            CHAT_REQUESTS.inc(source="coalesced")
+            return await asyncio.shield(task)
+
+        CHAT_REQUESTS.inc(source="model")
+        task = self._inflight[key] = asyncio.ensure_future(run())
+
+        def done(t):
+            self._inflight.pop(key, None)
+            if not t.cancelled() and t.exception() is None:
+                self._answers.put(key, t.result())
+
+        task.add_done_callback(done)
+        return await asyncio.shield(task)
+
+    def tool(self, fingerprint, name, args, compute):
+        """Memoized output of a deterministic chat tool for one set of results."""
+        key = (fingerprint, name, args)
+        value = self._tools.get(key)
+        if value is None:
+            value = compute()
+            self._tools.put(key, value)
+        return value
+
+    def stats(self):
+        return {"answers": self._answers.stats(), "tools": self._tools.stats(),
+                "in_flight": len(self._inflight)}
@@ -0,0 +1,155 @@
+"""Shared geometry cache with vectorized NumPy queries.
+
+Each product is tessellated at most once per model, with the multi-threaded
+`ifcopenshell.geom.iterator`. Vertices of all tessellated products live in one
+contiguous float64 array (world coordinates, metres), so bulk queries such as
+bounding boxes for every wall run as a handful of NumPy reductions instead of
+a Python loop over `create_shape` calls.
+
+Reach it from a check through the shared index: `index.geometry.aabbs("IfcWall")`.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+
+import numpy as np
+import ifcopenshell.geom
+import ifcopenshell.util.placement
+import ifcopenshell.util.unit
+
+logger = logging.getLogger("ifcore")
+
+GEOMETRY_THREADS = int(os.environ.get("IFCORE_GEOMETRY_THREADS", "0")) or multiprocessing.cpu_count()
+
+
+class GeometryCache:
+    def __init__(self, model, index=None):
+        self.model = model
+        self.index = index
+        self._chunks = []           # vertex arrays not yet merged into _verts
+        self._verts = np.empty((0, 3))
+        self._spans = {}            # element id -> (start, stop) rows in _verts
+        self._seen = set()          # element ids already tessellated (or without geometry)
+        self._lock = threading.Lock()
+
+    # ── tessellation ─────────────────────────────────────────────────────
+    def _settings(self):
+        settings = ifcopenshell.geom.settings()
+        settings.set("use-world-coords", True)
+        return settings
+
+    def _tessellate(self, elements):
+        todo = [el for el in elements if el.id() not in self._seen and getattr(el, "Representation", None)]
+        if not todo:
+            return
+        offset = len(self._verts) + sum(len(c) for c in self._chunks)
+        it = ifcopenshell.geom.iterator(self._settings(), self.model, GEOMETRY_THREADS, include=todo)
+        if it.initialize():
+            while True:
+                shape = it.get()
+                verts = np.asarray(shape.geometry.verts, dtype=np.float64).reshape(-1, 3)
+                if len(verts):
+                    self._chunks.append(verts)
+                    self._spans[shape.id] = (offset, offset + len(verts))
+                    offset += len(verts)
+                if not it.next():
+                    break
+        self._seen.update(el.id() for el in todo)
+        logger.info(f"[geometry] tessellated {len(todo)} products")
+
+    def _ensure(self, elements):
+        with self._lock:
+            self._tessellate(elements)
+            if self._chunks:
+                self._verts = np.concatenate([self._verts] + self._chunks)
+                self._chunks = []
+
+    def _elements(self, ifc_type):
+        if self.index is not None:
+            return self.index.by_type(ifc_type)
+        return tuple(self.model.by_type(ifc_type))
+
+    def _with_geometry(self, ifc_type):
+        """(elements that have geometry, their (start, stop) spans as an (n, 2) array)."""
+        elements = self._elements(ifc_type)
+        self._ensure(elements)
+        found = [el for el in elements if el.id() in self._spans]
+        spans = np.array([self._spans[el.id()] for el in found], dtype=np.int64).reshape(-1, 2)
+        return found, spans
+
+    def vertices(self, element):
+        """(n, 3) world-space vertices of one element, or an empty array."""
+        self._ensure([element])
+        span = self._spans.get(element.id())
+        return self._verts[span[0]:span[1]] if span else np.empty((0, 3))
+
+    def _gather(self, spans):
+        """Copy the vertex runs of `spans` into one array.
+
+        Returns (points, owner index per point, start offset of each run).
+        """
+        counts = spans[:, 1] - spans[:, 0]
+        bounds = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        rows = np.arange(counts.sum()) + np.repeat(spans[:, 0] - bounds, counts)
+        owner = np.repeat(np.arange(len(spans)), counts)
+        return self._verts[rows], owner, bounds
+
+    # ── bulk queries ─────────────────────────────────────────────────────
+    def aabbs(self, ifc_type):
+        """Axis-aligned boxes for every element of a type: (elements, mins (n,3), maxs (n,3))."""
+        elements, spans = self._with_geometry(ifc_type)
+        if not elements:
+            return elements, np.empty((0, 3)), np.empty((0, 3))
+        pts, _, bounds = self._gather(spans)
+        return (elements, np.minimum.reduceat(pts, bounds, axis=0),
+                np.maximum.reduceat(pts, bounds, axis=0))
+
+    def dimensions(self, ifc_type):
+        """AABB extents (dx, dy, dz) per element: (elements, (n,3))."""
+        elements, mins, maxs = self.aabbs(ifc_type)
+        return elements, maxs - mins
+
+    def obb_extents(self, ifc_type):
+        """Oriented-box extents per element, largest first: (elements, (n,3)).
+
+        Axes come from a batched eigen-decomposition of each element's vertex
+        covariance, so a rotated wall still reports length ≥ height ≥ thickness.
+        """
+        elements, spans = self._with_geometry(ifc_type)
+        if not elements:
+            return elements, np.empty((0, 3))
+        pts, owner, bounds = self._gather(spans)
+        counts = spans[:, 1] - spans[:, 0]
+        centroids = np.add.reduceat(pts, bounds, axis=0) / counts[:, None]
+        centred = pts - centroids[owner]
+        cov = np.add.reduceat(centred[:, :, None] * centred[:, None, :], bounds, axis=0)
+        _, axes = np.linalg.eigh(cov)                       # (n, 3, 3), columns are axes
+        proj = np.einsum("vi,vij->vj", centred, axes[owner])
+        extents = np.maximum.reduceat(proj, bounds, axis=0) - np.minimum.reduceat(proj, bounds, axis=0)
+        return elements, -np.sort(-extents, axis=1)
+
+    def heights_above_storey(self, ifc_type):
+        """Bottom and top of each element relative to its storey elevation (metres).
+
+        Returns (elements, bottoms (n,), tops (n,)); NaN where no storey is known.
+        """
+        elements, mins, maxs = self.aabbs(ifc_type)
+        elevations = np.array([self._storey_elevation(el) for el in elements], dtype=np.float64)
+        return elements, mins[:, 2] - elevations, maxs[:, 2] - elevations
+
+    def _storey_elevation(self, element):
+        storey = self.index.storey(element) if self.index is not None else None
+        if storey is None:
+            return np.nan
+        if storey.ObjectPlacement is not None:
+            matrix = ifcopenshell.util.placement.get_local_placement(storey.ObjectPlacement)
+            return float(matrix[2][3]) * self._unit_scale()
+        if storey.Elevation is not None:
+            return float(storey.Elevation) * self._unit_scale()
+        return np.nan
+
+    def _unit_scale(self):
+        if not hasattr(self, "_scale"):
+            self._scale = ifcopenshell.util.unit.calculate_unit_scale(self.model)
+        return self._scale
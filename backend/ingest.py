@@ -0,0 +1,86 @@
+"""Streaming IFC ingestion.
+
+Every source is written to disk in fixed-size chunks while being hashed, so
+peak memory during ingest stays a small constant over the file size. The
+returned content hash keys the model and result caches. The async variants
+used by request handlers do their file writes and hashing in a worker
+thread, so a large upload does not block the event loop.
+"""
+import asyncio
+import base64
+import binascii
+
+from model_cache import content_hasher
+
+CHUNK_SIZE = 1024 * 1024
+B64_CHUNK_CHARS = 4 * 1024 * 1024  # multiple of 4
+
+
+class _HashingWriter:
+    def __init__(self, path):
+        self._f = open(path, "wb")
+        self._hasher = content_hasher()
+        self.size = 0
+
+    def write(self, data):
+        self._f.write(data)
+        self._hasher.update(data)
+        self.size += len(data)
+
+    def close(self):
+        self._f.close()
+        return self._hasher.hexdigest()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._f.close()
+
+
+def write_b64(ifc_b64, path):
+    """Incrementally decode a base64 string into `path`. Returns the content hash."""
+    with _HashingWriter(path) as out:
+        carry = ""
+        for start in range(0, len(ifc_b64), B64_CHUNK_CHARS):
+            chunk = carry + "".join(ifc_b64[start:start + B64_CHUNK_CHARS].split())
+            cut = len(chunk) - len(chunk) % 4
+            out.write(base64.b64decode(chunk[:cut], validate=True))
+            carry = chunk[cut:]
+        if carry:
+            raise binascii.Error("Invalid base64 payload length")
+        return out.close()
+
+
+def download(url, path, timeout=120):
+    """Stream `url` into `path`. Returns the content hash."""
+    import httpx  # only the URL ingest path needs it
+    with _HashingWriter(path) as out, httpx.Client(timeout=timeout) as client:
+        with client.stream("GET", url) as resp:
+            resp.raise_for_status()
+            for data in resp.iter_bytes(CHUNK_SIZE):
+                out.write(data)
+        return out.close()
+
+
+async def write_stream(chunks, path):
+    """Write an async byte iterator (raw request body) into `path`. Returns (hash, size)."""
+    with _HashingWriter(path) as out:
+        # Body chunks are small; gather CHUNK_SIZE before each hand-off to a thread
+        pending = bytearray()
+        async for data in chunks:
+            pending += data
+            if len(pending) >= CHUNK_SIZE:
+                full, pending = pending, bytearray()
+                await asyncio.to_thread(out.write, full)
+        if pending:
+            await asyncio.to_thread(out.write, pending)
+        return await asyncio.to_thread(out.close), out.size
+
+
+async def write_upload(upload, path):
+    """Copy a multipart UploadFile (already spooled by Starlette) into `path`."""
+    with _HashingWriter(path) as out:
+        while data := await upload.read(CHUNK_SIZE):
+            await asyncio.to_thread(out.write, data)
+        return await asyncio.to_thread(out.close), out.size
@@ -0,0 +1,58 @@
+"""In-process job event bus behind GET /jobs/{job_id}/events and ?wait=.
+
+Job threads publish events (`queued`, `running`, `progress`, then one final
+`done` / `error` / `cancelled`); async request handlers wait on them without
+polling. Events are kept per job with a sequence number so SSE clients can
+resume with Last-Event-ID. With several uvicorn workers the event may be
+published in another process — callers fall back to the job store then.
+"""
+import asyncio
+import threading
+from collections import OrderedDict
+
+FINAL_EVENTS = ("done", "error", "cancelled")
+
+
+class JobEventBus:
+    def __init__(self, max_jobs=500):
+        self.max_jobs = max_jobs
+        self._events = OrderedDict()  # job_id -> list of {"seq", "event", "data"}
+        self._waiters = {}            # job_id -> set of (loop, asyncio.Event)
+        self._lock = threading.Lock()
+
+    def publish(self, job_id, event, data):
+        with self._lock:
+            events = self._events.setdefault(job_id, [])
+            events.append({"seq": len(events), "event": event, "data": data})
+            self._events.move_to_end(job_id)
+            while len(self._events) > self.max_jobs:
+                self._events.popitem(last=False)
+            waiters = list(self._waiters.get(job_id, ()))
+        for loop, ready in waiters:
+            loop.call_soon_threadsafe(ready.set)
+
+    def since(self, job_id, seq):
+        with self._lock:
+            return list(self._events.get(job_id, [])[seq:])
+
+    async def wait(self, job_id, seq, timeout):
+        """Events with sequence >= `seq`, waiting up to `timeout` seconds for one."""
+        ready = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), ready)
+        with self._lock:
+            self._waiters.setdefault(job_id, set()).add(waiter)
+        try:
+            events = self.since(job_id, seq)
+            if not events:
+                try:
+                    await asyncio.wait_for(ready.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                events = self.since(job_id, seq)
+            return events
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(job_id)
+                waiters.discard(waiter)
+                if not waiters:
+                    del self._waiters[job_id]
@@ -0,0 +1,89 @@
+"""Per-job memory accounting and cap.
+
+While a job runs, `JobMemory` samples the process RSS on a background
+thread. The job reports the peak it saw and how far RSS grew above its
+starting point. With IFCORE_JOB_MEMORY_MB set, a job whose growth passes
+the cap stops at the next check boundary with MemoryCapExceeded, and
+`fits()` lets the orchestrator refuse, or shrink, a model before parsing it.
+
+RSS is the process's: in parallel mode each worker reports its own peak per
+check (`mem_peak_delta_kb`), and jobs running concurrently in one process
+share the figure.
+"""
+import os
+import resource
+import threading
+
+import metrics
+
+JOB_MEMORY_MB = int(os.environ.get("IFCORE_JOB_MEMORY_MB", "0"))
+SAMPLE_SECONDS = 0.05
+MB = 1024 * 1024
+
+JOB_PEAK_RSS = metrics.Histogram("ifcore_job_peak_rss_bytes", "Peak process RSS while a job ran",
+                                 buckets=[b * MB for b in (128, 256, 512, 1024, 2048, 4096, 8192)])
+
+
+class MemoryCapExceeded(Exception):
+    """A job needs, or grew to, more memory than IFCORE_JOB_MEMORY_MB allows."""
+
+
+def rss_bytes():
+    """Current resident set size, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class JobMemory:
+    def __init__(self, cap_mb=JOB_MEMORY_MB):
+        self.cap_bytes = cap_mb * MB
+        self.baseline = self.peak = rss_bytes() or 0
+        self.exceeded = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if rss_bytes() is not None:
+            self._thread = threading.Thread(target=self._sample, name="job-memory", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self._observe(rss_bytes() or 0)
+        JOB_PEAK_RSS.observe(self.peak)
+
+    def _sample(self):
+        while not self._stop.wait(SAMPLE_SECONDS):
+            self._observe(rss_bytes() or 0)
+
+    def _observe(self, rss):
+        self.peak = max(self.peak, rss)
+        if self.cap_bytes and self.peak - self.baseline > self.cap_bytes:
+            self.exceeded = True
+
+    def fits(self, estimated_bytes):
+        return not self.cap_bytes or estimated_bytes <= self.cap_bytes
+
+    def ensure_fits(self, estimated_bytes, what):
+        if not self.fits(estimated_bytes):
+            raise MemoryCapExceeded(f"{what} needs ~{estimated_bytes / MB:.0f} MB to parse, "
+                                    f"over the {self.cap_bytes / MB:.0f} MB job memory cap")
+
+    def guard(self, should_cancel=None):
+        """`should_cancel` for run loops that also raises once the cap is exceeded."""
+        def check():
+            if self.exceeded:
+                raise MemoryCapExceeded(f"job grew by {(self.peak - self.baseline) / MB:.0f} MB, "
+                                        f"over the {self.cap_bytes / MB:.0f} MB job memory cap")
+            return bool(should_cancel and should_cancel())
+        return check
+
+    def report(self):
+        return {"peak_rss_mb": round(self.peak / MB, 1),
+                "job_growth_mb": round(max(0, self.peak - self.baseline) / MB, 1),
+                "cap_mb": self.cap_bytes // MB or None}
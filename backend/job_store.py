@@ -0,0 +1,199 @@
+"""Job stores — where /check results live until the CF Worker collects them.
+
+`MemoryJobStore` is a per-process LRU with a TTL for finished jobs.
+`SQLiteJobStore` keeps jobs in a WAL-mode SQLite file so several uvicorn
+workers in one container can see each other's jobs. Pick one with
+IFCORE_JOB_STORE=memory|sqlite. SQLite stores element_results in the
+columnar form (see results.py) and hands back a ResultBuffer.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from results import ResultBuffer
+
+ACTIVE_STATUSES = ("queued", "running")
+RESTARTED_ERROR = "The server restarted before this job finished; please submit it again"
+
+JOB_STORE = os.environ.get("IFCORE_JOB_STORE", "memory")
+MAX_JOBS = int(os.environ.get("IFCORE_MAX_JOBS", "200"))
+JOB_TTL = float(os.environ.get("IFCORE_JOB_TTL", str(6 * 3600)))
+
+
+def _dumps(job):
+    elements = job.get("element_results")
+    if isinstance(elements, ResultBuffer):
+        job = {**job, "element_results": elements.to_columns()}
+    return json.dumps(job, default=str)
+
+
+def _loads(payload):
+    job = json.loads(payload)
+    elements = job.get("element_results")
+    if isinstance(elements, dict) and elements.get("format") == "columnar":
+        job["element_results"] = ResultBuffer.from_columns(elements)
+    return job
+
+
+class MemoryJobStore:
+    def __init__(self, max_jobs=MAX_JOBS, ttl=JOB_TTL):
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self._jobs = OrderedDict()  # job_id -> (job, updated_at)
+        self._lock = threading.Lock()
+
+    def get(self, job_id):
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is None:
+                return None
+            job, updated_at = entry
+            if job.get("status") not in ACTIVE_STATUSES and time.time() - updated_at > self.ttl:
+                del self._jobs[job_id]
+                return None
+            return job
+
+    def updated_at(self, job_id):
+        """When the job was last written, or None if unknown or expired."""
+        if self.get(job_id) is None:
+            return None
+        with self._lock:
+            entry = self._jobs.get(job_id)
+        return entry[1] if entry else None
+
+    def put(self, job_id, job):
+        with self._lock:
+            self._jobs[job_id] = (job, time.time())
+            self._jobs.move_to_end(job_id)
+            self._evict()
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job, _ = self._jobs.get(job_id, ({"job_id": job_id}, None))
+            self._jobs[job_id] = ({**job, **fields}, time.time())
+            self._jobs.move_to_end(job_id)
+
+    def _evict(self):
+        now = time.time()
+        finished = [jid for jid, (job, _) in self._jobs.items()
+                    if job.get("status") not in ACTIVE_STATUSES]
+        for n, jid in enumerate(finished):
+            if len(finished) - n <= self.max_jobs and now - self._jobs[jid][1] <= self.ttl:
+                break
+            del self._jobs[jid]
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "memory", "jobs": len(self._jobs), "max_jobs": self.max_jobs}
+
+
+class SQLiteJobStore:
+    def __init__(self, path, max_jobs=MAX_JOBS, ttl=JOB_TTL):
+        self.path = path
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, "
+                         "status TEXT NOT NULL, payload TEXT NOT NULL, updated_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_updated_at ON jobs (updated_at)")
+            if "owner" not in [col[1] for col in conn.execute("PRAGMA table_info(jobs)")]:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner INTEGER")
+            self._fail_orphans(conn)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT payload FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return _loads(row[0]) if row else None
+
+    def updated_at(self, job_id):
+        """When the job was last written, or None; reads no payload."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT updated_at FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def _write(self, conn, job_id, job):
+        conn.execute("INSERT OR REPLACE INTO jobs (job_id, status, payload, updated_at, owner) "
+                     "VALUES (?, ?, ?, ?, ?)",
+                     (job_id, job.get("status", "unknown"), _dumps(job), time.time(), os.getpid()))
+
+    def _fail_orphans(self, conn):
+        """Mark queued/running jobs whose process is gone as errors.
+
+        Jobs run in the process that accepted them, so after a restart or a
+        worker crash nothing will finish them; without this they would stay
+        active (never evicted) and their long-polls would never end. Jobs of
+        the other live workers sharing the file are left alone.
+        """
+        active = ",".join("?" * len(ACTIVE_STATUSES))
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(f"SELECT job_id, payload, owner FROM jobs WHERE status IN ({active})",
+                                ACTIVE_STATUSES).fetchall()
+            for job_id, payload, owner in rows:
+                if owner is not None and owner != os.getpid() and _alive(owner):
+                    continue
+                self._write(conn, job_id, {**_loads(payload), "status": "error", "error": RESTARTED_ERROR})
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def put(self, job_id, job):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._write(conn, job_id, job)
+            self._evict(conn)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def update(self, job_id, **fields):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT payload FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            job = _loads(row[0]) if row else {"job_id": job_id}
+            self._write(conn, job_id, {**job, **fields})
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def _evict(self, conn):
+        active = ",".join("?" * len(ACTIVE_STATUSES))
+        conn.execute(f"DELETE FROM jobs WHERE status NOT IN ({active}) AND updated_at < ?",
+                     (*ACTIVE_STATUSES, time.time() - self.ttl))
+        conn.execute(f"DELETE FROM jobs WHERE job_id IN (SELECT job_id FROM jobs WHERE status NOT IN ({active}) "
+                     f"ORDER BY updated_at DESC LIMIT -1 OFFSET ?)", (*ACTIVE_STATUSES, self.max_jobs))
+
+    def stats(self):
+        with self._connect() as conn:
+            n = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        return {"backend": "sqlite", "jobs": n, "max_jobs": self.max_jobs}
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # exists, owned by another user
+    return True
+
+
+def create_job_store():
+    if JOB_STORE == "sqlite":
+        from result_cache import CACHE_DIR
+        return SQLiteJobStore(os.path.join(CACHE_DIR, "jobs.sqlite3"))
+    if JOB_STORE != "memory":
+        raise ValueError(f"Unknown IFCORE_JOB_STORE: {JOB_STORE}")
+    return MemoryJobStore()
@@ -1,203 +1,51 @@
+import startup  # first, so the cold-start clock includes every other import
 import os
 import asyncio
-import base64
 import uuid
+import gzip
+import json
 import logging
+import shutil
+import time
 import tempfile
+import threading
+from collections import OrderedDict
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
 from typing import Optional
-import httpx
-from fastapi import FastAPI, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
-from pydantic_ai import Agent, RunContext
-from pydantic_ai.usage import UsageLimits
-from orchestrator import discover_checks, run_all_checks
+from orchestrator import (JobCancelled, discover_checks, load_checks, registry_info, registry_ready,
+                          run_all_checks)
+from model_cache import cache_stats
+import ingest
+import metrics
+import regulations
+import result_cache
+from batch import MAX_BATCH, run_batch
+from job_store import ACTIVE_STATUSES, create_job_store
+from job_events import FINAL_EVENTS, JobEventBus
+from results import ResultBuffer, as_columns, as_rows
+from scheduler import JobScheduler
+from search_index import ElementSearchIndex, job_search_index
+from chat_cache import ChatCache, results_fingerprint
+
+startup.mark("imports")
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("ifcore")
 
-# In-memory job store — CF Worker polls this
-_jobs: dict = {}
+# Import checker modules and ifcopenshell in a background thread at startup, so
+# /health answers at once; with 0 the first job loads them.
+WARMUP = os.environ.get("IFCORE_WARMUP", "1") == "1"
 
-# ---------------------------------------------------------------------------
-# Regulation knowledge base — Spanish / Catalan building bye-laws
-# Each entry contains the official regulation, article/section reference,
-# PDF link, content reference, compliance threshold, and required action.
-# ---------------------------------------------------------------------------
-REGULATIONS_KB: dict[str, dict] = {
-    "walls": {
-        "regulation": "CTE DB SE-F — Seguridad Estructural: Cimientos",
-        "reference": "CTE DB SE-F, Section 4.1 (Muros); EHE-08, Art. 23",
-        "pdf": "https://www.codigotecnico.org/pdf/Documentos/SE/DBSEF.pdf",
-        "page_ref": "Section 4.1, p. 14 — Minimum wall thickness 100 mm",
-        "threshold": "Minimum wall thickness: ≥ 100 mm",
-        "action": (
-            "Increase wall thickness to ≥ 100 mm. For load-bearing walls, a qualified "
-            "structural engineer must verify revised stability calculations under CTE DB SE. "
-            "Update architectural and structural drawings accordingly."
-        ),
-    },
-    "beams": {
-        "regulation": "EHE-08 — Instrucción de Hormigón Estructural",
-        "reference": "EHE-08, Art. 23 (Vigas) and Art. 42.3 (Dimensiones mínimas)",
-        "pdf": "https://www.mitma.gob.es/recursos_mfom/0820200.pdf",
-        "page_ref": "Art. 23.1, p. 62 — Minimum depth 200 mm; Art. 23.2 — Minimum width 150 mm",
-        "threshold": "Minimum beam depth: ≥ 200 mm; minimum beam width: ≥ 150 mm",
-        "action": (
-            "Redesign beam cross-section to achieve depth ≥ 200 mm and width ≥ 150 mm. "
-            "Recheck load and deflection calculations. Have a licensed structural engineer "
-            "verify and sign off the revised design. Update structural drawings."
-        ),
-    },
-    "columns": {
-        "regulation": "EHE-08 — Instrucción de Hormigón Estructural",
-        "reference": "EHE-08, Art. 24 (Pilares) and Art. 42.3",
-        "pdf": "https://www.mitma.gob.es/recursos_mfom/0820200.pdf",
-        "page_ref": "Art. 24.1, p. 65 — Minimum column dimension 250 mm",
-        "threshold": "Minimum column dimension: ≥ 250 mm",
-        "action": (
-            "Increase the smaller column dimension to ≥ 250 mm. Re-evaluate reinforcement "
-            "ratios and load capacity. Update column schedule and structural calculations. "
-            "Coordinate changes with the foundation design."
-        ),
-    },
-    "foundations": {
-        "regulation": "CTE DB SE-C — Seguridad Estructural: Cimientos; EHE-08",
-        "reference": "EHE-08, Art. 69 (Cimentaciones); CTE DB SE-C, Section 4.1",
-        "pdf": "https://www.codigotecnico.org/pdf/Documentos/SE/DBSEC.pdf",
-        "page_ref": "Art. 69.1 — Minimum foundation element depth 200 mm; DB SE-C Section 4.1, p. 18",
-        "threshold": "Minimum foundation depth: ≥ 200 mm",
-        "action": (
-            "Deepen or redesign foundation elements to ≥ 200 mm. If a geotechnical study "
-            "has not been done, commission one. Submit revised foundation drawings to the "
-            "project certifier. Ensure compliance with DB SE-C soil bearing capacity requirements."
-        ),
-    },
-    "slabs": {
-        "regulation": "CTE DB HE — Ahorro de Energía; EHE-08",
-        "reference": "CTE DB HE1, Table 2.3 (Transmitancias límite); EHE-08, Art. 22",
-        "pdf": "https://www.codigotecnico.org/pdf/Documentos/HE/DBHE.pdf",
-        "page_ref": "HE1 Table 2.3, p. 11 — Slab thickness 150–200 mm; Art. 22 structural dimensions",
-        "threshold": "Slab thickness: 150–200 mm",
-        "action": (
-            "Adjust slab thickness to the 150–200 mm range. Verify structural load capacity "
-            "for the revised thickness. If thermal performance is affected, recalculate U-values "
-            "for the slab assembly using HULC or equivalent CTE tool."
-        ),
-    },
-    "doors": {
-        "regulation": "CTE DB SUA — Seguridad de Utilización y Accesibilidad",
-        "reference": "CTE DB SUA, SUA-9 (Accesibilidad), Section 1.1.1 and Table 2.1",
-        "pdf": "https://www.codigotecnico.org/pdf/Documentos/SUA/DBSUA.pdf",
-        "page_ref": "SUA-9 Section 1.1.1, p. 47 — Minimum door clear width 800 mm; Table 2.1, p. 49",
-        "threshold": "Minimum door clear width: ≥ 800 mm",
-        "action": (
-            "Replace or widen door frames to achieve ≥ 800 mm clear passage width. "
-            "For full wheelchair access, 900 mm is recommended. Update the door schedule "
-            "in architectural drawings. In Catalan projects, also verify Decreto 141/2012."
-        ),
-    },
-    "windows": {
-        "regulation": "CTE DB SUA — Seguridad de Utilización y Accesibilidad",
-        "reference": "CTE DB SUA, SUA-1, Section 2.1 (Protección frente al riesgo de caída)",
-        "pdf": "https://www.codigotecnico.org/pdf/Documentos/SUA/DBSUA.pdf",
-        "page_ref": "SUA-1 Section 2.1, p. 6 — Minimum window sill height 1200 mm above finished floor",
-        "threshold": "Minimum window sill height: ≥ 1200 mm, or protective barrier required",
-        "action": (
-            "Raise window sill to ≥ 1200 mm above finished floor level, or install a "
-            "compliant protective barrier (parapet or railing) at the required height. "
-            "Verify glazing impact resistance under CTE DB SUA-2."
-        ),
-    },
-    "corridors": {
-        "regulation": "CTE DB SUA — Accesibilidad; Decreto 141/2012 (Catalonia)",
-        "reference": "CTE DB SUA, SUA-9, Table 2.1; Decreto 141/2012, Art. 18",
-        "pdf": "https://www.codigotecnico.org/pdf/Documentos/SUA/DBSUA.pdf",
-        "page_ref": "SUA-9 Table 2.1, p. 49 — Min. corridor width ≥ 1200 mm (public); ≥ 1100 mm (housing); Decreto 141/2012 Art. 18",
-        "threshold": "Minimum corridor width: ≥ 1100 mm in dwellings; ≥ 1200 mm in public routes",
-        "action": (
-            "Widen corridor to the applicable minimum. Revise floor-plan layout if needed. "
-            "For Catalan housing projects, additionally verify Decreto 141/2012 Art. 18 "
-            "(PDF: https://portaldogc.gencat.cat/utilsEADOP/PDF/6138/1223437.pdf)."
-        ),
-    },
-    "ceiling": {
-        "regulation": "CTE DB SUA — Accesibilidad; Decreto 141/2012 (Catalonia)",
-        "reference": "CTE DB SUA, SUA-9, Section 1.1; Decreto 141/2012, Art. 15",
-        "pdf": "https://www.codigotecnico.org/pdf/Documentos/SUA/DBSUA.pdf",
-        "page_ref": "SUA-9 Section 1.1, p. 47 — Minimum clear ceiling height 2200 mm; Decreto 141/2012 Art. 15",
-        "threshold": "Minimum clear ceiling height: ≥ 2200 mm (≥ 2500 mm in Catalan living spaces)",
-        "action": (
-            "Increase floor-to-ceiling clear height to ≥ 2200 mm. Review structural floor "
-            "depth and finish build-up. For Catalan housing, Decreto 141/2012 Art. 15 requires "
-            "≥ 2500 mm in habitable rooms — verify and revise section drawings."
-        ),
-    },
-    "stairs": {
-        "regulation": "CTE DB SUA — Seguridad de Utilización y Accesibilidad",
-        "reference": "CTE DB SUA, SUA-1, Section 4.2.1 (Escaleras de uso general)",
-        "pdf": "https://www.codigotecnico.org/pdf/Documentos/SUA/DBSUA.pdf",
-        "page_ref": "SUA-1 Section 4.2.1, p. 12 — Riser 130–185 mm; Tread ≥ 280 mm; formula: 2R + H = 620–640 mm",
-        "threshold": "Stair riser: 130–185 mm; stair tread: ≥ 280 mm",
-        "action": (
-            "Redesign stair geometry so riser falls within 130–185 mm and tread is ≥ 280 mm. "
-            "Apply the ergonomic formula: 2×riser + tread = 620–640 mm. "
-            "Update stair detail drawings and structural calculations."
-        ),
-    },
-    "railings": {
-        "regulation": "CTE DB SUA — Seguridad de Utilización y Accesibilidad",
-        "reference": "CTE DB SUA, SUA-1, Section 3.2.1 (Protección en los bordes de los forjados)",
-        "pdf": "https://www.codigotecnico.org/pdf/Documentos/SUA/DBSUA.pdf",
-        "page_ref": "SUA-1 Section 3.2.1, p. 9 — Min. height 900 mm; ≥ 1100 mm where drop > 6 m",
-        "threshold": "Minimum railing height: ≥ 900 mm; ≥ 1100 mm where floor-to-ground > 6 m",
-        "action": (
-            "Raise railing/balustrade to ≥ 900 mm (or ≥ 1100 mm where applicable). "
-            "Ensure baluster spacing ≤ 100 mm to prevent climbing. "
-            "Verify structural fixing adequacy under CTE DB SE."
-        ),
-    },
-    "energy": {
-        "regulation": "CTE DB HE — Ahorro de Energía",
-        "reference": "CTE DB HE, HE1, Section 2.2 (Transmitancia térmica máxima de cerramientos)",
-        "pdf": "https://www.codigotecnico.org/pdf/Documentos/HE/DBHE.pdf",
-        "page_ref": "HE1 Table 2.3, p. 11 — Maximum wall U-value 0.80 W/m²K (Climate Zone B)",
-        "threshold": "Maximum wall U-value: ≤ 0.80 W/m²K (Spain Climate Zone B)",
-        "action": (
-            "Add or upgrade thermal insulation in the wall assembly to bring U-value below "
-            "0.80 W/m²K. Use HULC or CYPETHERM software to recalculate. Specify insulation "
-            "type, thickness, and λ-value on building specifications."
-        ),
-    },
-    "fire": {
-        "regulation": "CTE DB SI — Seguridad en caso de Incendio",
-        "reference": "CTE DB SI, SI-2 (Propagación interior); SI-6 (Resistencia al fuego)",
-        "pdf": "https://www.codigotecnico.org/pdf/Documentos/SI/DBSI.pdf",
-        "page_ref": "DB SI Table 1.2, p. 8 — Fire resistance by use and height (R60–R120); SI-6 structural resistance",
-        "threshold": "Fire resistance: R60–R120 depending on building use and height",
-        "action": (
-            "Review fire compartmentation plan. Ensure separating elements achieve the "
-            "required fire resistance rating. Apply appropriate fireproofing to structural "
-            "members. Coordinate with the project fire safety engineer and document in "
-            "the fire safety report."
-        ),
-    },
-    "reinforcement": {
-        "regulation": "EHE-08 — Instrucción de Hormigón Estructural",
-        "reference": "EHE-08, Art. 42 (Recubrimientos) and Art. 58 (Cuantías mínimas de armadura)",
-        "pdf": "https://www.mitma.gob.es/recursos_mfom/0820200.pdf",
-        "page_ref": "Art. 42.1, p. 88 — Cover 20–45 mm by exposure class; Art. 58, p. 112 — Min. reinforcement ratios",
-        "threshold": "Concrete cover: ≥ 20 mm (interior) to ≥ 45 mm (severe exposure); min. reinforcement ratio per Art. 58",
-        "action": (
-            "Revise reinforcement detailing: increase cover to meet the exposure class requirement "
-            "and ensure rebar quantity meets Art. 58 minimum ratios. Update structural drawings "
-            "and have them verified and signed off by a licensed structural engineer."
-        ),
-    },
-}
+# Job store — CF Worker polls this (memory or shared SQLite, see job_store.py)
+_jobs = create_job_store()
+_scheduler = JobScheduler()
+_events = JobEventBus()
 
 
 # ---------------------------------------------------------------------------
@@ -207,19 +55,85 @@ REGULATIONS_KB: dict[str, dict] = {
 @dataclass
 class ChatDeps:
     check_results: list[dict]
-    element_results: list[dict]
+    search: ElementSearchIndex
+    fingerprint: str  # identifies the results; keys the answer and tool caches
+
+
+_chat_cache = ChatCache()
+REGULATION_MATCHES = 2  # articles returned per lookup_regulation call, best first
+CHAT_MODEL = os.environ.get("IFCORE_CHAT_MODEL", "google-gla:gemini-2.0-flash")
 
 
-_chat_agent: Agent | None = None
+def _compliance_summary(crs: list[dict]) -> str:
+    if not crs:
+        return "No compliance data available. Ask the user to upload and run an IFC check first."
 
+    total = len(crs)
+    passed = sum(1 for cr in crs if cr.get("status") == "pass")
+    failed = sum(1 for cr in crs if cr.get("status") == "fail")
+    other = total - passed - failed
 
-def _get_chat_agent() -> Agent:
+    lines = [f"Total checks: {total} | Pass: {passed} | Fail: {failed} | Other: {other}"]
+
+    teams: dict[str, dict] = {}
+    for cr in crs:
+        team = cr.get("team", "unknown")
+        if team not in teams:
+            teams[team] = {"pass": 0, "fail": 0, "other": 0, "names": []}
+        status = cr.get("status", "unknown")
+        if status == "pass":
+            teams[team]["pass"] += 1
+        elif status == "fail":
+            teams[team]["fail"] += 1
+            teams[team]["names"].append(cr.get("check_name", "?"))
+        else:
+            teams[team]["other"] += 1
+
+    lines.append("\nTeam breakdown:")
+    for team, counts in teams.items():
+        detail = ""
+        if counts["names"]:
+            detail = f" — failing: {', '.join(counts['names'][:5])}"
+        lines.append(f"  {team}: {counts['pass']} pass, {counts['fail']} fail{detail}")
+
+    return "\n".join(lines)
+
+
+def _lookup_regulation(topic: str) -> str:
+    matches = regulations.search(topic, k=REGULATION_MATCHES)
+    if not matches:
+        return (
+            f"No specific bye-law found for '{topic}'. "
+            f"Available topics: {', '.join(regulations.get_index().topics())}. "
+            "Try one of these terms."
+        )
+
+    return "\n\n".join(
+        f"**Bye-law: {d['regulation']}**\n"
+        f"**Reference:** {d['reference']}\n"
+        f"**PDF:** {d['pdf']}\n"
+        f"**Content/Page:** {d['page_ref']}\n"
+        f"**Threshold:** {d['threshold']}\n"
+        f"**Required action:** {d['action']}"
+        for d in matches
+    )
+
+
+_chat_agent = None
+
+
+def _get_chat_agent():
+    """Build the agent on the first /chat; PydanticAI and the Gemini stack load here."""
     global _chat_agent
     if _chat_agent is not None:
         return _chat_agent
 
-    _chat_agent = Agent(
-        "google-gla:gemini-2.0-flash",
+    with startup.phase("chat_import"):
+        from pydantic_ai import Agent, RunContext
+
+    # Published only once its tools are registered: a concurrent /chat reads the global unlocked
+    agent = Agent(
+        CHAT_MODEL,
         deps_type=ChatDeps,
         instructions=(
             "You are a building compliance assistant for the IFCore platform. "
@@ -250,45 +164,14 @@ def _get_chat_agent() -> Agent:
     )
 
     # ── Tool 1: overall summary ──────────────────────────────────────────
-    @_chat_agent.tool
+    @agent.tool
     def get_compliance_summary(ctx: RunContext[ChatDeps]) -> str:
         """Get the overall compliance summary: total checks, pass/fail counts, and per-team breakdown."""
-        crs = ctx.deps.check_results
-        if not crs:
-            return "No compliance data available. Ask the user to upload and run an IFC check first."
-
-        total = len(crs)
-        passed = sum(1 for cr in crs if cr.get("status") == "pass")
-        failed = sum(1 for cr in crs if cr.get("status") == "fail")
-        other = total - passed - failed
-
-        lines = [f"Total checks: {total} | Pass: {passed} | Fail: {failed} | Other: {other}"]
-
-        teams: dict[str, dict] = {}
-        for cr in crs:
-            team = cr.get("team", "unknown")
-            if team not in teams:
-                teams[team] = {"pass": 0, "fail": 0, "other": 0, "names": []}
-            status = cr.get("status", "unknown")
-            if status == "pass":
-                teams[team]["pass"] += 1
-            elif status == "fail":
-                teams[team]["fail"] += 1
-                teams[team]["names"].append(cr.get("check_name", "?"))
-            else:
-                teams[team]["other"] += 1
-
-        lines.append("\nTeam breakdown:")
-        for team, counts in teams.items():
-            detail = ""
-            if counts["names"]:
-                detail = f" — failing: {', '.join(counts['names'][:5])}"
-            lines.append(f"  {team}: {counts['pass']} pass, {counts['fail']} fail{detail}")
-
-        return "\n".join(lines)
+        return _chat_cache.tool(ctx.deps.fingerprint, "get_compliance_summary", (),
+                                lambda: _compliance_summary(ctx.deps.check_results))
 
     # ── Tool 2: search failing elements ─────────────────────────────────
-    @_chat_agent.tool
+    @agent.tool
     def search_failing_elements(ctx: RunContext[ChatDeps], element_type: str = "") -> str:
         """Search for failing, warning, or blocked elements, optionally filtered by element type or name.
 
@@ -296,17 +179,8 @@ def _get_chat_agent() -> Agent:
             element_type: Optional keyword to filter by — e.g. 'IfcWall', 'beam', 'door', 'column'.
                           Leave empty to return all failures.
         """
-        ers = ctx.deps.element_results
-        failing = [e for e in ers if e.get("check_status") in ("fail", "warning", "blocked")]
-
-        if element_type:
-            q = element_type.lower()
-            failing = [
-                e for e in failing
-                if q in (e.get("element_type") or "").lower()
-                or q in (e.get("element_name") or "").lower()
-                or q in (e.get("comment") or "").lower()
-            ]
+        search = ctx.deps.search
+        failing = search.search(element_type)
 
         if not failing:
             suffix = f" matching '{element_type}'" if element_type else ""
@@ -314,7 +188,7 @@ def _get_chat_agent() -> Agent:
 
         suffix = f" matching '{element_type}'" if element_type else ""
         lines = [f"Found {len(failing)} failing/warning element(s){suffix}:"]
-        for e in failing[:40]:
+        for e in map(search.row, failing[:40]):
             name = e.get("element_name") or e.get("element_type") or "Unknown"
             comment = (e.get("comment") or "")[:180]
             lines.append(
@@ -328,7 +202,7 @@ def _get_chat_agent() -> Agent:
         return "\n".join(lines)
 
     # ── Tool 3: regulation lookup ────────────────────────────────────────
-    @_chat_agent.tool
+    @agent.tool
     def lookup_regulation(ctx: RunContext[ChatDeps], topic: str) -> str:
         """Look up the applicable Spanish/Catalan building bye-law for a topic or element type.
         Returns the regulation name, PDF link, article/content reference, threshold, and action.
@@ -337,47 +211,41 @@ def _get_chat_agent() -> Agent:
             topic: The element type or compliance topic — e.g. 'beam', 'wall', 'door',
                    'foundation', 'fire', 'energy', 'reinforcement', 'stairs', 'railing'.
         """
-        q = topic.lower()
-
-        # Score candidates: 0 = key match, 1 = content match
-        matches: list[tuple[int, dict]] = []
-        for key, data in REGULATIONS_KB.items():
-            if q in key or key in q:
-                matches.append((0, data))
-            elif any(q in str(v).lower() for v in data.values()):
-                matches.append((1, data))
-
-        if not matches:
-            return (
-                f"No specific bye-law found for '{topic}'. "
-                "Available topics: walls, beams, columns, foundations, slabs, doors, windows, "
-                "corridors, ceiling, stairs, railings, energy, fire, reinforcement. "
-                "Try one of these terms."
-            )
+        # Same answer for every job, so memoized across all of them
+        return _chat_cache.tool("", "lookup_regulation", (topic,),
+                                lambda: _lookup_regulation(topic))
 
-        matches.sort(key=lambda x: x[0])
-        d = matches[0][1]
-        return (
-            f"**Bye-law: {d['regulation']}**\n"
-            f"**Reference:** {d['reference']}\n"
-            f"**PDF:** {d['pdf']}\n"
-            f"**Content/Page:** {d['page_ref']}\n"
-            f"**Threshold:** {d['threshold']}\n"
-            f"**Required action:** {d['action']}"
-        )
-
-    return _chat_agent
+    _chat_agent = agent
+    return agent
 
 
 class ChatRequest(BaseModel):
     message: str = Field(max_length=2000)
+    # With job_id the results are read from the job store; the inline lists
+    # (capped) are for clients that have no backend job to point at.
+    job_id: Optional[str] = None
     check_results: list[dict] = Field(default_factory=list, max_length=50)
     element_results: list[dict] = Field(default_factory=list, max_length=200)
 
 
 @asynccontextmanager
 async def lifespan(app):
+    regulations.load()
+    if WARMUP:
+        threading.Thread(target=_warm_up, name="warmup", daemon=True).start()
+    _scheduler.start()
+    startup.mark("ready")
     yield
+    _scheduler.stop()
+
+def _warm_up():
+    try:
+        with startup.phase("load_checks"):
+            load_checks(force=False)
+        with startup.phase("import_ifcopenshell"):
+            import ifcopenshell  # noqa: F401  (the first job would pay for it otherwise)
+    except Exception:
+        logger.exception("[startup] warm-up failed; checks load on first job")
 
 app = FastAPI(title="IFCore Platform", lifespan=lifespan)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
@@ -385,51 +253,359 @@ app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], all
 
 class CheckRequest(BaseModel):
     ifc_url: Optional[str] = None     # URL to download IFC from
-    ifc_b64: Optional[str] = None     # Base64-encoded IFC bytes (preferred — avoids DNS issues)
+    ifc_b64: Optional[str] = None     # Base64-encoded IFC bytes (legacy — prefer POST /check/upload)
+    project_id: Optional[str] = None
+    profile: bool = False             # attach a cProfile report per check to the job
+    previous_job_id: Optional[str] = None  # job on the previous revision: diff and re-check changes only
+
+
+class BatchSource(BaseModel):
+    name: Optional[str] = None        # echoed back so the caller can match results
+    ifc_url: Optional[str] = None
+    ifc_b64: Optional[str] = None
+
+
+class BatchRequest(BaseModel):
+    sources: list[BatchSource] = Field(min_length=1, max_length=MAX_BATCH)
     project_id: Optional[str] = None
+    workers: Optional[int] = Field(default=None, ge=1)  # default: IFCORE_BATCH_WORKERS
+
+
+_batch_lock = asyncio.Lock()
 
 
 @app.get("/health")
 def health():
-    checks = discover_checks()
-    return {"status": "ok", "checks_discovered": len(checks),
-            "checks": [{"team": t, "name": n} for t, n, _ in checks]}
+    # Never import checkers from here: until warm-up (or the first job) has
+    # built the registry, report it as not ready instead
+    checks = discover_checks() if registry_ready() else None
+    return {"status": "ok", "checks_ready": checks is not None,
+            "checks_discovered": len(checks) if checks is not None else None,
+            "checks": [{"team": t, "name": n} for t, n, _ in checks or []],
+            "modules": registry_info() if checks is not None else [], "startup": startup.report(), "model_cache": cache_stats(),
+            "result_cache": result_cache.stats(), "jobs": _jobs.stats(),
+            "scheduler": _scheduler.stats(), "chat_cache": _chat_cache.stats()}
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus exposition: model open, per-check, queue wait and job durations."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+GZIP_MIN_BYTES = 1024
+
+
+def _encode_job(job, fmt, accept_encoding, elements=True):
+    """Serialize a job for the wire; element_results as rows (default) or columns."""
+    if not elements:
+        job = {k: v for k, v in job.items() if k != "element_results"}
+    elif "element_results" in job:
+        encode = as_columns if fmt == "columnar" else as_rows
+        job = {**job, "element_results": encode(job["element_results"])}
+    body = json.dumps(job, default=str, separators=(",", ":")).encode()
+    headers = {"Vary": "Accept-Encoding"}
+    if len(body) >= GZIP_MIN_BYTES and "gzip" in accept_encoding:
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
 
 
 @app.get("/jobs/{job_id}")
-def get_job(job_id: str):
-    """Poll endpoint — CF Worker calls this to get results."""
-    job = _jobs.get(job_id)
+async def get_job(job_id: str, request: Request, wait: float = 0, format: str = "rows",
+                  elements: bool = True):
+    """Poll endpoint — CF Worker calls this to get results.
+
+    `?wait=N` long-polls: an unfinished job is held for up to N seconds (max 60)
+    and returned as soon as it finishes. `?format=columnar` returns
+    element_results column-oriented (see results.py) instead of one object per
+    row; `?elements=false` leaves them out (page them via /jobs/{id}/elements).
+    Responses are gzipped when the client accepts it.
+    """
+    job = await asyncio.to_thread(_jobs.get, job_id)
     if not job:
         return {"job_id": job_id, "status": "unknown"}
-    return job
+    if wait > 0 and job.get("status") in ACTIVE_STATUSES:
+        job = await _wait_until_finished(job_id, min(wait, 60.0)) or job
+    if job.get("status") == "queued":
+        position = _scheduler.position(job_id)
+        if position:
+            job = {**job, "queue_position": position}
+    body, headers = await asyncio.to_thread(
+        _encode_job, job, format, request.headers.get("accept-encoding", ""), elements)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+MAX_PAGE_SIZE = 5000
+ELEMENT_BUFFER_CACHE_SIZE = 8
+
+# job_id -> (updated_at, job, ResultBuffer): paging a large job decodes it once, not per page
+_element_buffers = OrderedDict()
+_element_buffers_lock = threading.Lock()
+
+
+def _job_with_elements(job_id):
+    """(job, ResultBuffer of its element_results), or None; reused until the job is rewritten."""
+    updated_at = _jobs.updated_at(job_id)
+    if updated_at is None:
+        return None
+    with _element_buffers_lock:
+        entry = _element_buffers.get(job_id)
+        if entry and entry[0] == updated_at:
+            _element_buffers.move_to_end(job_id)
+            return entry[1:]
+    job = _jobs.get(job_id)
+    if not job:
+        return None
+    buf = job.get("element_results", [])
+    if not isinstance(buf, ResultBuffer):
+        buf = ResultBuffer.from_rows(buf)
+    with _element_buffers_lock:
+        # Keyed by the stamp read first: a job rewritten in between is just reloaded next time
+        _element_buffers[job_id] = (updated_at, job, buf)
+        _element_buffers.move_to_end(job_id)
+        while len(_element_buffers) > ELEMENT_BUFFER_CACHE_SIZE:
+            _element_buffers.popitem(last=False)
+    return job, buf
+
+
+@app.get("/jobs/{job_id}/elements")
+def job_elements(job_id: str, check_status: Optional[str] = None, element_type: Optional[str] = None,
+                 team: Optional[str] = None, check_result_id: Optional[str] = None,
+                 cursor: Optional[str] = None, limit: int = 500):
+    """Page through a job's element_results, optionally filtered.
+
+    Filters take comma-separated values (OR within a filter, AND across
+    filters). Pass the returned `next_cursor` back as `cursor` for the next
+    page; it is null on the last page. Cursors are stable once the job is done.
+    """
+    if cursor is not None and not cursor.isdigit():
+        return JSONResponse(status_code=400, content={"error": "invalid cursor"})
+    loaded = _job_with_elements(job_id)
+    if loaded is None:
+        return JSONResponse(status_code=404, content={"job_id": job_id, "status": "unknown"})
+    job, buf = loaded
+
+    filters = {field: set(value.split(",")) for field, value in
+               (("check_status", check_status), ("element_type", element_type),
+                ("check_result_id", check_result_id)) if value}
+    if team:
+        teams = set(team.split(","))
+        ids = {cr["id"] for cr in job.get("check_results", []) if cr.get("team") in teams}
+        filters["check_result_id"] = filters.get("check_result_id", ids) & ids
+
+    positions, more = buf.select(filters, after=int(cursor) if cursor else -1,
+                                 limit=max(1, min(limit, MAX_PAGE_SIZE)))
+    return {"job_id": job_id, "status": job.get("status"),
+            "element_results": [buf.row(i) for i in positions],
+            "next_cursor": str(positions[-1]) if more else None}
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """Server-Sent Events: `progress` as each check finishes, then one final event."""
+    last_id = request.headers.get("last-event-id")
+    seq = int(last_id) + 1 if last_id and last_id.isdigit() else 0
+
+    async def stream():
+        nonlocal seq
+        while not await request.is_disconnected():
+            events = await _events.wait(job_id, seq, timeout=15.0)
+            for e in events:
+                yield f"id: {e['seq']}\nevent: {e['event']}\ndata: {json.dumps(e['data'])}\n\n"
+                seq = e["seq"] + 1
+                if e["event"] in FINAL_EVENTS:
+                    return
+            if events:
+                continue
+            job = await asyncio.to_thread(_jobs.get, job_id)  # finished elsewhere (other worker / events evicted)?
+            if not job or job.get("status") not in ACTIVE_STATUSES:
+                status = job.get("status") if job else "unknown"
+                event = status if status in FINAL_EVENTS else "error"
+                yield f"event: {event}\ndata: {json.dumps(_final_event_data(job or {'job_id': job_id, 'status': status}))}\n\n"
+                return
+            yield ": keep-alive\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+async def _wait_until_finished(job_id, timeout):
+    deadline = time.monotonic() + timeout
+    seq = 0
+    while (remaining := deadline - time.monotonic()) > 0:
+        # bounded waits so a job finished by another worker is still noticed
+        events = await _events.wait(job_id, seq, timeout=min(remaining, 2.0))
+        if events:
+            seq = events[-1]["seq"] + 1
+        if any(e["event"] in FINAL_EVENTS for e in events) or not events:
+            job = await asyncio.to_thread(_jobs.get, job_id)
+            if job and job.get("status") not in ACTIVE_STATUSES:
+                return job
+    return None
+
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    previous = _scheduler.cancel(job_id)
+    if previous is None:
+        job = _jobs.get(job_id)
+        status = job.get("status") if job else "unknown"
+        return JSONResponse(status_code=409 if job else 404,
+                            content={"job_id": job_id, "status": status, "error": "job is not cancellable"})
+    if previous == "queued":
+        _finish_job(_cancelled_job(job_id))
+    logger.info(f"[{job_id}] cancel requested ({previous})")
+    return {"job_id": job_id, "status": "cancelled" if previous == "queued" else "cancelling"}
+
+
+async def _previous_job_error(previous_job_id):
+    """Error response if `previous_job_id` cannot serve as a diff base, else None."""
+    if previous_job_id is None:
+        return None
+    job = await asyncio.to_thread(_jobs.get, previous_job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown or expired previous_job_id"})
+    if job.get("status") != "done":
+        return JSONResponse(status_code=409, content={"error": f"previous job is {job.get('status')}"})
+    return None
+
+
+def _queue_full_response():
+    retry_after = _scheduler.retry_after()
+    return JSONResponse(status_code=429, headers={"Retry-After": str(retry_after)},
+                        content={"error": "Job queue is full, retry later", "retry_after": retry_after})
+
+
+def _enqueue(job_id, fn, *args, on_cancel=None):
+    def admitted():
+        # Only admitted jobs get a record; a full queue answers 429 and leaves none behind
+        _jobs.put(job_id, {"job_id": job_id, "status": "queued"})
+        _events.publish(job_id, "queued", {"job_id": job_id, "status": "queued"})
+
+    if not _scheduler.submit(job_id, fn, *args, on_cancel=on_cancel, on_admit=admitted):
+        return None
+    return {"job_id": job_id, "status": "queued", "queue_position": _scheduler.position(job_id)}
 
 
 @app.post("/check")
-async def check(req: CheckRequest, background_tasks: BackgroundTasks):
+async def check(req: CheckRequest):
+    error = await _previous_job_error(req.previous_job_id)
+    if error:
+        return error
     job_id = str(uuid.uuid4())
-    _jobs[job_id] = {"job_id": job_id, "status": "running"}
     logger.info(f"[{job_id}] queued (b64={req.ifc_b64 is not None}, url={req.ifc_url})")
-    background_tasks.add_task(run_check_job, req.ifc_url, req.ifc_b64, job_id, req.project_id)
-    return {"job_id": job_id, "status": "running"}
+    queued = await asyncio.to_thread(_enqueue, job_id, run_check_job, req.ifc_url, req.ifc_b64, job_id,
+                                     req.project_id, req.profile, req.previous_job_id)
+    return queued or _queue_full_response()
+
+
+@app.post("/batch")
+async def batch_check(req: BatchRequest, elements: bool = True):
+    """Check many models in one request; NDJSON, one line per model as it finishes.
+
+    Models run in parallel across worker processes (see batch.py). The last
+    line is a summary with models/min and elements/s. `?elements=false`
+    leaves element rows out of the model lines. One batch runs at a time.
+    """
+    missing = [n for n, s in enumerate(req.sources) if not (s.ifc_url or s.ifc_b64)]
+    if missing:
+        return JSONResponse(status_code=400, content={"error": f"sources {missing} need ifc_url or ifc_b64"})
+    if _batch_lock.locked():
+        return JSONResponse(status_code=429, content={"error": "A batch is already running"})
+    # Free: acquired without yielding to the loop, so no other request slips in between
+    await _batch_lock.acquire()
+    released = False
+
+    def release():
+        # From the stream's finally, or the background task if the stream never started
+        nonlocal released
+        if not released:
+            released = True
+            _batch_lock.release()
+
+    async def stream():
+        try:
+            sources = [s.model_dump(exclude_none=True) for s in req.sources]
+            async for event in run_batch(sources, req.project_id, req.workers):
+                if "element_results" in event:
+                    event["element_results"] = as_rows(event["element_results"]) if elements else []
+                yield json.dumps(event, default=str) + "\n"
+        finally:
+            release()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson", background=BackgroundTask(release))
+
+
+@app.post("/check/upload")
+async def check_upload(request: Request, project_id: Optional[str] = None, profile: bool = False,
+                       previous_job_id: Optional[str] = None):
+    """Streaming variant of /check: multipart (`file` field) or raw IFC request body."""
+    if _scheduler.is_full():
+        return _queue_full_response()  # refuse before reading a large body
+    error = await _previous_job_error(previous_job_id)
+    if error:
+        return error
+    job_id = str(uuid.uuid4())
+    tmpdir = tempfile.mkdtemp(prefix="ifcore-")
+    ifc_path = os.path.join(tmpdir, "model.ifc")
+    try:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise ValueError("multipart upload needs a 'file' field")
+            project_id = project_id or form.get("project_id")
+            model_key, size = await ingest.write_upload(upload, ifc_path)
+        else:
+            model_key, size = await ingest.write_stream(request.stream(), ifc_path)
+        if not size:
+            raise ValueError("empty upload")
+    except Exception as exc:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        return JSONResponse(status_code=400, content={"error": str(exc)})
+
+    logger.info(f"[{job_id}] queued (upload={size} bytes)")
+    queued = await asyncio.to_thread(
+        _enqueue, job_id, run_upload_job, tmpdir, model_key, job_id, project_id, profile,
+        previous_job_id, on_cancel=lambda: shutil.rmtree(tmpdir, ignore_errors=True))
+    if queued is None:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        return _queue_full_response()
+    return queued
 
 
 @app.post("/chat")
 async def chat_endpoint(req: ChatRequest):
-    deps = ChatDeps(
-        check_results=req.check_results,
-        element_results=req.element_results,
-    )
-    try:
+    if req.job_id:
+        context = await asyncio.to_thread(job_search_index, req.job_id, _jobs.get)
+        if context is None:
+            return JSONResponse(status_code=404, content={"error": "Unknown or expired job"})
+        deps = ChatDeps(*context)
+    else:
+        deps = ChatDeps(
+            check_results=req.check_results,
+            search=ElementSearchIndex(req.element_results),
+            fingerprint=results_fingerprint(req.check_results, req.element_results),
+        )
+
+    agent = _chat_agent or await asyncio.to_thread(_get_chat_agent)
+
+    async def ask():
+        from pydantic_ai.usage import UsageLimits
         result = await asyncio.wait_for(
-            _get_chat_agent().run(
+            agent.run(
                 req.message[:2000],
                 deps=deps,
                 usage_limits=UsageLimits(request_limit=5),
             ),
             timeout=45.0,
         )
-        return {"response": result.output}
+        return result.output
+
+    try:
+        # Same question on the same results: cached answer, or share the call in flight
+        return {"response": await _chat_cache.answer(deps.fingerprint, req.message[:2000], ask)}
     except asyncio.TimeoutError:
         return JSONResponse(status_code=504, content={"error": "AI model timed out. Please try again."})
     except Exception as e:
@@ -437,32 +613,112 @@ async def chat_endpoint(req: ChatRequest):
         return JSONResponse(status_code=502, content={"error": f"AI model error: {type(e).__name__}"})
 
 
-def run_check_job(ifc_url, ifc_b64, job_id, project_id):
+def run_check_job(ifc_url, ifc_b64, job_id, project_id, profile=False, previous_job_id=None,
+                  cancel_event=None):
     try:
         with tempfile.TemporaryDirectory() as tmpdir:
             ifc_path = os.path.join(tmpdir, "model.ifc")
+            _mark_running(job_id)
 
             if ifc_b64:
                 logger.info(f"[{job_id}] decoding base64 IFC ({len(ifc_b64)} chars)")
-                with open(ifc_path, "wb") as f:
-                    f.write(base64.b64decode(ifc_b64))
+                model_key = ingest.write_b64(ifc_b64, ifc_path)
             elif ifc_url:
                 logger.info(f"[{job_id}] downloading {ifc_url}")
-                with httpx.Client(timeout=120) as client:
-                    resp = client.get(ifc_url)
-                    resp.raise_for_status()
-                    with open(ifc_path, "wb") as f:
-                        f.write(resp.content)
+                model_key = ingest.download(ifc_url, ifc_path)
             else:
                 raise ValueError("Either ifc_url or ifc_b64 must be provided")
 
-            logger.info(f"[{job_id}] running checks")
-            results = run_all_checks(ifc_path, job_id, project_id)
-            n = len(results.get("check_results", []))
-            logger.info(f"[{job_id}] done: {n} checks")
-            _jobs[job_id] = {"job_id": job_id, "status": "done", **results}
+            _run_job_checks(ifc_path, model_key, job_id, project_id, profile, previous_job_id,
+                            cancel_event)
+    except JobCancelled:
+        _finish_job(_cancelled_job(job_id))
+    except Exception as exc:
+        _fail_job(job_id, exc)
+
 
+def run_upload_job(tmpdir, model_key, job_id, project_id, profile=False, previous_job_id=None,
+                   cancel_event=None):
+    try:
+        _mark_running(job_id)
+        _run_job_checks(os.path.join(tmpdir, "model.ifc"), model_key, job_id, project_id,
+                        profile, previous_job_id, cancel_event)
+    except JobCancelled:
+        _finish_job(_cancelled_job(job_id))
     except Exception as exc:
-        logger.exception(f"[{job_id}] failed: {exc}")
-        _jobs[job_id] = {"job_id": job_id, "status": "error", "error": str(exc),
-                         "check_results": [], "element_results": []}
+        _fail_job(job_id, exc)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def _run_job_checks(ifc_path, model_key, job_id, project_id, profile=False, previous_job_id=None,
+                    cancel_event=None):
+    logger.info(f"[{job_id}] running checks")
+    should_cancel = cancel_event.is_set if cancel_event else None
+    previous_job = _jobs.get(previous_job_id) if previous_job_id else None
+    if previous_job_id and previous_job is None:
+        logger.warning(f"[{job_id}] previous job {previous_job_id} expired; running a plain check")
+
+    # Check rows are published into the job record as each check completes. Element
+    # rows are only written with the finished job: rewriting the growing list on
+    # every check would cost O(checks × elements) store I/O per job.
+    partial_checks, running_checks = [], []
+    progress = {"done": 0, "total": len(discover_checks()), "current": None}
+
+    def on_check_start(team, check_name):
+        running_checks.append(check_name)
+        progress["current"] = check_name
+        _jobs.update(job_id, progress=dict(progress))
+
+    def on_progress(check_row, element_rows, done, total):
+        partial_checks.append(check_row)
+        if check_row["check_name"] in running_checks:
+            running_checks.remove(check_row["check_name"])
+        progress.update(done=done, total=total, current=running_checks[0] if running_checks else None)
+        _jobs.update(job_id, progress=dict(progress), check_results=list(partial_checks))
+        _events.publish(job_id, "progress", {
+            "job_id": job_id, "done": done, "total": total, "check_name": check_row["check_name"],
+            "team": check_row["team"], "status": check_row["status"], "summary": check_row["summary"]})
+
+    results = run_all_checks(ifc_path, job_id, project_id, model_key=model_key,
+                             should_cancel=should_cancel, on_progress=on_progress,
+                             on_check_start=on_check_start, profile=profile or None,
+                             previous_job=previous_job)
+    n = len(results.get("check_results", []))
+    logger.info(f"[{job_id}] done: {n} checks")
+    progress.update(done=len(results["check_results"]), total=len(results["check_results"]), current=None)
+    _finish_job({"job_id": job_id, "status": "done", "progress": dict(progress), "model_key": model_key,
+                 **results})
+
+
+def _mark_running(job_id):
+    _jobs.update(job_id, status="running")
+    _events.publish(job_id, "running", {"job_id": job_id, "status": "running"})
+
+
+def _final_event_data(job):
+    data = {"job_id": job["job_id"], "status": job["status"],
+            "checks": len(job.get("check_results", [])),
+            "elements": len(job.get("element_results", []))}
+    if job.get("memory"):
+        data["peak_rss_mb"] = job["memory"]["peak_rss_mb"]
+    if job.get("error"):
+        data["error"] = job["error"]
+    return data
+
+
+def _finish_job(job):
+    metrics.JOBS_TOTAL.inc(status=job["status"])
+    _jobs.put(job["job_id"], job)
+    _events.publish(job["job_id"], job["status"], _final_event_data(job))
+
+
+def _cancelled_job(job_id):
+    logger.info(f"[{job_id}] cancelled")
+    return {"job_id": job_id, "status": "cancelled", "check_results": [], "element_results": []}
+
+
+def _fail_job(job_id, exc):
+    logger.exception(f"[{job_id}] failed: {exc}")
+    _finish_job({"job_id": job_id, "status": "error", "error": str(exc),
+                 "check_results": [], "element_results": []})
@@ -0,0 +1,82 @@
+"""Minimal Prometheus text-format metrics (no client library dependency).
+
+Histograms and counters are process-local and rendered by GET /metrics.
+"""
+import threading
+
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, ('le', bound))} {count}")
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, ('le', '+Inf'))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+def render():
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+MODEL_OPEN_SECONDS = Histogram("ifcore_model_open_seconds", "Time to parse an IFC model")
+CHECK_SECONDS = Histogram("ifcore_check_duration_seconds", "Wall time of one check function",
+                          ("team", "check"))
+QUEUE_WAIT_SECONDS = Histogram("ifcore_queue_wait_seconds", "Time a job waited in the queue")
+JOB_SECONDS = Histogram("ifcore_job_duration_seconds", "Wall time of a job once started")
+JOBS_TOTAL = Counter("ifcore_jobs_total", "Finished jobs by final status", ("status",))
@@ -0,0 +1,102 @@
+"""LRU cache of parsed IFC models keyed by content hash.
+
+Parsing is the dominant cost of a job, and the frontend often re-runs checks
+on the same file. Opened `ifcopenshell.file` objects are kept in an LRU whose
+size is bounded by an estimated memory budget (file size x expansion factor,
+since the parsed graph is several times larger than the STEP text).
+Cached models are shared between jobs, so checks must treat them as read-only.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+logger = logging.getLogger("ifcore")
+
+MODEL_CACHE_MB = int(os.environ.get("IFCORE_MODEL_CACHE_MB", "1024"))
+MODEL_SIZE_FACTOR = float(os.environ.get("IFCORE_MODEL_SIZE_FACTOR", "4"))
+
+
+def content_hasher():
+    return hashlib.sha256()
+
+
+class ModelCache:
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self._models = OrderedDict()  # key -> (model, est_bytes)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def peek(self, key):
+        with self._lock:
+            entry = self._models.get(key)
+            return entry[0] if entry else None
+
+    def get(self, key, path):
+        with self._lock:
+            entry = self._models.get(key)
+            if entry:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        model = _timed_open(path)
+        est = int(os.path.getsize(path) * MODEL_SIZE_FACTOR)
+        if est > self.budget_bytes:
+            return model  # too big to keep — still usable for this job
+        with self._lock:
+            self._models[key] = (model, est)
+            self._models.move_to_end(key)
+            while self.resident_bytes() > self.budget_bytes:
+                evicted, _ = self._models.popitem(last=False)
+                logger.info(f"[model-cache] evicted {evicted[:12]}")
+        return model
+
+    def resident_bytes(self):
+        return sum(est for _, est in self._models.values())
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._models), "hits": self.hits, "misses": self.misses,
+                    "resident_bytes": self.resident_bytes(), "budget_bytes": self.budget_bytes}
+
+
+def _timed_open(path):
+    started = time.perf_counter()
+    import ifcopenshell  # heavy; imported on the first model open, not at app start
+    model = ifcopenshell.open(path)
+    metrics.MODEL_OPEN_SECONDS.observe(time.perf_counter() - started)
+    return model
+
+
+_cache = ModelCache(MODEL_CACHE_MB * 1024 * 1024)
+
+
+def open_model(path, key=None):
+    """Open `path`, reusing a cached parse when `key` (content hash) is known."""
+    if key is None:
+        return _timed_open(path)
+    return _cache.get(key, path)
+
+
+def set_budget(budget_bytes):
+    """Change the cache budget, evicting as needed (0 turns caching off)."""
+    with _cache._lock:
+        _cache.budget_bytes = budget_bytes
+        while _cache._models and _cache.resident_bytes() > budget_bytes:
+            _cache._models.popitem(last=False)
+
+
+def cached_model(key):
+    return _cache.peek(key) if key else None
+
+
+def cache_stats():
+    return _cache.stats()
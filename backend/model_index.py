@@ -0,0 +1,156 @@
+"""Shared, lazily built lookups over one IFC model.
+
+Checks that declare an `index` parameter receive the job's ModelIndex:
+
+    def check_door_width(model, index, min_width=800):
+        for door in index.by_type("IfcDoor"):
+            width = index.property(door, "Pset_DoorCommon", "ClearWidth")
+            storey = index.storey(door)
+
+Every lookup is computed on first use and memoized, so type queries, property
+set resolution and spatial containment walks happen once per model instead of
+once per check. The index lives as long as the (cached) model itself.
+"""
+import threading
+import weakref
+
+import numpy as np
+import ifcopenshell.util.element
+
+_indexes = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+
+def get_index(model):
+    """The ModelIndex for `model`, created on first request."""
+    with _indexes_lock:
+        index = _indexes.get(model)
+        if index is None:
+            index = _indexes[model] = ModelIndex(model)
+        return index
+
+
+class ModelIndex:
+    def __init__(self, model):
+        self.model = model
+        self._by_type = {}
+        self._psets = {}
+        self._qtos = {}
+        self._container = None  # element id -> directly containing spatial element
+        self._parent = None     # element id -> aggregating whole (IfcRelAggregates)
+        self._storeys = {}
+        self._on_storey = None  # storey id -> products
+        self._geometry = None
+        self._spatial = {}
+        self._lock = threading.Lock()
+
+    @property
+    def geometry(self):
+        """Shared GeometryCache (tessellation + vectorized bounding-box queries)."""
+        if self._geometry is None:
+            from geometry import GeometryCache
+            with self._lock:
+                if self._geometry is None:
+                    self._geometry = GeometryCache(self.model, self)
+        return self._geometry
+
+    def spatial(self, ifc_types="IfcProduct", storey=None):
+        """SpatialIndex (BVH) over the AABBs of `ifc_types`, optionally limited to one storey."""
+        types = (ifc_types,) if isinstance(ifc_types, str) else tuple(ifc_types)
+        key = (types, storey.id() if storey is not None else None)
+        if key not in self._spatial:
+            from spatial import SpatialIndex
+            elements, mins, maxs, seen = [], [], [], set()
+            for ifc_type in types:
+                els, lo, hi = self.geometry.aabbs(ifc_type)
+                keep = [i for i, el in enumerate(els)
+                        if el.id() not in seen and (storey is None or self.storey(el) == storey)]
+                seen.update(els[i].id() for i in keep)
+                elements += [els[i] for i in keep]
+                mins.append(lo[keep])
+                maxs.append(hi[keep])
+            self._spatial[key] = SpatialIndex(elements, np.concatenate(mins), np.concatenate(maxs),
+                                              geometry=self.geometry)
+        return self._spatial[key]
+
+    # ── types ────────────────────────────────────────────────────────────
+    def by_type(self, ifc_type, include_subtypes=True):
+        key = (ifc_type, include_subtypes)
+        if key not in self._by_type:
+            self._by_type[key] = tuple(self.model.by_type(ifc_type, include_subtypes))
+        return self._by_type[key]
+
+    def element_type(self, element):
+        return ifcopenshell.util.element.get_type(element)
+
+    # ── properties and quantities ────────────────────────────────────────
+    def psets(self, element):
+        """Property sets of `element` including inherited type properties."""
+        eid = element.id()
+        if eid not in self._psets:
+            self._psets[eid] = ifcopenshell.util.element.get_psets(element, psets_only=True)
+        return self._psets[eid]
+
+    def qtos(self, element):
+        """Quantity sets of `element`."""
+        eid = element.id()
+        if eid not in self._qtos:
+            self._qtos[eid] = ifcopenshell.util.element.get_psets(element, qtos_only=True)
+        return self._qtos[eid]
+
+    def property(self, element, pset, name, default=None):
+        """One property (or quantity) value, e.g. ("Pset_WallCommon", "IsExternal")."""
+        props = self.psets(element).get(pset) or self.qtos(element).get(pset) or {}
+        return props.get(name, default)
+
+    # ── spatial structure ────────────────────────────────────────────────
+    def _build_spatial(self):
+        with self._lock:
+            if self._container is not None:
+                return
+            container, parent = {}, {}
+            for rel in self.model.by_type("IfcRelContainedInSpatialStructure"):
+                for el in rel.RelatedElements:
+                    container[el.id()] = rel.RelatingStructure
+            for rel in self.model.by_type("IfcRelAggregates"):
+                for part in rel.RelatedObjects:
+                    parent[part.id()] = rel.RelatingObject
+            self._parent = parent
+            self._container = container
+
+    def container(self, element):
+        """The spatial element that directly contains `element` (storey, space, …)."""
+        self._build_spatial()
+        current = element
+        while current is not None:
+            found = self._container.get(current.id())
+            if found is not None:
+                return found
+            current = self._parent.get(current.id())  # parts inherit their whole's container
+        return None
+
+    def storey(self, element):
+        """The IfcBuildingStorey `element` sits on, or None."""
+        eid = element.id()
+        if eid not in self._storeys:
+            self._build_spatial()
+            node = element if element.is_a("IfcSpatialStructureElement") else self.container(element)
+            while node is not None and not node.is_a("IfcBuildingStorey"):
+                node = self._parent.get(node.id())
+            self._storeys[eid] = node
+        return self._storeys[eid]
+
+    def space(self, element):
+        """The IfcSpace directly containing `element`, or None."""
+        found = self.container(element)
+        return found if found is not None and found.is_a("IfcSpace") else None
+
+    def elements_on_storey(self, storey, ifc_type="IfcProduct"):
+        if self._on_storey is None:
+            on_storey = {}
+            for el in self.by_type("IfcProduct"):
+                found = self.storey(el)
+                if found is not None and found != el:
+                    on_storey.setdefault(found.id(), []).append(el)
+            self._on_storey = on_storey
+        return [el for el in self._on_storey.get(storey.id(), ()) if el.is_a(ifc_type)]
@@ -1,38 +1,141 @@
+import cProfile
+import functools
+import hashlib
 import importlib.util
+import inspect
+import io
+import pstats
+import resource
 import os
 import glob
+import shutil
+import tempfile
 import uuid
 import time
 import logging
-import ifcopenshell
+import threading
+from model_cache import MODEL_SIZE_FACTOR, cached_model, open_model
+from job_memory import MB, JobMemory
+import metrics
+import result_cache
+import revisions
+from results import ResultBuffer
 
 logger = logging.getLogger("ifcore")
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-TEAM_FIELDS = [
-    "element_id", "element_type", "element_name", "element_name_long",
-    "check_status", "actual_value", "required_value", "comment", "log",
-]
 
+# Check registry — checker modules are imported once per process and reused by
+# every job and /health call. With IFCORE_HOT_RELOAD=1 a module is re-imported
+# when its file mtime changes (handy in local dev, off in production).
+HOT_RELOAD = os.environ.get("IFCORE_HOT_RELOAD", "0") == "1"
 
-def discover_checks():
-    checks = []
+_registry: dict = {}          # path -> module entry (see _load_module)
+_registry_lock = threading.Lock()
+_registry_built = False
+
+
+def _checker_paths():
     pattern = os.path.join(BASE_DIR, "teams", "*", "tools", "checker_*.py")
-    for path in sorted(glob.glob(pattern)):
-        parts = path.replace(BASE_DIR + os.sep, "").split(os.sep)
-        team = parts[1]
-        module_name = os.path.splitext(os.path.basename(path))[0]
-        try:
-            spec = importlib.util.spec_from_file_location(f"teams.{team}.{module_name}", path)
-            mod = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(mod)
-            for attr in dir(mod):
-                if attr.startswith("check_") and callable(getattr(mod, attr)):
-                    checks.append((team, attr, getattr(mod, attr)))
-        except Exception as exc:
-            logger.warning(f"[discover] skipping {team}/{module_name}: {exc}")
-    return checks
+    return sorted(glob.glob(pattern))
+
+
+def _source_hash(path):
+    """Hash the checker module plus its sibling helper modules in tools/."""
+    h = hashlib.sha256()
+    for p in [path] + sorted(glob.glob(os.path.join(os.path.dirname(path), "*.py"))):
+        with open(p, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def _check_fingerprint(source_hash, name, func):
+    defaults = (getattr(func, "__defaults__", None), getattr(func, "__kwdefaults__", None))
+    return hashlib.sha256(f"{source_hash}:{name}:{defaults!r}".encode()).hexdigest()
+
+
+def _load_module(path):
+    parts = path.replace(BASE_DIR + os.sep, "").split(os.sep)
+    team = parts[1]
+    module_name = os.path.splitext(os.path.basename(path))[0]
+    entry = {"team": team, "module": module_name, "path": path,
+             "mtime": os.path.getmtime(path), "import_ms": 0.0, "checks": [], "error": None,
+             "source_hash": _source_hash(path), "fingerprints": {}}
+    t0 = time.perf_counter()
+    try:
+        spec = importlib.util.spec_from_file_location(f"teams.{team}.{module_name}", path)
+        mod = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(mod)
+        for attr in dir(mod):
+            func = getattr(mod, attr)
+            if attr.startswith("check_") and callable(func):
+                entry["checks"].append((attr, func))
+                entry["fingerprints"][attr] = _check_fingerprint(entry["source_hash"], attr, func)
+    except Exception as exc:
+        logger.warning(f"[discover] skipping {team}/{module_name}: {exc}")
+        entry["error"] = str(exc)[:200]
+    entry["import_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return entry
+
+
+def _refresh_registry():
+    """Re-import modules whose mtime changed; pick up added/removed files."""
+    paths = _checker_paths()
+    for path in list(_registry):
+        if path not in paths:
+            del _registry[path]
+    for path in paths:
+        entry = _registry.get(path)
+        if entry is None or os.path.getmtime(path) != entry["mtime"]:
+            _registry[path] = _load_module(path)
+
+
+def load_checks(force=True):
+    """Build (or rebuild) the check registry; with force=False only if not built yet.
+
+    Called from the app's background warm-up, or lazily by the first job.
+    """
+    global _registry_built
+    with _registry_lock:
+        if _registry_built and not force:
+            return
+        _registry.clear()
+        _refresh_registry()
+        _registry_built = True
+    total = sum(e["import_ms"] for e in _registry.values())
+    logger.info(f"[discover] {len(_registry)} checker modules imported in {total:.0f} ms")
+
+
+def discover_checks():
+    if not _registry_built:
+        load_checks(force=False)
+    elif HOT_RELOAD:
+        with _registry_lock:
+            _refresh_registry()
+    return [(e["team"], name, func)
+            for e in _registry.values() for name, func in e["checks"]]
+
+
+def check_fingerprint(team, func_name):
+    """Hash of a check's module source (plus helpers) and default arguments."""
+    for e in _registry.values():
+        if e["team"] == team and func_name in e["fingerprints"]:
+            return e["fingerprints"][func_name]
+    return None
+
+
+def registry_ready():
+    return _registry_built
+
+
+def registry_info():
+    """Per-module import stats, slowest first."""
+    with _registry_lock:
+        modules = [{"team": e["team"], "module": e["module"], "import_ms": e["import_ms"],
+                    "checks": len(e["checks"]), "error": e["error"]}
+                   for e in _registry.values()]
+    return sorted(modules, key=lambda m: m["import_ms"], reverse=True)
 
 
 def _aggregate_status(elements):
@@ -60,47 +163,287 @@ def _build_summary(elements):
     return f"{total} elements: {', '.join(parts)}" if parts else f"{total} elements"
 
 
-def run_all_checks(ifc_path, job_id, project_id):
-    model = ifcopenshell.open(ifc_path)
-    checks = discover_checks()
-    check_results = []
-    element_results = []
+# Parallel mode — IFCORE_CHECK_WORKERS > 0 fans checks out over a process pool
+# (see parallel.py). 0 keeps the original serial, in-process behaviour.
+CHECK_WORKERS = int(os.environ.get("IFCORE_CHECK_WORKERS", "0"))
+CHECK_TIMEOUT = float(os.environ.get("IFCORE_CHECK_TIMEOUT", "300"))
+
+# Isolation — IFCORE_CHECK_ISOLATION=1 runs each check in its own process with
+# CPU, memory and wall-time limits (see sandbox.py); takes precedence over the pool.
+CHECK_ISOLATION = os.environ.get("IFCORE_CHECK_ISOLATION", "0") == "1"
+
+
+# Large models — from IFCORE_SUBSET_MIN_MB, or when parsing the whole file would
+# not fit the job memory cap, only the entities of the IFC types the checks
+# declare (`check_x.ifc_types = ("IfcDoor",)`) are loaded; see step_subset.py.
+SUBSET_MIN_MB = int(os.environ.get("IFCORE_SUBSET_MIN_MB", "0"))  # 0: only under the memory cap
+
+PROFILE_CHECKS = os.environ.get("IFCORE_PROFILE_CHECKS", "0") == "1"
+PROFILE_TOP_N = 30
+
+
+def _maxrss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux
+
+
+def _profile_text(profiler):
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+    return out.getvalue()
 
-    for team, func_name, func in checks:
-        check_id = str(uuid.uuid4())
+
+@functools.lru_cache(maxsize=None)
+def wants_index(func):
+    """True when a check opts into the shared ModelIndex via an `index` parameter."""
+    try:
+        return "index" in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def declared_types(func):
+    """IFC types a check declares it reads, e.g. ("IfcDoor", "IfcWall"); () if none."""
+    types = getattr(func, "ifc_types", None)
+    return (types,) if isinstance(types, str) else tuple(types or ())
+
+
+def _too_large(ifc_path, model_key, memory):
+    if cached_model(model_key) is not None:
+        return False  # already parsed
+    size = os.path.getsize(ifc_path)
+    return (SUBSET_MIN_MB and size >= SUBSET_MIN_MB * MB) or not memory.fits(size * MODEL_SIZE_FACTOR)
+
+
+def run_check(func, model, profile=False):
+    """Run one check function.
+
+    Returns (kind, payload, stats): ("ok", elements, stats), ("error",
+    message, stats) or, on MemoryError, ("oom", message, stats). `stats`
+    holds wall/CPU time, the growth of the process peak RSS during the check
+    and, when `profile` is set, a cProfile report of the top functions by
+    cumulative time.
+    """
+    from model_index import get_index  # numpy + ifcopenshell.util, only once checks run
+    profiler = cProfile.Profile() if profile else None
+    rss_before = _maxrss_kb()
+    cpu_start, wall_start = time.thread_time(), time.perf_counter()
+    try:
+        if profiler:
+            profiler.enable()
         try:
-            elements = func(model)
-            status = _aggregate_status(elements)
-            summary = _build_summary(elements)
-
-            check_results.append({
-                "id": check_id,
-                "job_id": job_id,
-                "project_id": project_id,
-                "check_name": func_name,
-                "team": team,
-                "status": status,
-                "summary": summary,
-                "has_elements": 1 if elements else 0,
-                "created_at": int(time.time() * 1000),
-            })
-
-            for el in elements:
-                row = {"id": str(uuid.uuid4()), "check_result_id": check_id}
-                for field in TEAM_FIELDS:
-                    row[field] = el.get(field)
-                element_results.append(row)
-        except Exception as exc:
-            check_results.append({
-                "id": check_id,
-                "job_id": job_id,
-                "project_id": project_id,
-                "check_name": func_name,
-                "team": team,
-                "status": "error",
-                "summary": str(exc)[:200],
-                "has_elements": 0,
-                "created_at": int(time.time() * 1000),
-            })
-
-    return {"check_results": check_results, "element_results": element_results}
+            if wants_index(func):
+                index = model.index if isinstance(model, revisions.ModelView) else get_index(model)
+                elements = func(model, index=index)
+            else:
+                elements = func(model)
+        finally:
+            if profiler:
+                profiler.disable()
+        if not isinstance(elements, list) or not all(isinstance(e, dict) for e in elements):
+            raise TypeError(f"{func.__name__} must return list[dict]")
+        kind, payload = "ok", elements
+    except MemoryError:
+        kind, payload = "oom", "Out of memory"
+    except Exception as exc:
+        kind, payload = "error", str(exc)[:200]
+    stats = {
+        "duration_ms": round((time.perf_counter() - wall_start) * 1000, 1),
+        "cpu_ms": round((time.thread_time() - cpu_start) * 1000, 1),
+        "mem_peak_delta_kb": max(0, _maxrss_kb() - rss_before),
+    }
+    if profiler:
+        stats["profile"] = _profile_text(profiler)
+    return kind, payload, stats
+
+
+def _build_result(job_id, project_id, team, func_name, outcome, fingerprint=None):
+    """Turn one check outcome into its check_results row and a ResultBuffer of its elements."""
+    kind, payload, stats = outcome
+    check_id = str(uuid.uuid4())
+    elements = payload if kind == "ok" else []
+    check_row = {
+        "id": check_id,
+        "job_id": job_id,
+        "project_id": project_id,
+        "check_name": func_name,
+        "team": team,
+        "status": _aggregate_status(elements) if kind == "ok" else kind,  # error | timeout | oom
+        "summary": _build_summary(elements) if kind == "ok" else payload,
+        "has_elements": 1 if elements else 0,
+        "created_at": int(time.time() * 1000),
+        "duration_ms": stats.get("duration_ms"),
+        "cpu_ms": stats.get("cpu_ms"),
+        "mem_peak_delta_kb": stats.get("mem_peak_delta_kb"),
+        "cached": bool(stats.get("cached")),
+        "incremental": bool(stats.get("incremental")),
+        "fingerprint": fingerprint,
+    }
+    if "duration_ms" in stats:
+        metrics.CHECK_SECONDS.observe(stats["duration_ms"] / 1000, team=team, check=func_name)
+    element_rows = ResultBuffer()
+    element_rows.append_check(check_id, elements)
+    # Per-status element counts, so dashboards can draw KPIs without fetching rows
+    check_row["status_counts"] = element_rows.counts("check_status")
+    return check_row, element_rows
+
+
+class JobCancelled(Exception):
+    """Raised inside run_all_checks when the job was cancelled."""
+
+
+def _run_in_process(model, checks, workers, should_cancel, on_outcome, on_start, profile):
+    """Run `checks` on an open model: serially, or each in a sandboxed child."""
+    if CHECK_ISOLATION:
+        from sandbox import run_checks_isolated
+        run_checks_isolated(model, checks, workers, CHECK_TIMEOUT, should_cancel,
+                            on_outcome, on_start, profile)
+        return
+    for i, (_, _, func) in enumerate(checks):
+        if should_cancel and should_cancel():
+            raise JobCancelled()
+        on_start(i)
+        on_outcome(i, run_check(func, model, profile))
+
+
+def _execute(ifc_path, checks, workers, model_key, should_cancel, on_outcome, on_start, profile):
+    """Run `checks`, calling on_start(i) / on_outcome(i, outcome) around each one."""
+    if workers > 0 and len(checks) > 1 and not CHECK_ISOLATION:
+        from parallel import run_checks_parallel
+        if model_key:
+            open_model(ifc_path, model_key)  # cache in the parent; forked workers inherit it
+        run_checks_parallel(ifc_path, checks, workers, CHECK_TIMEOUT, model_key,
+                            should_cancel, on_outcome, on_start, profile)
+        return
+    _run_in_process(open_model(ifc_path, model_key), checks, workers, should_cancel,
+                    on_outcome, on_start, profile)
+
+
+def run_all_checks(ifc_path, job_id, project_id, workers=None, model_key=None,
+                   should_cancel=None, on_progress=None, on_check_start=None, profile=None,
+                   previous_job=None):
+    """Run every discovered check.
+
+    `model_key` (content hash) enables the model cache and result memoization:
+    checks whose source and defaults are unchanged since a previous run on the
+    same model are not re-run; their stored elements are re-emitted with new ids.
+    `should_cancel` is polled between checks; when it returns true the run
+    stops with JobCancelled. `element_results` is a columnar ResultBuffer that
+    iterates as the usual row dicts. `on_progress(check_row, element_rows, done, total)`
+    is called as soon as each check's results exist, `on_check_start(team,
+    check_name)` just before a check runs. With `profile` (default:
+    IFCORE_PROFILE_CHECKS) a cProfile report per check is returned under
+    "profiles", keyed by check result id.
+
+    With `previous_job` (a finished job on an earlier revision of the model)
+    element-local checks are re-run only on the products that changed since
+    (see revisions.py) and the result carries a "revision" report.
+
+    "memory" reports the job's peak RSS. Models too large to parse whole are
+    reduced to the IFC types the checks declare (checks declaring none get an
+    error row), and the run stops with MemoryCapExceeded once it grows past
+    IFCORE_JOB_MEMORY_MB.
+    """
+    checks = discover_checks()
+    workers = CHECK_WORKERS if workers is None else workers
+    profile = PROFILE_CHECKS if profile is None else profile
+    profiles = {}
+    fingerprints = [check_fingerprint(team, name) for team, name, _ in checks]
+    memo_keys = [result_cache.result_key(model_key, fp) for fp in fingerprints]
+    slots = [None] * len(checks)  # (check_row, element_rows) in registry order
+
+    def finish(i, outcome, memoize=True):
+        team, func_name, _ = checks[i]
+        if memoize and outcome[0] == "ok":
+            result_cache.put(memo_keys[i], outcome[1])
+        slots[i] = _build_result(job_id, project_id, team, func_name, outcome, fingerprints[i])
+        if outcome[2].get("profile"):
+            profiles[slots[i][0]["id"]] = outcome[2]["profile"]
+        if on_progress:
+            done = sum(1 for slot in slots if slot is not None)
+            on_progress(*slots[i], done, len(checks))
+
+    for i, key in enumerate(memo_keys):
+        elements = result_cache.get(key)
+        if elements is not None:
+            finish(i, ("ok", elements, {"cached": True}), memoize=False)
+
+    pending = [i for i, slot in enumerate(slots) if slot is None]
+    if len(pending) < len(checks):
+        logger.info(f"[{job_id}] {len(checks) - len(pending)} check(s) served from result cache")
+
+    memory = JobMemory()
+    should_cancel = memory.guard(should_cancel)
+    open_path, open_key, subset, workdir = ifc_path, model_key, None, None
+    revision = None
+    memory.start()
+    try:
+        large = bool(pending) and _too_large(ifc_path, model_key, memory)
+        if large:
+            import step_subset  # numpy; only for oversized models
+            for i in [i for i in pending if not declared_types(checks[i][2])]:
+                finish(i, ("error", "Model too large to load in full and the check declares no ifc_types",
+                           {}), memoize=False)
+            pending = [i for i in pending if slots[i] is None]
+            if pending:
+                types = sorted({t for i in pending for t in declared_types(checks[i][2])})
+                workdir = tempfile.mkdtemp(prefix="ifcore-subset-")
+                open_path = os.path.join(workdir, "model.ifc")
+                subset = step_subset.extract(ifc_path, types, open_path)
+                if model_key:
+                    open_key = hashlib.sha256(f"{model_key}:{','.join(types)}".encode()).hexdigest()
+                logger.info(f"[{job_id}] large model: loading {subset['kept']} of {subset['entities']} "
+                            f"entities for {len(types)} IFC type(s)")
+        if pending:
+            memory.ensure_fits(os.path.getsize(open_path) * MODEL_SIZE_FACTOR,
+                               "the subset of the model" if subset else "the model")
+
+        if previous_job is not None and large:
+            # A subset lacks every product outside the declared types, which a diff
+            # would count as removed; such jobs run in full without a revision report
+            logger.info(f"[{job_id}] large model: not diffing against job {previous_job['job_id']}")
+        elif previous_job is not None:
+            model = open_model(open_path, open_key)
+            revision = revisions.diff_against(previous_job, model, open_key)
+            local = [i for i in pending if revisions.element_local(checks[i][2])
+                     and revision.can_reuse(*checks[i][:2], fingerprints[i])]
+            if local:
+                logger.info(f"[{job_id}] {len(revision.rechecked)} changed product(s); "
+                            f"{len(local)} element-local check(s) re-run on those only")
+
+                def start_local(n):
+                    if on_check_start:
+                        on_check_start(*checks[local[n]][:2])
+
+                def finish_local(n, outcome):
+                    kind, payload, stats = outcome
+                    if kind == "ok":
+                        payload, stats["incremental"] = revision.merge(*checks[local[n]][:2], payload), True
+                    finish(local[n], (kind, payload, stats))
+
+                _run_in_process(revision.view(model), [checks[i] for i in local], workers,
+                                should_cancel, finish_local, start_local, profile)
+                pending = [i for i in pending if i not in local]
+
+        if pending:
+            def start(n):
+                if on_check_start:
+                    on_check_start(*checks[pending[n]][:2])
+
+            _execute(open_path, [checks[i] for i in pending], workers, open_key, should_cancel,
+                     lambda n, outcome: finish(pending[n], outcome), start, profile)
+    finally:
+        memory.stop()
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    element_results = ResultBuffer()
+    for _, rows in slots:
+        element_results.extend(rows)
+    results = {"check_results": [check_row for check_row, _ in slots],
+               "element_results": element_results}
+    if profiles:
+        results["profiles"] = profiles
+    if revision is not None:
+        results["revision"] = revision.report(slots)
+    results["memory"] = {**memory.report(), "subset": subset}
+    return results
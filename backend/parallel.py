@@ -0,0 +1,158 @@
+"""Parallel check execution over a process pool.
+
+Each worker opens the IFC model once in its initializer and keeps it for the
+whole job. Checks are dispatched at most `workers` at a time so every
+in-flight check has a known start time; a check exceeding `timeout` seconds
+gets a timeout row and the pool is recycled (a stuck worker cannot be
+interrupted any other way), with the other in-flight checks resubmitted.
+Checks caught in a crashed pool are retried once. Per-check CPU and memory
+limits need isolated mode (sandbox.py).
+"""
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+from model_cache import cached_model
+
+logger = logging.getLogger("ifcore")
+
+CANCEL_POLL_SECONDS = 1.0
+
+_worker_model = None
+_worker_checks: dict = {}
+
+
+def _prepare_fork():
+    """Build the check registry and finish the heavy imports before forking.
+
+    Otherwise every worker imports numpy and ifcopenshell.util again after
+    the fork, and a fork taken while another thread (the startup warm-up)
+    holds an import lock leaves that lock held forever in the child.
+    Shared by the pool, sandbox and batch paths.
+    """
+    from orchestrator import discover_checks
+    discover_checks()
+    import ifcopenshell  # noqa: F401
+    import model_index  # noqa: F401
+
+
+def _init_worker(ifc_path, model_key):
+    global _worker_model
+    from orchestrator import discover_checks
+    # Under fork the parent's model cache is inherited copy-on-write
+    _worker_model = cached_model(model_key)
+    if _worker_model is None:
+        import ifcopenshell
+        _worker_model = ifcopenshell.open(ifc_path)
+    _worker_checks.update({(team, name): func for team, name, func in discover_checks()})
+
+
+def _run_in_worker(team, func_name, profile):
+    from orchestrator import run_check
+    return run_check(_worker_checks[(team, func_name)], _worker_model, profile)
+
+
+def _mp_context():
+    # fork inherits the already-imported check registry; fall back to spawn elsewhere
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+
+
+def _new_pool(ifc_path, workers, model_key):
+    return ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context(),
+                               initializer=_init_worker, initargs=(ifc_path, model_key))
+
+
+def _pool_state(pool):
+    """(worker processes, broken flag) of a ProcessPoolExecutor.
+
+    Neither is public API, so this is the one place reading the private
+    attributes, defensively: without them a stuck pool is only shut down,
+    not killed, and a broken one is noticed through its futures instead.
+    """
+    processes = getattr(pool, "_processes", None) or {}
+    return list(processes.values()), bool(getattr(pool, "_broken", False))
+
+
+def _kill_pool(pool):
+    for proc in _pool_state(pool)[0]:
+        proc.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_checks_parallel(ifc_path, checks, workers, timeout, model_key=None,
+                        should_cancel=None, on_outcome=None, on_start=None, profile=False):
+    """Run `checks` (registry tuples) in a process pool.
+
+    Returns one outcome per check, in the same order as `checks`, and calls
+    `on_start(i)` / `on_outcome(i, outcome)` as each one is first dispatched
+    and finishes (a check resubmitted to a recycled pool is not started
+    again). Raises JobCancelled (and kills the pool) once `should_cancel()`
+    turns true.
+    """
+    from orchestrator import JobCancelled
+    _prepare_fork()
+    outcomes = [None] * len(checks)
+    todo = list(range(len(checks)))
+    workers = min(workers, len(checks))
+    pool = _new_pool(ifc_path, workers, model_key)
+    running = {}  # future -> (index, started_at)
+    retried = set()
+    dispatched = set()
+    try:
+        while todo or running:
+            while todo and len(running) < workers:
+                i = todo.pop(0)
+                team, func_name, _ = checks[i]
+                running[pool.submit(_run_in_worker, team, func_name, profile)] = (i, time.monotonic())
+                if on_start and i not in dispatched:
+                    on_start(i)
+                dispatched.add(i)
+
+            earliest = min(started for _, started in running.values())
+            remaining = max(0.0, earliest + timeout - time.monotonic())
+            done, _ = wait(running, timeout=min(remaining, CANCEL_POLL_SECONDS),
+                           return_when=FIRST_COMPLETED)
+            if should_cancel and should_cancel():
+                raise JobCancelled()
+            for fut in done:
+                i, _ = running.pop(fut)
+                try:
+                    outcomes[i] = fut.result()
+                except BrokenProcessPool as exc:
+                    # One crashing worker breaks every in-flight future; retry each once
+                    if i not in retried:
+                        retried.add(i)
+                        todo.insert(0, i)
+                        continue
+                    outcomes[i] = ("error", f"worker crashed: {exc}"[:200], {})
+                except Exception as exc:
+                    # e.g. an outcome that cannot be pickled back: an error row, like sandbox._child
+                    outcomes[i] = ("error", f"check failed in worker: {type(exc).__name__}: {exc}"[:200], {})
+                if on_outcome:
+                    on_outcome(i, outcomes[i])
+
+            now = time.monotonic()
+            expired = [f for f, (_, started) in running.items() if now - started >= timeout]
+            for fut in expired:
+                i, started = running.pop(fut)
+                team, func_name, _ = checks[i]
+                logger.warning(f"[parallel] {team}/{func_name} timed out after {timeout:.0f}s")
+                outcomes[i] = ("timeout", f"Timed out after {timeout:.0f}s",
+                               {"duration_ms": round((now - started) * 1000, 1)})
+                if on_outcome:
+                    on_outcome(i, outcomes[i])
+            if expired or _pool_state(pool)[1]:
+                # Recycle the pool; checks still in flight go back to the front of the queue
+                todo = [i for i, _ in running.values()] + todo
+                running.clear()
+                _kill_pool(pool)
+                pool = _new_pool(ifc_path, workers, model_key)
+    finally:
+        if running:
+            _kill_pool(pool)
+        else:
+            pool.shutdown(wait=True)
+    return outcomes
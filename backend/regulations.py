@@ -0,0 +1,103 @@
+"""Regulation knowledge base — Spanish / Catalan building bye-laws.
+
+Articles live in data/regulations.json (override with IFCORE_REGULATIONS);
+each has the official regulation, article/section reference, PDF link,
+content reference, compliance threshold, required action, Spanish/Catalan
+keywords and the IFC element types it applies to. At load time every article is tokenized
+(lowercased, accents folded so "protección" matches "proteccion", plural
+'s' dropped) into an inverted index, and `search()` ranks articles with
+BM25. A query naming an IFC type ("IfcBeam") goes straight to the articles
+mapped to that type.
+"""
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REGULATIONS_PATH = os.environ.get("IFCORE_REGULATIONS", os.path.join(BASE_DIR, "data", "regulations.json"))
+
+# Field weights: a term in the topic id counts more than one in the action text
+FIELD_WEIGHTS = {"id": 4, "keywords": 3, "regulation": 2, "reference": 2, "threshold": 1, "page_ref": 1, "action": 1}
+K1, B = 1.2, 0.75
+
+STOPWORDS = frozenset("""
+a al and are as at be by de del el els en es for from i in is la las les los must of on or per
+para por que the to un una with y
+""".split())
+
+
+def fold(text):
+    """Lowercase and strip accents (NFKD), e.g. "Instrucción" -> "instruccion"."""
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", fold(text)):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+class RegulationIndex:
+    def __init__(self, articles):
+        self.articles = articles
+        self._postings = {}  # term -> [(article index, weighted term frequency)]
+        self._lengths = []
+        self.by_ifc_type = {}  # lowercased IFC type -> article indexes
+        for n, article in enumerate(articles):
+            tf = Counter()
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(article.get(field, "")):
+                    tf[token] += weight
+            for token, freq in tf.items():
+                self._postings.setdefault(token, []).append((n, freq))
+            self._lengths.append(sum(tf.values()))
+            for ifc_type in article.get("ifc_types", []):
+                self.by_ifc_type.setdefault(ifc_type.lower(), []).append(n)
+        self._avg_length = sum(self._lengths) / len(self._lengths) if articles else 0.0
+        self._idf = {term: math.log(1 + (len(articles) - len(p) + 0.5) / (len(p) + 0.5))
+                     for term, p in self._postings.items()}
+
+    def topics(self):
+        return [article["id"] for article in self.articles]
+
+    def search(self, query, k=3):
+        """Top-k articles for a free-text query or IFC type, best first."""
+        scores = Counter()
+        for token in tokenize(query):
+            for n, freq in self._postings.get(token, ()):
+                norm = K1 * (1 - B + B * self._lengths[n] / self._avg_length)
+                scores[n] += self._idf[token] * freq * (K1 + 1) / (freq + norm)
+        # IFC types in the query rank their mapped articles above any text match
+        boost = max(scores.values(), default=0.0) + 1.0
+        for word in re.findall(r"ifc[a-z]+", query.lower()):
+            for n in self.by_ifc_type.get(word, ()):
+                scores[n] += boost
+        return [self.articles[n] for n, score in scores.most_common(k) if score > 0]
+
+
+_index = None
+
+
+def load(path=REGULATIONS_PATH):
+    """(Re)build the index from the data file."""
+    global _index
+    with open(path, encoding="utf-8") as f:
+        _index = RegulationIndex(json.load(f))
+    return _index
+
+
+def get_index():
+    return _index or load()
+
+
+def search(query, k=3):
+    return get_index().search(query, k)
@@ -0,0 +1,85 @@
+"""On-disk memo of check results per (model hash, check fingerprint).
+
+When only one team changes their checker, every other check's element list
+is served from here instead of being recomputed. Entries live in a SQLite
+file and the least recently used ones are evicted once the stored payload
+exceeds IFCORE_RESULT_CACHE_MB. Set it to 0 to disable memoization.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+
+logger = logging.getLogger("ifcore")
+
+CACHE_DIR = os.environ.get("IFCORE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ifcore-cache"))
+RESULT_CACHE_MB = int(os.environ.get("IFCORE_RESULT_CACHE_MB", "256"))
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+_initialized = False
+
+
+def _connect():
+    global _initialized
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(CACHE_DIR, "results.sqlite3"), timeout=10)
+    if not _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, "
+                     "payload BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        _initialized = True
+    return conn
+
+
+def result_key(model_key, fingerprint):
+    if not (RESULT_CACHE_MB and model_key and fingerprint):
+        return None
+    return hashlib.sha256(f"{model_key}:{fingerprint}".encode()).hexdigest()
+
+
+def get(key):
+    """Return the memoized element list for `key`, or None."""
+    if key is None:
+        return None
+    with _lock, _connect() as conn:
+        row = conn.execute("SELECT payload FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            _stats["misses"] += 1
+            return None
+        conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        _stats["hits"] += 1
+    return json.loads(zlib.decompress(row[0]))
+
+
+def put(key, elements):
+    if key is None:
+        return
+    payload = zlib.compress(json.dumps(elements, default=str).encode())
+    budget = RESULT_CACHE_MB * 1024 * 1024
+    if len(payload) > budget:
+        return
+    with _lock, _connect() as conn:
+        conn.execute("INSERT OR REPLACE INTO results (key, payload, size, last_used) VALUES (?, ?, ?, ?)",
+                     (key, payload, len(payload), time.time()))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        while total > budget:
+            oldest = conn.execute("SELECT key, size FROM results ORDER BY last_used LIMIT 1").fetchone()
+            conn.execute("DELETE FROM results WHERE key = ?", (oldest[0],))
+            total -= oldest[1]
+
+
+def stats():
+    try:
+        with _lock, _connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+    except sqlite3.Error as exc:
+        logger.warning(f"[result-cache] stats unavailable: {exc}")
+        entries, size = None, None
+    return {**_stats, "entries": entries, "stored_bytes": size, "budget_bytes": RESULT_CACHE_MB * 1024 * 1024}
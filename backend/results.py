@@ -0,0 +1,216 @@
+"""Columnar element_results buffer.
+
+Instead of one dict per flagged element, a job keeps one list per field.
+Low-cardinality string values (`element_type`, `check_status`,
+`required_value`, …) are interned so repeated strings share one object, and
+row ids are derived as `{check_result_id}-{ordinal}` rather than stored, so
+no uuid4 call or id string is needed per row. Rows loaded with ids of their
+own (`from_rows`, e.g. from D1) keep them in an `id` column.
+
+The buffer still behaves like the old list of row dicts (len, iteration,
+indexing), and `to_columns()` gives the compact column-oriented wire format
+served by `GET /jobs/{job_id}?format=columnar`. Rows are indexed as they
+are stored (per-check row spans, posting lists for INDEXED_COLUMNS) so
+`select()` can page through filtered rows without scanning the whole job.
+"""
+import heapq
+import sys
+from array import array
+from bisect import bisect_right
+from itertools import islice
+
+TEAM_FIELDS = [
+    "element_id", "element_type", "element_name", "element_name_long",
+    "check_status", "actual_value", "required_value", "comment", "log",
+]
+# Columns dictionary-encoded on the wire (few distinct values per job)
+DICT_COLUMNS = ("check_result_id", "element_type", "check_status", "required_value")
+# Columns with posting lists (value -> row positions) for filtering
+INDEXED_COLUMNS = ("element_type", "check_status")
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class ResultBuffer:
+    def __init__(self):
+        self._cols = {field: [] for field in ["check_result_id"] + TEAM_FIELDS}
+        self._spans = {}  # check_result_id -> (first row, row count)
+        self._postings = {field: {} for field in INDEXED_COLUMNS}
+        self._ids = None  # explicit row ids (None entries: derived), only once any row has one
+        self._len = 0
+
+    def append_check(self, check_id, elements):
+        """Append a check's element dicts (team schema) under `check_id`."""
+        if not elements:
+            return
+        check_id = _intern(check_id)
+        cols = self._cols
+        for el in elements:
+            for field in TEAM_FIELDS:
+                cols[field].append(_intern(el.get(field)))
+        cols["check_result_id"].extend([check_id] * len(elements))
+        if self._ids is not None:
+            self._ids.extend([None] * len(elements))
+        self._publish(len(elements))
+
+    def extend(self, other):
+        n = len(other)
+        for field, values in other._cols.items():
+            self._cols[field].extend(values[:n])
+        if self._ids is not None or other._ids is not None:
+            if self._ids is None:
+                self._ids = [None] * self._len
+            self._ids.extend(other._ids[:n] if other._ids is not None else [None] * n)
+        self._publish(n)
+
+    def _publish(self, n):
+        """Index rows [len, len + n) and make them visible; readers never see half a row."""
+        start, stop = self._len, self._len + n
+        for field in INDEXED_COLUMNS:
+            postings, values = self._postings[field], self._cols[field]
+            for i in range(start, stop):
+                positions = postings.get(values[i])
+                if positions is None:
+                    positions = postings[values[i]] = array("L")
+                positions.append(i)
+        ids = self._cols["check_result_id"]
+        for i in range(start, stop):
+            first, count = self._spans.get(ids[i], (i, 0))
+            self._spans[ids[i]] = (first, count + 1)
+        self._len = stop
+
+    def __len__(self):
+        return self._len
+
+    def row(self, i):
+        check_id = self._cols["check_result_id"][i]
+        row_id = self._ids[i] if self._ids is not None else None
+        if row_id is None:
+            row_id = f"{check_id}-{i - self._spans[check_id][0]}"
+        row = {"id": row_id, "check_result_id": check_id}
+        for field in TEAM_FIELDS:
+            row[field] = self._cols[field][i]
+        return row
+
+    def rows(self, start=0, stop=None):
+        stop = self._len if stop is None else min(stop, self._len)
+        return [self.row(i) for i in range(start, stop)]
+
+    def __iter__(self):
+        return iter(self.rows())
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.row(n) for n in range(*i.indices(self._len))]
+        return self.row(i if i >= 0 else self._len + i)
+
+    def column(self, field):
+        return self._cols[field][:self._len]
+
+    def counts(self, field):
+        """Rows per value of an indexed column, e.g. counts("check_status")."""
+        n = self._len
+        counts = {}
+        for value, positions in list(self._postings[field].items()):
+            count = bisect_right(positions, n - 1)
+            if count:
+                counts[value] = count
+        return counts
+
+    def select(self, filters=None, after=-1, limit=100):
+        """Row positions after `after` matching every filter, at most `limit`.
+
+        `filters` maps a column to a collection of accepted values (OR within a
+        column, AND across columns). The most selective indexed column drives
+        the scan; the others are checked per row. Returns (positions, more).
+        """
+        n = self._len
+        sources, sizes = {}, {}
+        for field, values in (filters or {}).items():
+            values = set(values)
+            if field == "check_result_id":
+                spans = [self._spans[v] for v in values if v in self._spans]
+                sources[field] = [range(max(first, after + 1), first + count) for first, count in spans]
+                sizes[field] = sum(count for _, count in spans)
+            elif field in INDEXED_COLUMNS:
+                postings = [self._postings[field][v] for v in values if v in self._postings[field]]
+                sources[field] = [islice(p, bisect_right(p, after), None) for p in postings]
+                sizes[field] = sum(len(p) for p in postings)
+            else:
+                raise ValueError(f"column {field!r} is not indexed")
+        if sources:
+            driver = min(sizes, key=sizes.get)
+            candidates = heapq.merge(*sources[driver])
+            others = [(self._cols[f], set(filters[f])) for f in sources if f != driver]
+        else:
+            candidates, others = range(after + 1, n), []
+        out = []
+        for i in candidates:
+            if i >= n:
+                break
+            if all(col[i] in accepted for col, accepted in others):
+                if len(out) == limit:
+                    return out, True
+                out.append(i)
+        return out, False
+
+    def to_columns(self):
+        """Column-oriented form; DICT_COLUMNS as {"values": [...], "codes": [...]}."""
+        n = self._len
+        columns = {}
+        for field, values in self._cols.items():
+            values = values[:n]
+            if field in DICT_COLUMNS:
+                codes, uniques = [], {}
+                for v in values:
+                    codes.append(uniques.setdefault(v, len(uniques)))
+                columns[field] = {"values": list(uniques), "codes": codes}
+            else:
+                columns[field] = values
+        if self._ids is not None:
+            columns["id"] = self._ids[:n]  # null entries follow the "id" template
+        return {"format": "columnar", "length": n, "id": "{check_result_id}-{ordinal}",
+                "first_row": {check_id: first for check_id, (first, _) in list(self._spans.items())
+                              if first < n},
+                "columns": columns}
+
+    @classmethod
+    def from_columns(cls, data):
+        buf = cls()
+        for field, values in data["columns"].items():
+            if field == "id":
+                buf._ids = list(values)
+                continue
+            if isinstance(values, dict):
+                lookup = values["values"]
+                values = [lookup[code] for code in values["codes"]]
+            buf._cols[field] = [_intern(v) for v in values]
+        buf._publish(data["length"])
+        return buf
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Buffer of row dicts in any order; each check's rows are grouped
+        (spans need them contiguous) and rows keep their own `id`s."""
+        groups = {}
+        for row in rows:
+            groups.setdefault(row.get("check_result_id"), []).append(row)
+        buf = cls()
+        for check_id, group in groups.items():
+            buf.append_check(check_id, group)
+        if any(row.get("id") is not None for group in groups.values() for row in group):
+            buf._ids = [row.get("id") for group in groups.values() for row in group]
+        return buf
+
+
+def as_rows(element_results):
+    """Row-dict list for either a ResultBuffer or an already row-shaped list."""
+    return element_results.rows() if isinstance(element_results, ResultBuffer) else list(element_results)
+
+
+def as_columns(element_results):
+    if not isinstance(element_results, ResultBuffer):
+        element_results = ResultBuffer.from_rows(element_results)
+    return element_results.to_columns()
@@ -0,0 +1,287 @@
+"""Differential re-checks between revisions of a model.
+
+Revision N+1 of a model usually changes a few percent of the products of
+revision N. A job started with `previous_job_id` compares every product of
+the new model with that job's model by GlobalId and content signature.
+Checks that declare themselves element-local
+
+    def check_door_width(model, min_width=800):
+        ...
+    check_door_width.element_local = True
+
+are then re-run only on added and changed products: `model.by_type()` and
+`index.by_type()` yield just those, and the rows of unchanged products are
+carried over from the previous job. Every other check runs in full. The
+job's `revision` entry counts added / removed / changed products and lists
+the elements whose compliance status changed between the two jobs.
+
+A product's signature hashes its attributes and everything they reference
+(placement, representation, …) down to, but not into, other objects, plus
+the relationships attaching it to property sets, materials, its type, its
+container and its openings. GlobalId and OwnerHistory never enter a
+signature, so re-exporting an unchanged model keeps them equal. Signatures
+are stored in the result cache per model hash.
+"""
+import hashlib
+import logging
+
+import result_cache
+from model_cache import cached_model
+from results import TEAM_FIELDS, ResultBuffer
+
+logger = logging.getLogger("ifcore")
+
+SIGNATURES_FINGERPRINT = "revision-signatures:1"
+MAX_STATUS_CHANGES = 1000
+
+
+def element_local(func):
+    """True when a check declares `element_local = True`: each row names one
+    element (no summary rows), depends on that element alone, and the check
+    finds its elements via by_type()."""
+    return getattr(func, "element_local", False) is True
+
+
+# ── signatures ──────────────────────────────────────────────────────────────
+class _Hasher:
+    def __init__(self, entity_class):
+        self._entity_class = entity_class
+        self._memo = {}   # entity id -> digest
+        self._kinds = {}  # type name -> (first hashed attribute, is IfcObject, is IfcObjectDefinition)
+
+    def _kind(self, entity):
+        name = entity.is_a()
+        kind = self._kinds.get(name)
+        if kind is None:
+            # IfcRoot attributes 0 and 1 are GlobalId and OwnerHistory
+            kind = self._kinds[name] = (2 if entity.is_a("IfcRoot") else 0, entity.is_a("IfcObject"),
+                                        entity.is_a("IfcObjectDefinition"))
+        return name, kind
+
+    def entity(self, entity):
+        eid = entity.id()
+        digest = self._memo.get(eid) if eid else None
+        if digest is None:
+            name, (start, _, _) = self._kind(entity)
+            text = name + "(" + ",".join([self.value(entity[n]) for n in range(start, len(entity))]) + ")"
+            digest = hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+            if eid:
+                self._memo[eid] = digest
+        return digest
+
+    def value(self, value):
+        if type(value) is tuple:
+            return "(" + ",".join([self.value(v) for v in value]) + ")"
+        if isinstance(value, self._entity_class):
+            # Other objects are diffed themselves; only who they are matters here
+            return "#" + value[0] if self._kind(value)[1][1] else self.entity(value)
+        return repr(value)
+
+    def _is_object_definition(self, value):
+        return isinstance(value, self._entity_class) and self._kind(value)[1][2]
+
+    def relationship(self, rel):
+        """(digest, attached objects); collections of objects count as '*' so
+        adding a wall to a storey does not change the other walls' signatures."""
+        parts, attached = [], []
+        for n in range(2, len(rel)):
+            value = rel[n]
+            if type(value) is tuple and value and all(self._is_object_definition(v) for v in value):
+                attached.extend(value)
+                parts.append("*")
+            else:
+                if self._is_object_definition(value):
+                    attached.append(value)
+                parts.append(self.value(value))
+        text = rel.is_a() + "(" + ",".join(parts) + ")"
+        return hashlib.blake2b(text.encode(), digest_size=8).hexdigest(), attached
+
+
+def signatures(model):
+    """{GlobalId: signature} for every IfcProduct in `model`."""
+    import ifcopenshell
+    hasher = _Hasher(ifcopenshell.entity_instance)
+    rels, type_of = {}, {}  # object id -> relationship digests; product id -> type object
+    for rel in model.by_type("IfcRelationship"):
+        digest, attached = hasher.relationship(rel)
+        for obj in attached:
+            rels.setdefault(obj.id(), []).append(digest)
+        if rel.is_a("IfcRelDefinesByType"):
+            for obj in rel.RelatedObjects:
+                type_of[obj.id()] = rel.RelatingType
+    out = {}
+    for product in model.by_type("IfcProduct"):
+        parts = [hasher.entity(product)] + sorted(rels.get(product.id(), ()))
+        type_obj = type_of.get(product.id())
+        if type_obj is not None:
+            parts += sorted(rels.get(type_obj.id(), ()))
+        out[product.GlobalId] = hashlib.blake2b(":".join(parts).encode(), digest_size=8).hexdigest()
+    return out
+
+
+def stored_signatures(model_key):
+    return result_cache.get(result_cache.result_key(model_key, SIGNATURES_FINGERPRINT))
+
+
+def model_signatures(model, model_key):
+    """Signatures of `model`, computed once per model hash."""
+    sigs = stored_signatures(model_key)
+    if sigs is None:
+        sigs = signatures(model)
+        result_cache.put(result_cache.result_key(model_key, SIGNATURES_FINGERPRINT), sigs)
+    return sigs
+
+
+# ── views ───────────────────────────────────────────────────────────────────
+def _keep(entity, global_ids):
+    return not entity.is_a("IfcProduct") or entity.GlobalId in global_ids
+
+
+class ModelView:
+    """`model` whose by_type() yields only the products in `global_ids`
+    (entities that are not products pass through). Everything else is the
+    underlying ifcopenshell file."""
+
+    def __init__(self, model, global_ids):
+        self.model = model
+        self.global_ids = global_ids
+
+    def by_type(self, ifc_type, include_subtypes=True):
+        return [e for e in self.model.by_type(ifc_type, include_subtypes) if _keep(e, self.global_ids)]
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    @property
+    def index(self):
+        from model_index import get_index
+        return IndexView(get_index(self.model), self.global_ids)
+
+
+class IndexView:
+    """The full model's ModelIndex with by_type() filtered like ModelView;
+    property, spatial and geometry lookups stay shared with full runs."""
+
+    def __init__(self, index, global_ids):
+        self._index = index
+        self.global_ids = global_ids
+
+    def by_type(self, ifc_type, include_subtypes=True):
+        return tuple(e for e in self._index.by_type(ifc_type, include_subtypes) if _keep(e, self.global_ids))
+
+    def __getattr__(self, name):
+        return getattr(self._index, name)
+
+
+# ── diff and merge ──────────────────────────────────────────────────────────
+def _rows_by_check(job):
+    """(team, check_name) -> (check_row, element row dicts) of a finished job."""
+    buf = job.get("element_results") or []
+    if not isinstance(buf, ResultBuffer):
+        buf = ResultBuffer.from_rows(buf)
+    out = {}
+    for check_row in job.get("check_results", []):
+        positions, _ = buf.select({"check_result_id": [check_row["id"]]}, limit=len(buf) + 1)
+        out[(check_row["team"], check_row["check_name"])] = (check_row, [buf.row(i) for i in positions])
+    return out
+
+
+_SEVERITY = {"fail": 4, "blocked": 3, "warning": 2, "pass": 1, "log": 0}
+
+
+def _element_statuses(rows):
+    """element_id -> (worst status, element_type, element_name)."""
+    out = {}
+    for row in rows:
+        gid = row.get("element_id")
+        if gid is None:
+            continue
+        status = row.get("check_status")
+        seen = out.get(gid)
+        if seen is None or _SEVERITY.get(status, 0) > _SEVERITY.get(seen[0], 0):
+            out[gid] = (status, row.get("element_type"), row.get("element_name"))
+    return out
+
+
+class Revision:
+    """The diff between a previous job's model and the model being checked.
+
+    Without the previous revision's signatures (`before` is None) nothing is
+    re-checked incrementally, but status changes are still reported.
+    """
+
+    def __init__(self, previous_job, before, after):
+        self.previous_job_id = previous_job["job_id"]
+        self.previous = _rows_by_check(previous_job)
+        self.diffed = before is not None
+        before = before or {}
+        self.added = {g for g in after if g not in before} if self.diffed else set()
+        self.removed = {g for g in before if g not in after}
+        self.changed = {g for g, sig in after.items() if g in before and before[g] != sig}
+        self.unchanged = len(after) - len(self.added) - len(self.changed)
+        self.rechecked = self.added | self.changed
+        self.incremental = []  # check names re-run on rechecked products only
+
+    def can_reuse(self, team, check_name, fingerprint):
+        """True if the previous job ran this exact check version successfully."""
+        entry = self.previous.get((team, check_name))
+        return (self.diffed and entry is not None and entry[0]["status"] not in ("error", "timeout", "oom")
+                and fingerprint is not None and entry[0].get("fingerprint") == fingerprint)
+
+    def view(self, model):
+        return ModelView(model, self.rechecked)
+
+    def merge(self, team, check_name, elements):
+        """Previous rows of untouched products plus this run's rows of rechecked ones."""
+        self.incremental.append(check_name)
+        stale = self.rechecked | self.removed
+        kept = [{field: row[field] for field in TEAM_FIELDS} for row in self.previous[(team, check_name)][1]
+                if row["element_id"] is not None and row["element_id"] not in stale]
+        return kept + [row for row in elements if row.get("element_id") in self.rechecked]
+
+    def report(self, results):
+        """The job's `revision` entry: product counts and compliance changes.
+
+        `results` are (check_row, element rows) pairs of the new job.
+        """
+        check_changes, element_changes = [], []
+        for check_row, rows in results:
+            key = (check_row["team"], check_row["check_name"])
+            prev_row, prev_rows = self.previous.get(key, (None, []))
+            if prev_row is None or prev_row["status"] != check_row["status"]:
+                check_changes.append({"team": key[0], "check_name": key[1],
+                                      "before": prev_row and prev_row["status"], "after": check_row["status"]})
+            before, after = _element_statuses(prev_rows), _element_statuses(rows)
+            for gid in sorted(before.keys() | after.keys()):
+                old, new = before.get(gid), after.get(gid)
+                if (old and old[0]) != (new and new[0]):
+                    element_type, element_name = (new or old)[1:]
+                    element_changes.append({
+                        "team": key[0], "check_name": key[1], "element_id": gid,
+                        "element_type": element_type, "element_name": element_name,
+                        "before": old and old[0], "after": new and new[0]})
+        return {
+            "previous_job_id": self.previous_job_id,
+            "mode": "incremental" if self.incremental else "full",
+            **({"added": len(self.added), "removed": len(self.removed),
+                "changed": len(self.changed), "unchanged": self.unchanged} if self.diffed else {}),
+            "incremental_checks": self.incremental,
+            "check_status_changes": check_changes,
+            "status_changes": element_changes[:MAX_STATUS_CHANGES],
+            "status_changes_total": len(element_changes),
+        }
+
+
+def diff_against(previous_job, model, model_key):
+    """A Revision of `model` against `previous_job`. The previous signatures
+    come from the result cache, or from its model if still in the model cache."""
+    prev_key = previous_job.get("model_key")
+    before = stored_signatures(prev_key) if prev_key else None
+    if before is None and cached_model(prev_key) is not None:
+        before = model_signatures(cached_model(prev_key), prev_key)
+    # Stored even without a diff, so the next revision can be diffed against this one
+    after = model_signatures(model, model_key) if model_key else {}
+    if before is None or not model_key:
+        logger.info(f"[revision] no signatures for job {previous_job['job_id']}; running every check in full")
+        before = None
+    return Revision(previous_job, before, after)
@@ -0,0 +1,181 @@
+"""Isolated check execution: one supervised process per check.
+
+With IFCORE_CHECK_ISOLATION=1 each check runs in a child process forked
+from the job once the model is parsed, so it starts with the model (shared
+copy-on-write) and its checker module already loaded. Limits on the child:
+
+- CPU time (IFCORE_CHECK_CPU_SECONDS): RLIMIT_CPU, the kernel stops the
+  child with SIGXCPU.
+- Memory (IFCORE_CHECK_MEMORY_MB): RLIMIT_AS, as headroom over the address
+  space the child inherits, so allocations past it raise MemoryError.
+- Wall time (IFCORE_CHECK_TIMEOUT): the supervisor kills the child.
+
+A check hitting the CPU or wall limit gets a "timeout" row, one running out
+of memory (MemoryError, or killed by the kernel OOM killer) an "oom" row,
+each with the time and memory it used; the job goes on with the next check.
+Up to `workers` children run at once.
+"""
+import logging
+import math
+import os
+import pickle
+import resource
+import select
+import signal
+import time
+
+from parallel import CANCEL_POLL_SECONDS, _prepare_fork
+
+logger = logging.getLogger("ifcore")
+
+CHECK_CPU_SECONDS = float(os.environ.get("IFCORE_CHECK_CPU_SECONDS", "0"))
+CHECK_MEMORY_MB = int(os.environ.get("IFCORE_CHECK_MEMORY_MB", "0"))
+READ_CHUNK = 1 << 16
+
+
+def _statm():
+    """(virtual size, resident size) in bytes, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            size, resident = f.read().split()[:2]
+    except (OSError, ValueError):
+        return None
+    return int(size) * resource.getpagesize(), int(resident) * resource.getpagesize()
+
+
+def _lower_limit(which, value):
+    _, hard = resource.getrlimit(which)
+    if hard != resource.RLIM_INFINITY:
+        value = min(value, hard)
+    resource.setrlimit(which, (value, value if hard == resource.RLIM_INFINITY else hard))
+
+
+def _child(run_check, func, model, profile, cpu_seconds, memory_mb, fd):
+    """Forked child: apply the limits, run the check, pickle its outcome to `fd`."""
+    code = 1
+    try:
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        if cpu_seconds:
+            # CPU usage restarts at zero in a forked child
+            _lower_limit(resource.RLIMIT_CPU, math.ceil(cpu_seconds))
+        statm = _statm()
+        if memory_mb and statm:
+            _lower_limit(resource.RLIMIT_AS, statm[0] + memory_mb * 1024 * 1024)
+        outcome = run_check(func, model, profile)
+        try:
+            data = pickle.dumps(outcome, protocol=pickle.HIGHEST_PROTOCOL)
+        except MemoryError:
+            data = pickle.dumps(("oom", "Out of memory while returning results", outcome[2]))
+        except (pickle.PicklingError, TypeError, AttributeError) as exc:
+            data = pickle.dumps(("error", f"results are not serializable: {exc}"[:200], outcome[2]))
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        code = 0
+    finally:
+        os._exit(code)
+
+
+class _Child:
+    def __init__(self, run_check, func, model, profile, cpu_seconds, memory_mb):
+        statm = _statm()
+        self.rss_kb = statm[1] // 1024 if statm else 0
+        self.cpu_seconds = cpu_seconds
+        read_fd, write_fd = os.pipe()
+        self.pid = os.fork()
+        if self.pid == 0:
+            os.close(read_fd)
+            _child(run_check, func, model, profile, cpu_seconds, memory_mb, write_fd)
+        os.close(write_fd)
+        self.fd = read_fd
+        self.started = time.monotonic()
+        self.chunks = []
+
+    def read(self):
+        """Read what the child wrote; False once it closed its end."""
+        chunk = os.read(self.fd, READ_CHUNK)
+        self.chunks.append(chunk)
+        return bool(chunk)
+
+    def kill(self):
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def reap(self, timed_out=None):
+        """Wait for the child and turn its exit into an outcome."""
+        _, status, usage = os.wait4(self.pid, 0)
+        os.close(self.fd)
+        cpu = usage.ru_utime + usage.ru_stime
+        stats = {"duration_ms": round((time.monotonic() - self.started) * 1000, 1),
+                 "cpu_ms": round(cpu * 1000, 1),
+                 "mem_peak_delta_kb": max(0, usage.ru_maxrss - self.rss_kb)}
+        if timed_out is not None:
+            return "timeout", f"Timed out after {timed_out:.0f}s", stats
+        if os.WIFSIGNALED(status):
+            sig = os.WTERMSIG(status)
+            if sig == signal.SIGXCPU or (sig == signal.SIGKILL and self.cpu_seconds
+                                         and cpu >= self.cpu_seconds):
+                return "timeout", f"Exceeded the {self.cpu_seconds:.0f}s CPU time limit", stats
+            if sig == signal.SIGKILL:
+                return "oom", "Killed by the system, most likely out of memory", stats
+            return "error", f"Check process died with {signal.Signals(sig).name}", stats
+        try:
+            kind, payload, child_stats = pickle.loads(b"".join(self.chunks))
+        except (pickle.UnpicklingError, EOFError, ValueError):
+            return "error", f"Check process exited with code {os.WEXITSTATUS(status)}", stats
+        return kind, payload, {**stats, **child_stats}
+
+
+def run_checks_isolated(model, checks, workers, timeout, should_cancel=None, on_outcome=None,
+                        on_start=None, profile=False, cpu_seconds=CHECK_CPU_SECONDS,
+                        memory_mb=CHECK_MEMORY_MB):
+    """Run `checks` (registry tuples) on `model`, each in its own limited process.
+
+    Returns one outcome per check, in order, calling `on_start(i)` /
+    `on_outcome(i, outcome)` like parallel.run_checks_parallel. Raises
+    JobCancelled (and kills the running checks) once `should_cancel()` turns true.
+    """
+    from orchestrator import JobCancelled, run_check
+    _prepare_fork()
+    outcomes = [None] * len(checks)
+    todo = list(range(len(checks)))
+    running = {}  # read fd -> (index, _Child)
+
+    def finish(fd, timed_out=None):
+        i, child = running.pop(fd)
+        outcomes[i] = child.reap(timed_out)
+        if outcomes[i][0] in ("timeout", "oom"):
+            team, func_name, _ = checks[i]
+            logger.warning(f"[sandbox] {team}/{func_name}: {outcomes[i][1]}")
+        if on_outcome:
+            on_outcome(i, outcomes[i])
+
+    try:
+        while todo or running:
+            while todo and len(running) < max(1, workers):
+                i = todo.pop(0)
+                if on_start:
+                    on_start(i)
+                child = _Child(run_check, checks[i][2], model, profile, cpu_seconds, memory_mb)
+                running[child.fd] = (i, child)
+
+            earliest = min(child.started for _, child in running.values())
+            remaining = max(0.0, earliest + timeout - time.monotonic())
+            ready, _, _ = select.select(list(running), [], [], min(remaining, CANCEL_POLL_SECONDS))
+            for fd in ready:
+                if not running[fd][1].read():
+                    finish(fd)
+            if should_cancel and should_cancel():
+                raise JobCancelled()
+
+            now = time.monotonic()
+            for fd in [fd for fd, (_, child) in running.items() if now - child.started >= timeout]:
+                running[fd][1].kill()
+                finish(fd, timed_out=timeout)
+    finally:
+        for _, child in running.values():
+            child.kill()
+            child.reap()
+    return outcomes
@@ -0,0 +1,153 @@
+"""Job scheduler — bounded FIFO queue with a fixed number of job threads.
+
+Replaces FastAPI BackgroundTasks so a burst of uploads queues up instead of
+running every CPU-heavy job at once on the same GIL. When the queue is full
+`submit` refuses the job and the API answers 429 with a Retry-After estimate.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+
+import metrics
+
+logger = logging.getLogger("ifcore")
+
+MAX_CONCURRENT_JOBS = int(os.environ.get("IFCORE_MAX_CONCURRENT_JOBS", "1"))
+MAX_QUEUE = int(os.environ.get("IFCORE_MAX_QUEUE", "20"))
+
+
+class _QueuedJob:
+    def __init__(self, job_id, fn, args, on_cancel):
+        self.job_id = job_id
+        self.fn = fn
+        self.args = args
+        self.on_cancel = on_cancel
+        self.cancel_event = threading.Event()
+        self.admitted = threading.Event()  # set once submit's on_admit() returned
+        self.withdrawn = False  # on_admit() failed: never run it
+        self.enqueued_at = time.monotonic()
+
+
+class JobScheduler:
+    def __init__(self, max_concurrent=MAX_CONCURRENT_JOBS, max_queue=MAX_QUEUE):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._queue = deque()
+        self._running = {}  # job_id -> _QueuedJob
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopping = False
+        self._avg_job_seconds = 30.0  # EWMA, seeds the Retry-After estimate
+
+    def start(self):
+        self._stopping = False
+        for n in range(self.max_concurrent):
+            t = threading.Thread(target=self._loop, name=f"ifcore-job-{n}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            for job in self._running.values():
+                job.cancel_event.set()
+            self._cond.notify_all()
+        self._threads.clear()
+
+    def submit(self, job_id, fn, *args, on_cancel=None, on_admit=None):
+        """Queue `fn(*args, cancel_event=...)`. Returns False when the queue is full.
+
+        `on_admit()` runs once the job is accepted but before any worker can
+        start it, e.g. to record it as queued. It runs outside the scheduler
+        lock, so slow I/O there does not hold up the job threads; blocking,
+        so call submit from a thread rather than the event loop.
+        """
+        job = _QueuedJob(job_id, fn, args, on_cancel)
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                return False
+            self._queue.append(job)
+            self._cond.notify()
+        try:
+            if on_admit:
+                on_admit()
+        except BaseException:
+            job.withdrawn = True
+            with self._cond:
+                if job in self._queue:
+                    self._queue.remove(job)
+            raise
+        finally:
+            job.admitted.set()
+        return True
+
+    def is_full(self):
+        with self._cond:
+            return len(self._queue) >= self.max_queue
+
+    def position(self, job_id):
+        """1-based queue position, 0 if running, None if unknown to this process."""
+        with self._cond:
+            if job_id in self._running:
+                return 0
+            for n, job in enumerate(self._queue, 1):
+                if job.job_id == job_id:
+                    return n
+        return None
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job. Returns its previous state or None."""
+        with self._cond:
+            if job_id in self._running:
+                self._running[job_id].cancel_event.set()
+                return "running"
+            for job in self._queue:
+                if job.job_id == job_id:
+                    self._queue.remove(job)
+                    break
+            else:
+                return None
+        if job.on_cancel:
+            job.on_cancel()
+        return "queued"
+
+    def retry_after(self):
+        with self._cond:
+            waiting = len(self._queue) + len(self._running)
+        return max(1, math.ceil(self._avg_job_seconds * waiting / self.max_concurrent))
+
+    def stats(self):
+        with self._cond:
+            return {"running": len(self._running), "queued": len(self._queue),
+                    "max_concurrent": self.max_concurrent, "max_queue": self.max_queue,
+                    "avg_job_seconds": round(self._avg_job_seconds, 1)}
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                job = self._queue.popleft()
+                self._running[job.job_id] = job
+            job.admitted.wait()
+            if job.withdrawn:
+                with self._cond:
+                    self._running.pop(job.job_id, None)
+                continue
+            started = time.monotonic()
+            metrics.QUEUE_WAIT_SECONDS.observe(started - job.enqueued_at)
+            try:
+                job.fn(*job.args, cancel_event=job.cancel_event)
+            except Exception:
+                logger.exception(f"[{job.job_id}] job crashed")
+            finally:
+                elapsed = time.monotonic() - started
+                metrics.JOB_SECONDS.observe(elapsed)
+                with self._cond:
+                    self._running.pop(job.job_id, None)
+                    self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * elapsed
@@ -0,0 +1,131 @@
+"""Per-job search index over element results for the chat tools.
+
+The chat agent's `search_failing_elements` tool used to scan and lowercase
+every posted row on each call. `ElementSearchIndex` tokenizes the failing
+rows of a job once (element type, name and comment) into an inverted index,
+so a query is a few posting-list lookups whatever the size of the model.
+
+`job_search_index()` keeps the indexes of recently used jobs; a finished
+job's results never change, so follow-up questions skip the job store.
+"""
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from job_store import ACTIVE_STATUSES
+from results import ResultBuffer
+
+FAILING_STATUSES = ("fail", "warning", "blocked")
+MAX_CACHED_JOBS = 16
+
+_WORD = re.compile(r"[A-Z]?[a-z0-9]+|[A-Z]+(?![a-z])")
+
+
+def tokenize(text):
+    """Lowercased word tokens; CamelCase is split and a plural 's' dropped.
+
+    `IfcWallStandardCase` yields ifcwallstandardcase, wall, standard and case,
+    so 'wall', 'walls' and 'IfcWall' all find it.
+    """
+    if not text:
+        return set()
+    tokens = set()
+    for word in re.split(r"[^0-9A-Za-z]+", str(text)):
+        if not word:
+            continue
+        tokens.add(_normalize(word))
+        parts = _WORD.findall(word)
+        if len(parts) > 1:
+            tokens.update(_normalize(part) for part in parts if part.lower() != "ifc")
+    return tokens
+
+
+def _normalize(token):
+    token = token.lower()
+    return token[:-1] if len(token) > 3 and token.endswith("s") and not token.endswith("ss") else token
+
+
+class ElementSearchIndex:
+    def __init__(self, element_results):
+        buf = element_results
+        if not isinstance(buf, ResultBuffer):
+            buf = ResultBuffer.from_rows(element_results)
+        self._buf = buf
+        self.failing, _ = buf.select({"check_status": FAILING_STATUSES}, limit=len(buf) or 1)
+        postings = {}
+        names, types, comments = (buf.column(f) for f in ("element_name", "element_type", "comment"))
+        for i in self.failing:
+            for token in tokenize(types[i]) | tokenize(names[i]) | tokenize(comments[i]):
+                positions = postings.get(token)
+                if positions is None:
+                    positions = postings[token] = array("L")
+                positions.append(i)
+        self._postings = postings
+        self._vocab = sorted(postings)
+
+    def __len__(self):
+        return len(self.failing)
+
+    def _lookup(self, token):
+        """Rows holding an indexed word that starts with `token`."""
+        rows = set()
+        for n in range(bisect_left(self._vocab, token), len(self._vocab)):
+            if not self._vocab[n].startswith(token):
+                break
+            rows.update(self._postings[self._vocab[n]])
+        return rows
+
+    def search(self, query=""):
+        """Positions of failing rows matching every query word, in result order."""
+        # Whole query words; CamelCase parts only matter on the index side
+        words = {_normalize(w) for w in re.split(r"[^0-9A-Za-z]+", query or "") if w}
+        if not words:
+            return list(self.failing)
+        rows = None
+        for token in words:
+            found = self._lookup(token)
+            rows = found if rows is None else rows & found
+            if not rows:
+                return []
+        return sorted(rows)
+
+    def row(self, i):
+        return self._buf.row(i)
+
+
+_cache = OrderedDict()  # job_id -> (status, n_checks, n_rows, check_results, index, fingerprint)
+_cache_lock = threading.Lock()
+
+
+def job_search_index(job_id, load_job):
+    """(check_results, ElementSearchIndex, fingerprint) for a job, or None if
+    `load_job` finds none. The fingerprint changes whenever the results do.
+
+    Finished jobs are served from the cache without calling `load_job`;
+    running jobs are reloaded and re-indexed only when new check or element
+    rows have arrived.
+    """
+    with _cache_lock:
+        entry = _cache.get(job_id)
+        if entry and entry[0] not in ACTIVE_STATUSES:
+            _cache.move_to_end(job_id)
+            return entry[3:]
+    job = load_job(job_id)
+    if not job:
+        return None
+    elements = job.get("element_results", [])
+    check_results = job.get("check_results", [])
+    # Rows only ever get appended to a job, so their counts tell whether anything changed
+    key = (job.get("status"), len(check_results), len(elements))
+    if entry and entry[:3] == key:
+        return entry[3:]
+    fingerprint = "job:{}:{}:{}:{}".format(job_id, *key)
+    entry = (*key, check_results, ElementSearchIndex(elements), fingerprint)
+    with _cache_lock:
+        _cache[job_id] = entry
+        _cache.move_to_end(job_id)
+        while len(_cache) > MAX_CACHED_JOBS:
+            _cache.popitem(last=False)
+    return entry[3:]
@@ -0,0 +1,198 @@
+"""Bounding-volume hierarchy over element AABBs for proximity queries.
+
+Clearance and adjacency checks (doors near stairs, corridor widths, railings
+along slab edges) would otherwise compare every element pair. The BVH is
+built once per (types, storey) from the shared geometry cache and answers
+range, nearest-neighbour and ray-cast queries in roughly logarithmic time:
+
+    walls = index.spatial("IfcWall", storey=index.storey(door))
+    near = walls.within(door, 0.5)            # walls within 0.5 m of the door
+    hits = walls.raycast(origin, direction)   # [(distance, wall), ...]
+
+All coordinates are world-space metres, as produced by GeometryCache.
+Distances between boxes are Euclidean (the length of the gap between them)
+in within(), nearest() and pairs_within() alike.
+"""
+import heapq
+
+import numpy as np
+
+LEAF_SIZE = 8
+
+
+def _gaps(bmin, bmax, mins, maxs):
+    """Euclidean distance from the box [bmin, bmax] to each box of `mins`/`maxs` (0 if touching)."""
+    d = np.maximum(np.maximum(mins - bmax, bmin - maxs), 0)
+    return np.sqrt((d * d).sum(axis=-1))
+
+
+class SpatialIndex:
+    def __init__(self, elements, mins, maxs, geometry=None):
+        self.elements = list(elements)
+        self.geometry = geometry  # GeometryCache for the boxes of elements not in this index
+        self.mins = np.asarray(mins, dtype=np.float64).reshape(-1, 3)
+        self.maxs = np.asarray(maxs, dtype=np.float64).reshape(-1, 3)
+        self._slot = {el.id(): i for i, el in enumerate(self.elements)}
+        self._build()
+
+    def __len__(self):
+        return len(self.elements)
+
+    # ── construction ─────────────────────────────────────────────────────
+    def _build(self):
+        n = len(self.elements)
+        self._order = np.arange(n)
+        node_min, node_max, children, leaves = [], [], [], []
+
+        def make(lo, hi):
+            idx = self._order[lo:hi]
+            node_min.append(self.mins[idx].min(axis=0))
+            node_max.append(self.maxs[idx].max(axis=0))
+            children.append(None)
+            leaves.append(None)
+            return len(node_min) - 1
+
+        if n:
+            centroids = (self.mins + self.maxs) / 2
+            stack = [(make(0, n), 0, n)]
+            while stack:
+                node, lo, hi = stack.pop()
+                if hi - lo <= LEAF_SIZE:
+                    leaves[node] = self._order[lo:hi].copy()
+                    continue
+                idx = self._order[lo:hi]
+                c = centroids[idx]
+                axis = int(np.argmax(c.max(axis=0) - c.min(axis=0)))
+                mid = (lo + hi) // 2
+                self._order[lo:hi] = idx[np.argpartition(c[:, axis], mid - lo)]
+                left, right = make(lo, mid), make(mid, hi)
+                children[node] = (left, right)
+                stack += [(left, lo, mid), (right, mid, hi)]
+
+        self._node_min = np.array(node_min).reshape(-1, 3)
+        self._node_max = np.array(node_max).reshape(-1, 3)
+        self._children = children
+        self._leaves = leaves
+
+    def _box_of(self, item):
+        """(min, max) for an element in this index, another element's box, or a (min, max) pair."""
+        if isinstance(item, tuple):
+            return np.asarray(item[0], dtype=np.float64), np.asarray(item[1], dtype=np.float64)
+        i = self._slot.get(item.id())
+        if i is not None:
+            return self.mins[i], self.maxs[i]
+        if self.geometry is None:
+            raise KeyError(f"#{item.id()} is not in this index; pass its (min, max) box instead")
+        verts = self.geometry.vertices(item)
+        if not len(verts):
+            raise ValueError(f"#{item.id()} ({item.is_a()}) has no geometry")
+        return verts.min(axis=0), verts.max(axis=0)
+
+    # ── queries ──────────────────────────────────────────────────────────
+    def query_box(self, qmin, qmax):
+        """Elements whose AABB intersects the box [qmin, qmax]."""
+        qmin, qmax = np.asarray(qmin, dtype=np.float64), np.asarray(qmax, dtype=np.float64)
+        found = []
+        stack = [0] if self.elements else []
+        while stack:
+            node = stack.pop()
+            if (self._node_min[node] > qmax).any() or (self._node_max[node] < qmin).any():
+                continue
+            leaf = self._leaves[node]
+            if leaf is None:
+                stack.extend(self._children[node])
+                continue
+            hit = ((self.mins[leaf] <= qmax) & (self.maxs[leaf] >= qmin)).all(axis=1)
+            found.extend(leaf[hit].tolist())
+        return [self.elements[i] for i in sorted(found)]
+
+    def _near_box(self, bmin, bmax, distance):
+        """Elements whose AABB is within `distance` of the box [bmin, bmax]."""
+        hits = self.query_box(bmin - distance, bmax + distance)
+        if not hits:
+            return hits
+        slots = [self._slot[el.id()] for el in hits]
+        gaps = _gaps(bmin, bmax, self.mins[slots], self.maxs[slots])
+        return [el for el, gap in zip(hits, gaps.tolist()) if gap <= distance]
+
+    def within(self, item, distance):
+        """Elements whose AABB lies within `distance` of `item`'s box (excluding `item`).
+
+        `item` is an element (in this index or, through the geometry cache, any
+        other) or a (min, max) box.
+        """
+        bmin, bmax = self._box_of(item)
+        hits = self._near_box(bmin, bmax, distance)
+        if isinstance(item, tuple):
+            return hits
+        return [el for el in hits if el.id() != item.id()]
+
+    def nearest(self, point, k=1, exclude=()):
+        """The `k` elements whose AABB is closest to `point`: [(distance, element), ...]."""
+        point = np.asarray(point, dtype=np.float64)
+        skip = {el.id() for el in exclude}
+        if not self.elements:
+            return []
+
+        def box_dist(bmin, bmax):
+            d = np.maximum(np.maximum(bmin - point, 0), point - bmax)
+            return np.sqrt((d * d).sum(axis=-1))
+
+        heap = [(float(box_dist(self._node_min[0], self._node_max[0])), 0, 0)]  # (dist, is_item, node/item)
+        result = []
+        while heap and len(result) < k:
+            dist, is_item, ref = heapq.heappop(heap)
+            if is_item:
+                result.append((dist, self.elements[ref]))
+                continue
+            leaf = self._leaves[ref]
+            if leaf is None:
+                for child in self._children[ref]:
+                    heapq.heappush(heap, (float(box_dist(self._node_min[child], self._node_max[child])), 0, child))
+                continue
+            for i, d in zip(leaf.tolist(), box_dist(self.mins[leaf], self.maxs[leaf]).tolist()):
+                if self.elements[i].id() not in skip:
+                    heapq.heappush(heap, (d, 1, i))
+        return result
+
+    def raycast(self, origin, direction, max_distance=np.inf):
+        """Elements whose AABB the ray hits, nearest first: [(distance, element), ...]."""
+        origin = np.asarray(origin, dtype=np.float64)
+        direction = np.asarray(direction, dtype=np.float64)
+        direction = direction / np.linalg.norm(direction)
+        with np.errstate(divide="ignore"):
+            inv = 1.0 / direction
+
+        def slab(bmin, bmax):
+            with np.errstate(invalid="ignore"):
+                t1, t2 = (bmin - origin) * inv, (bmax - origin) * inv
+            t1, t2 = np.nan_to_num(t1, nan=-np.inf), np.nan_to_num(t2, nan=np.inf)
+            near = np.minimum(t1, t2).max(axis=-1)
+            far = np.maximum(t1, t2).min(axis=-1)
+            return near, (far >= np.maximum(near, 0)) & (near <= max_distance)
+
+        hits = []
+        stack = [0] if self.elements else []
+        while stack:
+            node = stack.pop()
+            _, hit = slab(self._node_min[node], self._node_max[node])
+            if not hit:
+                continue
+            leaf = self._leaves[node]
+            if leaf is None:
+                stack.extend(self._children[node])
+                continue
+            near, hit = slab(self.mins[leaf], self.maxs[leaf])
+            hits.extend(zip(np.maximum(near[hit], 0).tolist(), leaf[hit].tolist()))
+        return [(d, self.elements[i]) for d, i in sorted(hits)]
+
+    def pairs_within(self, distance, other=None):
+        """All (a, b) pairs with AABBs within `distance` — a from this index, b from `other` (or self)."""
+        other = self if other is None else other
+        pairs = []
+        for i, el in enumerate(self.elements):
+            for hit in other._near_box(self.mins[i], self.maxs[i], distance):
+                if other is self and hit.id() <= el.id():
+                    continue
+                pairs.append((el, hit))
+        return pairs
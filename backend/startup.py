@@ -0,0 +1,40 @@
+"""Cold-start timing for the service.
+
+The Space scales to zero, so time-to-first-response matters. `main` imports
+this module first; `mark()` records milestones relative to that moment and
+`phase()` times lazy loads (checkers, the chat stack) whenever they happen.
+`report()` is served on /health, together with which heavy dependencies are
+loaded so far.
+"""
+import logging
+import sys
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("ifcore")
+
+HEAVY_MODULES = ("ifcopenshell", "numpy", "pydantic_ai", "httpx")
+
+_t0 = time.perf_counter()
+_marks = {}   # milestone -> ms since the first import of this module
+_phases = {}  # lazy load -> ms it took
+
+
+def mark(name):
+    _marks[name] = round((time.perf_counter() - _t0) * 1000, 1)
+    logger.info(f"[startup] {name} at {_marks[name]:.0f} ms")
+
+
+@contextmanager
+def phase(name):
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases[name] = round((time.perf_counter() - t) * 1000, 1)
+        logger.info(f"[startup] {name} took {_phases[name]:.0f} ms")
+
+
+def report():
+    return {"marks_ms": dict(_marks), "phases_ms": dict(_phases),
+            "loaded": {name: name in sys.modules for name in HEAVY_MODULES}}
@@ -0,0 +1,243 @@
+"""Partial loading of large IFC (STEP) files.
+
+`ifcopenshell.open` parses the whole file into memory, several times its
+size on disk, so a 1 GB infrastructure model does not fit a worker. For
+such files `extract()` builds a smaller file holding just what the checks
+need, which is then opened as usual:
+
+1. One streaming pass over the memory-mapped STEP text records every
+   entity's id, type and byte offset in an on-disk index, itself
+   memory-mapped, so neither holds more than the pages being read.
+2. The entities of the IFC types the checks declare
+   (`check_x.ifc_types = ("IfcDoor",)`, subtypes included) and the spatial
+   structure are collected with everything they reference: placements,
+   representations, and through relationships their property sets, types,
+   materials and containers.
+3. That subgraph is written out with its original entity ids and GlobalIds.
+
+A relationship is kept when it touches a collected object. Its lists of
+related objects are trimmed to collected ones, so a storey's containment
+relationship does not pull in every other element on the storey.
+"""
+import mmap
+import os
+import re
+import time
+
+import numpy as np
+
+# Index columns, one memory-mapped file each: entity id, byte offset, type code
+COLUMNS = (("id", np.uint64), ("offset", np.uint64), ("type", np.uint16))
+SCAN_CHUNK = 1 << 16  # index entries buffered before they are written
+
+# Always loaded: the project and the spatial skeleton elements hang from
+ANCHOR_TYPES = ("IfcProject", "IfcSite", "IfcBuilding", "IfcBuildingStorey")
+
+# An instance starts after the previous one's ';' (or the ';' of "DATA;")
+_INSTANCE = re.compile(rb";\s*#(\d+)\s*=\s*([A-Za-z0-9_]+)\s*\(")
+_REF = re.compile(rb"#(\d+)")
+_STRING = re.compile(rb"'(?:[^']|'')*'")
+_SCHEMA = re.compile(rb"FILE_SCHEMA\s*\(\s*\(\s*'([^']+)'")
+
+
+def _split_args(body):
+    """Top-level arguments of an instance body (the text between its outer parentheses)."""
+    args, depth, start, quoted, n = [], 0, 0, False, 0
+    while n < len(body):
+        c = body[n]
+        n += 1
+        if quoted:
+            if c == 0x27:
+                if body[n:n + 1] == b"'":
+                    n += 1  # '' is an escaped quote inside the string
+                else:
+                    quoted = False
+            continue
+        if c == 0x27:
+            quoted = True
+        elif c == 0x28:
+            depth += 1
+        elif c == 0x29:
+            depth -= 1
+        elif c == 0x2C and depth == 0:
+            args.append(body[start:n - 1])
+            start = n
+    args.append(body[start:])
+    return args
+
+
+class StepIndex:
+    """Entity offset index of one STEP file (see scan())."""
+
+    def __init__(self, mm, columns, type_names, schema, data_start, data_end):
+        self.mm = mm
+        self.ids, self.offsets, self.types = columns
+        self.type_names = type_names  # type code -> upper-case entity name
+        self.schema = schema
+        self.data_start, self.data_end = data_start, data_end
+        ids = self.ids
+        self._order = None if len(ids) < 2 or bool(np.all(ids[1:] > ids[:-1])) else np.argsort(ids)
+        self._sorted_ids = ids if self._order is None else ids[self._order]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def of_types(self, type_names):
+        codes = [code for code, name in enumerate(self.type_names) if name in type_names]
+        return np.nonzero(np.isin(self.types, codes))[0].tolist()
+
+    def positions(self, entity_ids):
+        """Positions of `entity_ids` in the file (-1 where an id is not defined)."""
+        if not entity_ids:
+            return []
+        ids = np.fromiter(entity_ids, dtype=np.uint64, count=len(entity_ids))
+        n = np.minimum(np.searchsorted(self._sorted_ids, ids), len(self._sorted_ids) - 1)
+        found = self._sorted_ids[n] == ids
+        pos = n if self._order is None else self._order[n]
+        return np.where(found, pos, -1).tolist()
+
+    def type_name(self, pos):
+        return self.type_names[self.types[pos]]
+
+    def text(self, pos):
+        """The instance's STEP text, `#id=TYPE(...);`."""
+        start = int(self.offsets[pos])
+        end = int(self.offsets[pos + 1]) if pos + 1 < len(self.offsets) else self.data_end
+        return self.mm[start:end].rstrip()
+
+    def refs(self, pos):
+        """Positions of the instances this one references (-1 for dangling ids)."""
+        body = _STRING.sub(b"''", self.text(pos))
+        return self.positions([int(m) for m in _REF.findall(body, body.index(b"="))])
+
+
+def scan(mm, index_path):
+    """Index every entity instance of the memory-mapped STEP file `mm`.
+
+    The index columns are written to `index_path`.<column> and mapped back.
+    """
+    data_start = mm.find(b"DATA;")
+    data_end = mm.rfind(b"ENDSEC;")
+    if data_start < 0 or data_end < data_start:
+        raise ValueError("not a STEP physical file (no DATA section)")
+    schema = _SCHEMA.search(mm, 0, data_start)
+    codes, buffered = {}, []
+    files = [open(f"{index_path}.{name}", "wb") for name, _ in COLUMNS]
+
+    def flush():
+        for out, (_, dtype), values in zip(files, COLUMNS, zip(*buffered)):
+            out.write(np.array(values, dtype=dtype).tobytes())
+        buffered.clear()
+
+    try:
+        for m in _INSTANCE.finditer(mm, data_start + 4, data_end):
+            code = codes.setdefault(m.group(2).upper().decode(), len(codes))
+            buffered.append((int(m.group(1)), m.start(1) - 1, code))
+            if len(buffered) == SCAN_CHUNK:
+                flush()
+        flush()
+    finally:
+        for out in files:
+            out.close()
+    columns = [np.memmap(f"{index_path}.{name}", dtype=dtype, mode="r")
+               if os.path.getsize(f"{index_path}.{name}") else np.zeros(0, dtype=dtype)
+               for name, dtype in COLUMNS]
+    return StepIndex(mm, columns, list(codes), schema.group(1).decode() if schema else "IFC4",
+                     data_start, data_end)
+
+
+def _subtypes(schema, names):
+    """Upper-case names of `names` and all their subtypes in `schema`."""
+    out, todo = set(), []
+    for name in names:
+        try:
+            todo.append(schema.declaration_by_name(name))
+        except (RuntimeError, IndexError):
+            continue  # not in this schema version
+    while todo:
+        decl = todo.pop()
+        out.add(decl.name().upper())
+        todo.extend(decl.subtypes())
+    return out
+
+
+def extract(path, ifc_types, out_path):
+    """Write the part of `path` that checks on `ifc_types` need to `out_path`.
+
+    Returns stats: entities scanned and kept, output size and timings.
+    """
+    import ifcopenshell.ifcopenshell_wrapper as wrapper
+
+    started = time.perf_counter()
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        index = scan(mm, out_path + ".idx")
+        scanned = time.perf_counter()
+        schema = wrapper.schema_by_name(index.schema)
+        objects = _subtypes(schema, ["IfcObject"])
+        type_objects = _subtypes(schema, ["IfcTypeObject"])
+
+        kept = set()
+        anchors = set(index.of_types(_subtypes(schema, list(ifc_types) + list(ANCHOR_TYPES))))
+
+        def collect(positions):
+            stack = list(positions)
+            while stack:
+                pos = stack.pop()
+                if pos < 0 or pos in kept:
+                    continue
+                kept.add(pos)
+                stack.extend(index.refs(pos))
+
+        collect(anchors)
+
+        # Relationships touching an anchor; types they pull in are anchors for a second round
+        todo = index.of_types(_subtypes(schema, ["IfcRelationship"]))
+        rewritten = {}
+        while todo:
+            pulled, skipped = [], []
+            for pos in todo:
+                refs = index.refs(pos)
+                if not any(r in anchors for r in refs):
+                    skipped.append(pos)
+                    continue
+                text = index.text(pos)
+                head, body = text[:text.index(b"(") + 1], text[text.index(b"(") + 1:text.rindex(b")")]
+                args, singles, emptied = [], [], False
+                for arg in _split_args(body):
+                    stripped = arg.strip()
+                    if stripped.startswith(b"(") and b"#" in stripped:
+                        members = index.positions([int(m) for m in _REF.findall(stripped)])
+                        # Related objects not otherwise collected are dropped from the list
+                        keep = [m for m in members if m >= 0 and (m in kept or m in anchors
+                                                                  or index.type_name(m) not in objects)]
+                        emptied = emptied or not keep
+                        singles += keep
+                        arg = b"(" + b",".join(b"#%d" % index.ids[m] for m in keep) + b")"
+                    elif stripped.startswith(b"#"):
+                        singles += index.positions([int(stripped[1:])])
+                    args.append(arg)
+                if emptied:
+                    continue
+                rewritten[pos] = head + b",".join(args) + b");"
+                kept.add(pos)
+                for ref in singles:
+                    if ref >= 0 and ref not in kept and index.type_name(ref) in type_objects:
+                        pulled.append(ref)
+                collect(r for r in singles if r not in kept)
+            anchors.update(pulled)
+            todo = skipped if pulled else []
+
+        with open(out_path, "wb") as out:
+            out.write(mm[:index.data_start])
+            out.write(b"DATA;\n")
+            for pos in sorted(kept):
+                out.write(rewritten.get(pos) or index.text(pos))
+                out.write(b"\n")
+            out.write(b"ENDSEC;\nEND-ISO-10303-21;\n")
+        total = len(index)
+        del index  # release the memmaps before removing their files
+    for name, _ in COLUMNS:
+        os.remove(f"{out_path}.idx.{name}")
+    return {"entities": total, "kept": len(kept), "bytes_in": os.path.getsize(path),
+            "bytes_out": os.path.getsize(out_path), "types": sorted(ifc_types),
+            "scan_s": round(scanned - started, 3), "extract_s": round(time.perf_counter() - scanned, 3)}
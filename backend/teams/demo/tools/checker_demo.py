@@ -30,3 +30,7 @@ def check_door_count(model, min_doors=2):
             "log": None,
         })
     return results
+
+
+# Lets the platform load only doors (and what they reference) from very large models
+check_door_count.ifc_types = ("IfcDoor",)
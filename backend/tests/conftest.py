@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Before main is imported: the chat agent runs offline, and no checkers are warmed up
+os.environ.setdefault("IFCORE_CHAT_MODEL", "test")
+os.environ.setdefault("IFCORE_WARMUP", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
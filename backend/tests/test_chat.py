@@ -0,0 +1,80 @@
+"""/chat runs its PydanticAI agent offline with TestModel (IFCORE_CHAT_MODEL=test)."""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+ELEMENTS = [
+    {"element_name": "D1", "element_type": "IfcDoor", "check_status": "fail",
+     "actual_value": "700 mm", "required_value": "800 mm"},
+    {"element_name": "D2", "element_type": "IfcDoor", "check_status": "pass",
+     "actual_value": "900 mm", "required_value": "800 mm"},
+]
+
+
+def test_chat_agent_runs_tools_with_test_model():
+    with TestClient(main.app) as client:
+        resp = client.post("/chat", json={"message": "Which doors fail?", "element_results": ELEMENTS})
+    assert resp.status_code == 200
+    answer = resp.json()["response"]
+    # TestModel calls every registered tool once and answers with their results
+    for tool in ("get_compliance_summary", "search_failing_elements", "lookup_regulation"):
+        assert tool in answer
+    assert "**D1**" in answer and "700 mm" in answer
+    assert "**D2**" not in answer
+
+
+# ── Answer cache, coalescing and tool memoization ───────────────────────
+
+@pytest.fixture
+def chat(monkeypatch):
+    """A fresh chat cache, and the number of agent runs (model calls) made."""
+    from chat_cache import ChatCache
+    monkeypatch.setattr(main, "_chat_cache", ChatCache())
+    agent = main._get_chat_agent()
+    calls = []
+    run = agent.run
+
+    async def counted_run(*args, **kwargs):
+        calls.append(args[0])
+        await asyncio.sleep(0.05)  # keep the call in flight long enough to be shared
+        return await run(*args, **kwargs)
+
+    monkeypatch.setattr(agent, "run", counted_run)
+    return calls
+
+
+def _ask(message):
+    return main.chat_endpoint(main.ChatRequest(message=message, element_results=ELEMENTS))
+
+
+def test_repeated_question_served_from_cache(chat):
+    first = asyncio.run(_ask("Which doors fail?"))
+    # Case, spacing and trailing punctuation do not make it a new question
+    second = asyncio.run(_ask("which  doors FAIL"))
+    assert second == first
+    assert len(chat) == 1
+    assert main._chat_cache.stats()["answers"]["hits"] == 1
+
+
+def test_concurrent_identical_questions_share_one_model_call(chat):
+    async def burst():
+        return await asyncio.gather(*[_ask("Which doors fail?") for _ in range(3)])
+
+    answers = asyncio.run(burst())
+    assert len(chat) == 1
+    assert answers[0] == answers[1] == answers[2]
+    assert main._chat_cache.stats()["in_flight"] == 0
+
+
+def test_tool_outputs_memoized_across_questions(chat):
+    asyncio.run(_ask("Which doors fail?"))
+    tools = main._chat_cache.stats()["tools"]
+    assert (tools["hits"], tools["misses"]) == (0, 2)
+    # A different question is a new model call, but the deterministic tools are not rerun
+    asyncio.run(_ask("Summarize the results"))
+    assert len(chat) == 2
+    tools = main._chat_cache.stats()["tools"]
+    assert (tools["hits"], tools["misses"]) == (2, 2)
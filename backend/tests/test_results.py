@@ -0,0 +1,93 @@
+"""results.ResultBuffer: filtered, cursor-paged selects and the row/column round trips."""
+import pytest
+
+from results import ResultBuffer
+
+
+def _buffer():
+    buf = ResultBuffer()
+    buf.append_check("c1", [
+        {"element_name": "D1", "element_type": "IfcDoor", "check_status": "fail"},
+        {"element_name": "D2", "element_type": "IfcDoor", "check_status": "pass"},
+        {"element_name": "W1", "element_type": "IfcWall", "check_status": "fail"},
+    ])
+    buf.append_check("c2", [
+        {"element_name": "D1", "element_type": "IfcDoor", "check_status": "pass"},
+        {"element_name": "W1", "element_type": "IfcWall", "check_status": "warning"},
+    ])
+    buf.append_check("c3", [
+        {"element_name": "D2", "element_type": "IfcDoor", "check_status": "fail"},
+    ])
+    return buf
+
+
+def _names(buf, positions):
+    return [(buf.row(i)["check_result_id"], buf.row(i)["element_name"]) for i in positions]
+
+
+def test_filters_intersect_across_columns_and_union_within_one():
+    buf = _buffer()
+    positions, more = buf.select({"element_type": {"IfcDoor"}, "check_status": {"fail"}})
+    assert _names(buf, positions) == [("c1", "D1"), ("c3", "D2")] and not more
+    positions, _ = buf.select({"element_type": {"IfcDoor"}, "check_status": {"fail", "pass"},
+                               "check_result_id": {"c1", "c3"}})
+    assert _names(buf, positions) == [("c1", "D1"), ("c1", "D2"), ("c3", "D2")]
+
+
+def test_empty_or_unknown_filter_values_select_nothing():
+    buf = _buffer()
+    assert buf.select({"check_result_id": set()}) == ([], False)
+    assert buf.select({"check_status": {"blocked"}}) == ([], False)
+    assert buf.select({"element_type": {"IfcDoor"}, "check_result_id": {"nope"}}) == ([], False)
+    assert buf.select({})[0] == list(range(len(buf)))
+
+
+def test_unindexed_filter_column_rejected():
+    with pytest.raises(ValueError):
+        _buffer().select({"element_name": {"D1"}})
+
+
+@pytest.mark.parametrize("filters", [
+    None,
+    {"check_status": {"fail", "pass", "warning"}},
+    {"check_result_id": {"c1", "c2", "c3"}},
+    {"check_result_id": {"c3", "c1"}, "element_type": {"IfcDoor"}},
+])
+def test_cursor_pages_cover_every_match_once_across_check_spans(filters):
+    buf = _buffer()
+    expected, _ = buf.select(filters, limit=len(buf))
+    pages, after, more = [], -1, True
+    while more:
+        positions, more = buf.select(filters, after=after, limit=2)
+        assert len(positions) <= 2
+        pages += positions
+        after = positions[-1] if positions else after
+    assert pages == expected
+
+
+def test_counts_per_indexed_value():
+    assert _buffer().counts("check_status") == {"fail": 3, "pass": 2, "warning": 1}
+
+
+def test_from_rows_groups_checks_and_keeps_ids():
+    buf = _buffer()
+    rows = buf.rows()
+    # Interleaved as they may come back from D1, each row with its own id
+    shuffled = [dict(row, id=f"row-{n}") for n, row in enumerate(rows)][::-1]
+    restored = ResultBuffer.from_rows(shuffled)
+    assert len(restored) == len(buf)
+    assert {r["id"]: r for r in restored.rows()} == {r["id"]: r for r in shuffled}
+    # Each check's rows are contiguous, so check_result_id filters still page by span
+    positions, _ = restored.select({"check_result_id": {"c1"}})
+    assert sorted(restored.row(i)["id"] for i in positions) == ["row-0", "row-1", "row-2"]
+    # ...and the ids survive the columnar wire format
+    assert ResultBuffer.from_columns(restored.to_columns()).rows() == restored.rows()
+
+
+def test_from_rows_without_ids_derives_them():
+    rows = _buffer().rows()
+    for row in rows:
+        del row["id"]
+    restored = ResultBuffer.from_rows(rows)
+    assert [r["id"] for r in restored.rows()] == ["c1-0", "c1-1", "c1-2", "c2-0", "c2-1", "c3-0"]
+    assert ResultBuffer.from_columns(restored.to_columns()).rows() == restored.rows()
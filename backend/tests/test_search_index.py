@@ -0,0 +1,19 @@
+"""search_index.job_search_index: reuse of the cached index while a job runs."""
+from search_index import job_search_index
+
+
+def test_running_job_reindexed_when_a_check_finishes_without_elements():
+    job = {"job_id": "j-running", "status": "running", "check_results": [{"id": "c1"}],
+           "element_results": []}
+    checks, _, fingerprint = job_search_index("j-running", lambda _: job)
+    job = {**job, "check_results": [{"id": "c1"}, {"id": "c2"}]}
+    checks2, _, fingerprint2 = job_search_index("j-running", lambda _: job)
+    assert len(checks) == 1 and len(checks2) == 2
+    assert fingerprint2 != fingerprint
+
+
+def test_finished_job_served_from_cache():
+    job = {"job_id": "j-done", "status": "done", "check_results": [{"id": "c1"}],
+           "element_results": [{"check_result_id": "c1", "element_name": "D1"}]}
+    first = job_search_index("j-done", lambda _: job)
+    assert job_search_index("j-done", lambda _: None) == first
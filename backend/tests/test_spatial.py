@@ -0,0 +1,115 @@
+"""spatial.SpatialIndex: box, distance, nearest and ray queries against brute force."""
+import numpy as np
+import pytest
+
+from spatial import SpatialIndex
+
+
+class _Element:
+    """Stand-in for an ifcopenshell entity: the index only uses id() and is_a()."""
+
+    def __init__(self, n):
+        self.n = n
+
+    def id(self):
+        return self.n
+
+    def is_a(self):
+        return "IfcWall"
+
+
+class _Geometry:
+    """Stand-in GeometryCache with the vertices of elements not in the index."""
+
+    def __init__(self, vertices):
+        self._vertices = vertices
+
+    def vertices(self, element):
+        return np.asarray(self._vertices.get(element.id(), np.zeros((0, 3))), dtype=np.float64)
+
+
+def _grid(n=5, geometry=None):
+    """n × n unit boxes on the floor, 2 m apart (1 m gaps): box k spans [2i, 2i+1] × [2j, 2j+1] × [0, 1]."""
+    elements, mins = [], []
+    for i in range(n):
+        for j in range(n):
+            elements.append(_Element(len(elements) + 1))
+            mins.append((2.0 * i, 2.0 * j, 0.0))
+    mins = np.array(mins)
+    return SpatialIndex(elements, mins, mins + 1.0, geometry=geometry)
+
+
+def _ids(elements):
+    return sorted(el.id() for el in elements)
+
+
+def test_query_box_matches_brute_force():
+    index = _grid()
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        lo = rng.uniform(-2, 10, 3)
+        hi = lo + rng.uniform(0, 4, 3)
+        expected = [el.id() for el, bmin, bmax in zip(index.elements, index.mins, index.maxs)
+                    if (bmin <= hi).all() and (bmax >= lo).all()]
+        assert _ids(index.query_box(lo, hi)) == expected
+
+
+def test_query_outside_bounds_finds_nothing():
+    index = _grid()
+    assert index.query_box((20, 20, 0), (30, 30, 1)) == []
+    assert index.query_box((0, 0, 5), (9, 9, 6)) == []  # above every box
+    assert index.within(((-10, -10, 0), (-9, -9, 1)), 1.0) == []
+
+
+def test_touching_boxes_intersect_and_gaps_are_inclusive():
+    index = _grid()
+    # A query box sharing just the face x = 1 with box 1 still hits it
+    assert _ids(index.query_box((1, 0, 0), (1.5, 0.5, 1))) == [1]
+    # Neighbours are exactly 1 m apart: in at distance 1, out just below it
+    assert _ids(index.within(index.elements[0], 1.0)) == [2, 6]
+    assert index.within(index.elements[0], 0.999) == []
+    # The diagonal neighbour's gap is sqrt(2), not 1 (Euclidean, not per axis)
+    assert _ids(index.within(index.elements[0], 1.5)) == [2, 6, 7]
+
+
+def test_within_for_elements_not_in_the_index():
+    element = _Element(100)
+    index = _grid(geometry=_Geometry({100: [(1.2, 0.2, 0.0), (1.8, 0.8, 1.0)]}))
+    assert _ids(index.within(element, 0.25)) == [1, 6]
+    # Without a geometry cache the element's box must be passed instead
+    with pytest.raises(KeyError):
+        _grid().within(element, 1.0)
+
+
+def test_element_without_geometry_is_an_error():
+    index = _grid(geometry=_Geometry({}))
+    with pytest.raises(ValueError, match="no geometry"):
+        index.within(_Element(100), 1.0)
+
+
+def test_nearest_and_raycast():
+    index = _grid()
+    (d1, first), (d2, second) = index.nearest((-1.0, 0.5, 0.5), k=2)
+    assert (first.id(), d1) == (1, 1.0)
+    assert second.id() == 2 and d2 == pytest.approx(np.sqrt(1 + 1.5 ** 2))
+    assert index.nearest((0.5, 0.5, 0.5), exclude=[index.elements[0]])[0][1].id() in (2, 6)
+
+    hits = index.raycast((-1.0, 0.5, 0.5), (1, 0, 0))
+    assert [el.id() for _, el in hits] == [1, 6, 11, 16, 21]
+    assert [d for d, _ in hits] == [1.0, 3.0, 5.0, 7.0, 9.0]
+    assert index.raycast((-1.0, 0.5, 0.5), (1, 0, 0), max_distance=2.0)[-1][1].id() == 1
+    assert index.raycast((-1.0, 0.5, 0.5), (-1, 0, 0)) == []
+
+
+def test_pairs_within_and_empty_index():
+    index = _grid(n=3)
+    pairs = index.pairs_within(1.0)
+    assert len(pairs) == 12  # 2 × 3 × (3 - 1) edge neighbours, each pair once
+    assert all(a.id() < b.id() for a, b in pairs)
+
+    empty = SpatialIndex([], np.empty((0, 3)), np.empty((0, 3)))
+    assert len(empty) == 0
+    assert empty.query_box((0, 0, 0), (1, 1, 1)) == []
+    assert empty.nearest((0, 0, 0)) == []
+    assert empty.raycast((0, 0, 0), (1, 0, 0)) == []
+    assert index.pairs_within(1.0, other=empty) == []
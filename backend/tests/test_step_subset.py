@@ -0,0 +1,61 @@
+"""step_subset: STEP argument splitting and subset extraction."""
+import ifcopenshell
+import ifcopenshell.api
+
+from step_subset import _split_args, extract
+
+
+def test_split_args_keeps_escaped_quotes_in_strings():
+    args = _split_args(b"'g',#5,'Building''s storey',$,(#1,#2),#9")
+    assert args == [b"'g'", b"#5", b"'Building''s storey'", b"$", b"(#1,#2)", b"#9"]
+
+
+def test_split_args_nested_lists_and_typed_values():
+    args = _split_args(b"#1,((1.,2.),(3.,4.)),IFCLABEL('a,b'),'(x',.T.")
+    assert args == [b"#1", b"((1.,2.),(3.,4.))", b"IFCLABEL('a,b')", b"'(x'", b".T."]
+
+
+def test_split_args_string_ending_in_escaped_quote():
+    assert _split_args(b"'it''s''',#2") == [b"'it''s'''", b"#2"]
+
+
+def _model(path):
+    model = ifcopenshell.file(schema="IFC4")
+    project = ifcopenshell.api.run("root.create_entity", model, ifc_class="IfcProject", name="P")
+    site = ifcopenshell.api.run("root.create_entity", model, ifc_class="IfcSite")
+    storey = ifcopenshell.api.run("root.create_entity", model, ifc_class="IfcBuildingStorey",
+                                  name="Building's storey")
+    ifcopenshell.api.run("aggregate.assign_object", model, products=[site], relating_object=project)
+    ifcopenshell.api.run("aggregate.assign_object", model, products=[storey], relating_object=site)
+    door = ifcopenshell.api.run("root.create_entity", model, ifc_class="IfcDoor", name="D1")
+    walls = [ifcopenshell.api.run("root.create_entity", model, ifc_class="IfcWall", name=f"W{n}")
+             for n in range(3)]
+    ifcopenshell.api.run("spatial.assign_container", model, products=[door, *walls],
+                         relating_structure=storey)
+    for product in (door, *walls):
+        pset = ifcopenshell.api.run("pset.add_pset", model, product=product, name="Pset_Common")
+        ifcopenshell.api.run("pset.edit_pset", model, pset=pset, properties={"Reference": "R"})
+    # An apostrophe in the relationship's own name must not hide its single references
+    for rel in model.by_type("IfcRelDefinesByProperties"):
+        rel.Name = "Door's properties, common"
+    model.write(str(path))
+    return door.GlobalId
+
+
+def test_extract_keeps_requested_types_with_their_relationships(tmp_path):
+    door_id = _model(tmp_path / "in.ifc")
+    stats = extract(str(tmp_path / "in.ifc"), ["IfcDoor"], str(tmp_path / "out.ifc"))
+    assert 0 < stats["kept"] < stats["entities"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["in.ifc", "out.ifc"]  # index files removed
+
+    subset = ifcopenshell.open(str(tmp_path / "out.ifc"))
+    assert [d.GlobalId for d in subset.by_type("IfcDoor")] == [door_id]
+    assert not subset.by_type("IfcWall")
+    door = subset.by_type("IfcDoor")[0]
+    psets = [rel.RelatingPropertyDefinition for rel in door.IsDefinedBy]
+    assert [p.Name for p in psets] == ["Pset_Common"]
+    assert psets[0].HasProperties[0].NominalValue.wrappedValue == "R"
+    # The storey's containment is trimmed to the door
+    container = door.ContainedInStructure[0]
+    assert container.RelatingStructure.Name == "Building's storey"
+    assert list(container.RelatedElements) == [door]
@@ -0,0 +1,4 @@
+-- Resumable copy of a finished job's element rows from HF: next page cursor ('' = first page)
+ALTER TABLE jobs ADD COLUMN elements_cursor TEXT;
+-- Per-status element counts of a check, JSON
+ALTER TABLE check_results ADD COLUMN status_counts TEXT;
@@ -1,6 +1,6 @@
 import { useMemo } from "react";
 import { useStore } from "../../stores/store";
-import { CATEGORIES, getCategory } from "../../lib/constants";
+import { CATEGORIES, getCategory, isCheckError } from "../../lib/constants";
 import type { CheckResult } from "../../lib/types";
 
 type CategoryStats = { pass: number; fail: number; total: number; hasRunning: boolean };
@@ -14,7 +14,7 @@ function computeCategoryStats(checkResults: CheckResult[]): Map<string, Category
     const s = stats.get(cat.id)!;
     s.total += 1;
     if (cr.status === "pass") s.pass += 1;
-    else if (cr.status === "fail" || cr.status === "error") s.fail += 1;
+    else if (cr.status === "fail" || isCheckError(cr.status)) s.fail += 1;
     else if (cr.status === "running") s.hasRunning = true;
   }
   return stats;
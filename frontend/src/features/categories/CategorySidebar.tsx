@@ -2,13 +2,14 @@ import { useStore } from "../../stores/store";
 import { CategoryCards } from "./CategoryCards";
 import { useCategoryColors } from "./useCategoryColors";
 import { CheckRunner } from "../checks/CheckRunner";
+import { isCheckError } from "../../lib/constants";
 import type { CheckResult } from "../../lib/types";
 
 function computeSummary(checkResults: CheckResult[]) {
   let pass = 0, fail = 0, review = 0, running = 0;
   for (const cr of checkResults) {
     if (cr.status === "pass") pass++;
-    else if (cr.status === "fail" || cr.status === "error") fail++;
+    else if (cr.status === "fail" || isCheckError(cr.status)) fail++;
     else if (cr.status === "unknown") review++;
     else if (cr.status === "running") running++;
   }
@@ -32,12 +32,14 @@ export function ChatPanel({ onCollapse }: ChatPanelProps) {
     setMessages((prev) => [...prev, { role: "user", text: msg }]);
     setInput("");
     setLoading(true);
+    const activeJobId = useStore.getState().activeJobId;
 
     try {
       const res = await fetch(HF_CHAT_URL, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({
+        // With a job, the backend reads the results itself; otherwise send what we have
+        body: JSON.stringify(activeJobId ? { message: msg, job_id: activeJobId } : {
           message: msg,
           check_results: useStore.getState().checkResults,
           element_results: useStore.getState().elementResults.slice(0, 200).map((e) => ({
@@ -1,6 +1,6 @@
 import React, { useState, useMemo } from "react";
 import { StatusBadge } from "../../components/StatusBadge";
-import { statusToHex } from "../../lib/constants";
+import { isCheckError, statusToHex } from "../../lib/constants";
 import { useStore } from "../../stores/store";
 import type { CheckResult, ElementResult } from "../../lib/types";
 
@@ -25,7 +25,7 @@ export function CategoryFolder({
     for (const c of checks) {
       if (c.status === "pass") passed++;
       else if (c.status === "fail") failed++;
-      else if (c.status === "error") errors++;
+      else if (isCheckError(c.status)) errors++;
       else if (c.status === "unknown") unknown++;
     }
     return { passed, failed, errors, unknown };
@@ -123,14 +123,22 @@ function CheckRow({ check, elements }: { check: CheckResult; elements: ElementRe
   const hasElements = elements.length > 0;
 
   const elementSummary = useMemo(() => {
-    if (!hasElements) return check.summary;
-    let pass = 0, fail = 0;
-    for (const e of elements) {
-      if (e.check_status === "pass") pass++;
-      else if (e.check_status === "fail") fail++;
+    // Counts stored with the check row, so the summary does not wait for its element rows
+    let total = 0, pass = 0, fail = 0;
+    if (check.status_counts) {
+      for (const n of Object.values(check.status_counts)) total += n ?? 0;
+      pass = check.status_counts.pass ?? 0;
+      fail = check.status_counts.fail ?? 0;
+    } else {
+      total = elements.length;
+      for (const e of elements) {
+        if (e.check_status === "pass") pass++;
+        else if (e.check_status === "fail") fail++;
+      }
     }
-    return `${elements.length} element${elements.length !== 1 ? "s" : ""} (${pass} pass, ${fail} fail)`;
-  }, [elements, hasElements, check.summary]);
+    if (total === 0) return check.summary;
+    return `${total} element${total !== 1 ? "s" : ""} (${pass} pass, ${fail} fail)`;
+  }, [elements, check.status_counts, check.summary]);
 
   function handleClick() {
     if (!hasElements) return;
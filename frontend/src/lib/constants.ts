@@ -7,6 +7,8 @@ export const STATUS_COLORS = {
   warning: "#ff9800",
   unknown: "#6d4c41",
   error: "#e53935",
+  timeout: "#e53935",
+  oom: "#e53935",
   running: "#1565c0",
   log: "#8a9bb0",
 } as const;
@@ -33,6 +35,11 @@ export function getCategory(team: string): Category | undefined {
   return CATEGORY_MAP.get(team);
 }
 
+/** A check that did not finish: it threw, or hit the sandbox's time or memory limit. */
+export function isCheckError(status: string): boolean {
+  return status === "error" || status === "timeout" || status === "oom";
+}
+
 export function statusToHex(status: string): string {
   return STATUS_COLORS[status as keyof typeof STATUS_COLORS] ?? "#8a9bb0";
 }
@@ -14,7 +14,7 @@ export function startPolling() {
         const updated = await getJob(job.id);
 
         // Skip update if nothing changed
-        if (prev && prev.status === updated.status && prev.progress === updated.progress) continue;
+        if (prev && prev.status === updated.status && prev.progress?.done === updated.progress?.done) continue;
 
         if (updated.status === "done" && prev?.status !== "done") {
           // Batch all updates into a single store set to avoid cascading re-renders
@@ -23,6 +23,13 @@ export function startPolling() {
             ...(updated.check_results ? { checkResults: updated.check_results } : {}),
             ...(updated.element_results ? { elementResults: updated.element_results } : {}),
           }));
+        } else if (updated.check_results?.length) {
+          // Partial results while the job runs — render checks as they complete
+          useStore.setState((s) => ({
+            jobs: { ...s.jobs, [updated.id]: { ...s.jobs[updated.id], ...updated } },
+            checkResults: updated.check_results!,
+            ...(updated.element_results ? { elementResults: updated.element_results } : {}),
+          }));
         } else {
           useStore.getState().updateJob(updated.id, updated);
         }
@@ -10,6 +10,12 @@ export type Project = {
   created_at: number;
 };
 
+export type JobProgress = {
+  done: number;
+  total: number | null;
+  current: string | null;
+};
+
 export type Job = {
   id: string;
   project_id: string;
@@ -18,6 +24,7 @@ export type Job = {
   completed_at: number | null;
   project_name?: string;
   file_url?: string;
+  progress?: JobProgress | null;
   check_results?: CheckResult[];
   element_results?: ElementResult[];
 };
@@ -28,10 +35,11 @@ export type CheckResult = {
   project_id: string;
   check_name: string;
   team: string;
-  status: "running" | "pass" | "fail" | "unknown" | "error";
+  status: "running" | "pass" | "fail" | "unknown" | "error" | "timeout" | "oom";
   summary: string;
   has_elements: 0 | 1;
   created_at: number;
+  status_counts?: Partial<Record<ElementResult["check_status"], number>>;
 };
 
 export type ElementResult = {
@@ -1,7 +1,7 @@
 import { createFileRoute } from "@tanstack/react-router";
 import { useStore } from "../stores/store";
 import { CategoryFolder } from "../features/report/TeamReportPanel";
-import { CATEGORIES } from "../lib/constants";
+import { CATEGORIES, isCheckError } from "../lib/constants";
 import type { CheckResult } from "../lib/types";
 
 export const Route = createFileRoute("/report")({
@@ -46,7 +46,7 @@ function ReportPage() {
   const total   = checkResults.length;
   const passed  = checkResults.filter((c) => c.status === "pass").length;
   const failed  = checkResults.filter((c) => c.status === "fail").length;
-  const errors  = checkResults.filter((c) => c.status === "error").length;
+  const errors  = checkResults.filter((c) => isCheckError(c.status)).length;
   const running = checkResults.filter((c) => c.status === "running").length;
   const other   = total - passed - failed - errors - running;
 
@@ -60,22 +60,48 @@ export async function getUserStats(db: D1Database, userId: string) {
   return { project_count: projects?.cnt ?? 0, check_count: checks?.cnt ?? 0 };
 }
 
-export async function insertCheckResults(db: D1Database, checkResults: any[], elementResults: any[]) {
-  const stmts = [
-    ...checkResults.map(cr =>
-      db.prepare(
-        "INSERT INTO check_results (id, job_id, project_id, check_name, team, status, summary, has_elements, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
-      ).bind(cr.id, cr.job_id, cr.project_id, cr.check_name, cr.team, cr.status, cr.summary, cr.has_elements, cr.created_at)
-    ),
-    ...elementResults.map(er =>
-      db.prepare(
-        "INSERT INTO element_results (id, check_result_id, element_id, element_type, element_name, element_name_long, check_status, actual_value, required_value, comment, log) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
-      ).bind(
-        er.id, er.check_result_id, er.element_id, er.element_type,
-        er.element_name, er.element_name_long, er.check_status,
-        er.actual_value, er.required_value, er.comment, er.log
-      )
-    ),
-  ];
+function checkResultStmts(db: D1Database, checkResults: any[]) {
+  // OR IGNORE: re-running an interrupted copy must not fail on rows it already wrote
+  return checkResults.map(cr =>
+    db.prepare(
+      "INSERT OR IGNORE INTO check_results (id, job_id, project_id, check_name, team, status, summary, has_elements, created_at, status_counts) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    ).bind(cr.id, cr.job_id, cr.project_id, cr.check_name, cr.team, cr.status, cr.summary, cr.has_elements, cr.created_at,
+      cr.status_counts ? JSON.stringify(cr.status_counts) : null)
+  );
+}
+
+function elementResultStmts(db: D1Database, elementResults: any[]) {
+  return elementResults.map(er =>
+    db.prepare(
+      "INSERT OR IGNORE INTO element_results (id, check_result_id, element_id, element_type, element_name, element_name_long, check_status, actual_value, required_value, comment, log) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    ).bind(
+      er.id, er.check_result_id, er.element_id, er.element_type,
+      er.element_name, er.element_name_long, er.check_status,
+      er.actual_value, er.required_value, er.comment, er.log
+    )
+  );
+}
+
+export async function insertCheckResults(db: D1Database, checkResults: any[], elementResults: any[] = []) {
+  const stmts = [...checkResultStmts(db, checkResults), ...elementResultStmts(db, elementResults)];
   if (stmts.length > 0) return db.batch(stmts);
 }
+
+// Start copying a finished job: its check rows and the first-page cursor, in one batch
+export async function startResultCopy(db: D1Database, jobId: string, checkResults: any[]) {
+  return db.batch([
+    ...checkResultStmts(db, checkResults),
+    db.prepare("UPDATE jobs SET elements_cursor = '' WHERE id = ? AND elements_cursor IS NULL").bind(jobId),
+  ]);
+}
+
+// One page of element rows plus the cursor advance (or, after the last page, the job's
+// completion), in one batch. Returns false if another poll already moved the cursor.
+export async function copyElementPage(db: D1Database, jobId: string, cursor: string, rows: any[], next: string | null) {
+  const advance = next
+    ? db.prepare("UPDATE jobs SET elements_cursor = ? WHERE id = ? AND elements_cursor = ?").bind(next, jobId, cursor)
+    : db.prepare("UPDATE jobs SET status = 'done', completed_at = ? WHERE id = ? AND elements_cursor = ?")
+        .bind(Date.now(), jobId, cursor);
+  const results = await db.batch([...elementResultStmts(db, rows), advance]);
+  return (results[results.length - 1].meta.changes ?? 0) > 0;
+}
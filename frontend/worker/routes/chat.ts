@@ -1,17 +1,41 @@
 import { Hono } from "hono";
 import type { Bindings } from "../types";
+import { getJob } from "../lib/db";
 
 const app = new Hono<{ Bindings: Bindings }>();
 
+function forward(env: Bindings, body: unknown) {
+  return fetch(`${env.HF_SPACE_URL}/chat`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(body),
+    signal: AbortSignal.timeout(35000),
+  });
+}
+
+// Fallback when HF no longer has the job (expired or restarted): send the D1 rows inline
+async function inlineResults(env: Bindings, jobId: string) {
+  const checks = await env.DB.prepare("SELECT * FROM check_results WHERE job_id = ? LIMIT 50").bind(jobId).all();
+  const elements = await env.DB.prepare(
+    "SELECT element_id, element_name, element_type, check_status, actual_value, required_value, comment " +
+    "FROM element_results WHERE check_result_id IN (SELECT id FROM check_results WHERE job_id = ?) " +
+    "AND check_status IN ('fail', 'warning', 'blocked') LIMIT 200"
+  ).bind(jobId).all();
+  return { check_results: checks.results ?? [], element_results: elements.results ?? [] };
+}
+
 app.post("/", async (c) => {
-  const body = await c.req.text();
+  const { job_id, ...body } = await c.req.json<any>();
   try {
-    const resp = await fetch(`${c.env.HF_SPACE_URL}/chat`, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body,
-      signal: AbortSignal.timeout(35000),
-    });
+    let resp: Response;
+    if (job_id) {
+      // The browser knows the D1 job id; HF keys its job store by hf_job_id
+      const job: any = await getJob(c.env.DB, job_id);
+      resp = job?.hf_job_id ? await forward(c.env, { ...body, job_id: job.hf_job_id }) : new Response(null, { status: 404 });
+      if (resp.status === 404) resp = await forward(c.env, { ...body, ...(await inlineResults(c.env, job_id)) });
+    } else {
+      resp = await forward(c.env, body);
+    }
     const data = await resp.text();
     return new Response(data, {
       status: resp.status,
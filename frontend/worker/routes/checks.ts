@@ -1,21 +1,39 @@
 import { Hono } from "hono";
 import type { Bindings } from "../types";
-import { insertJob, updateJob, getJob, insertCheckResults } from "../lib/db";
+import { insertJob, updateJob, getJob, startResultCopy, copyElementPage } from "../lib/db";
 
 const app = new Hono<{ Bindings: Bindings }>();
 
-// Read file from R2 and encode as base64 (chunked to avoid OOM on large files)
-async function readR2AsBase64(storage: R2Bucket, key: string): Promise<string> {
-  const obj = await storage.get(key);
-  if (!obj) throw new Error(`R2 object not found: ${key}`);
-  const bytes = await obj.arrayBuffer();
-  const uint8 = new Uint8Array(bytes);
-  const CHUNK = 0x8000; // 32KB chunks — safe for String.fromCharCode.apply
-  const parts: string[] = [];
-  for (let i = 0; i < uint8.length; i += CHUNK) {
-    parts.push(String.fromCharCode.apply(null, uint8.subarray(i, i + CHUNK) as unknown as number[]));
+// Element pages copied per poll: each costs one HF fetch and one D1 batch, and a
+// Worker request has a bounded subrequest budget. Larger jobs resume on the next poll.
+const COPY_PAGES_PER_POLL = 10;
+
+// Seconds HF holds a poll of an unfinished job (long-poll), answering as soon as it
+// finishes, so a dashboard polling every 2s costs HF one request per wait, not per tick.
+const HF_POLL_WAIT_SECONDS = 5;
+
+// Copy a finished HF job's results into D1, resuming from jobs.elements_cursor.
+// Returns true once every page is in and the job is marked done.
+async function copyResults(env: Bindings, job: any, hfData: any) {
+  let cursor: string | null = job.elements_cursor;
+  if (cursor === null) {
+    const checks = (hfData.check_results || []).map((cr: any) => ({ ...cr, job_id: job.id }));
+    await startResultCopy(env.DB, job.id, checks);
+    cursor = "";
   }
-  return btoa(parts.join(""));
+  for (let n = 0; n < COPY_PAGES_PER_POLL; n++) {
+    const params = new URLSearchParams({ limit: "1000", ...(cursor ? { cursor } : {}) });
+    const resp = await fetch(`${env.HF_SPACE_URL}/jobs/${job.hf_job_id}/elements?${params}`,
+      { signal: AbortSignal.timeout(8000) });
+    if (!resp.ok) throw new Error(`HF returned ${resp.status}`);
+    const page: any = await resp.json();
+    const next: string | null = page.next_cursor ?? null;
+    // false: a concurrent poll advanced the cursor first and carries on from there
+    if (!await copyElementPage(env.DB, job.id, cursor, page.element_results || [], next)) return false;
+    if (!next) return true;
+    cursor = next;
+  }
+  return false;
 }
 
 app.post("/run", async (c) => {
@@ -23,24 +41,21 @@ app.post("/run", async (c) => {
   const jobId = crypto.randomUUID();
   await insertJob(c.env.DB, { id: jobId, project_id });
 
-  // Read IFC from R2 and encode as base64 — avoids HF DNS issues with workers.dev
+  // Stream the IFC from R2 straight into the HF upload endpoint — no base64, no full buffer
   const r2Key = file_url.replace("r2://", "");
-  let ifc_b64: string;
-  try {
-    ifc_b64 = await readR2AsBase64(c.env.STORAGE, r2Key);
-  } catch {
+  const obj = await c.env.STORAGE.get(r2Key);
+  if (!obj) {
     await updateJob(c.env.DB, jobId, { status: "error", completed_at: Date.now() });
     return c.json({ job_id: jobId, status: "error", error: "Failed to read file from storage" }, 500);
   }
 
-  // Trigger HF check with base64 payload (no callback URL needed)
   let hfJobId: string;
   try {
-    const resp = await fetch(`${c.env.HF_SPACE_URL}/check`, {
+    const resp = await fetch(`${c.env.HF_SPACE_URL}/check/upload?project_id=${encodeURIComponent(project_id)}`, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ ifc_b64, project_id }),
-      signal: AbortSignal.timeout(15000),
+      headers: { "Content-Type": "application/octet-stream", "Content-Length": String(obj.size) },
+      body: obj.body,
+      signal: AbortSignal.timeout(60000),
     });
     if (!resp.ok) {
       await updateJob(c.env.DB, jobId, { status: "error", completed_at: Date.now() });
@@ -67,25 +82,26 @@ app.get("/jobs/:id", async (c) => {
   if (!job) return c.json({ error: "Job not found" }, 404);
 
   // Lazy-poll HF: if still running, check HF and update D1 in this request
+  let partial: any = null;
   if (job.status === "running" && (job as any).hf_job_id) {
     try {
-      const hfResp = await fetch(`${c.env.HF_SPACE_URL}/jobs/${(job as any).hf_job_id}`,
-        { signal: AbortSignal.timeout(8000) });
+      // Element rows are paged separately; the poll itself only carries check rows and counts
+      const hfResp = await fetch(
+        `${c.env.HF_SPACE_URL}/jobs/${(job as any).hf_job_id}?elements=false&wait=${HF_POLL_WAIT_SECONDS}`,
+        { signal: AbortSignal.timeout((HF_POLL_WAIT_SECONDS + 8) * 1000) });
       if (hfResp.ok) {
         const hfData: any = await hfResp.json();
         if (hfData.status === "done") {
-          // Mark done FIRST to prevent duplicate inserts from concurrent polls
-          await updateJob(c.env.DB, job.id, { status: "done", completed_at: Date.now() });
-          // Check if results already exist (race guard)
-          const existing = await c.env.DB.prepare("SELECT COUNT(*) as cnt FROM check_results WHERE job_id = ?").bind(job.id).first<{ cnt: number }>();
-          if (!existing?.cnt) {
-            const remappedChecks = (hfData.check_results || []).map((cr: any) => ({ ...cr, job_id: job.id }));
-            await insertCheckResults(c.env.DB, remappedChecks, hfData.element_results || []);
-          }
-          (job as any).status = "done";
-        } else if (hfData.status === "error") {
+          // The job only turns done once its last element page is in D1; until then
+          // each poll copies more pages and the dashboard keeps showing HF's results
+          if (await copyResults(c.env, job, hfData)) (job as any).status = "done";
+          else partial = hfData;
+        } else if (hfData.status === "error" || hfData.status === "cancelled") {
           await updateJob(c.env.DB, job.id, { status: "error", completed_at: Date.now() });
           (job as any).status = "error";
+        } else {
+          // Still queued/running — pass HF's partial results through so the dashboard can render them
+          partial = hfData;
         }
       }
     } catch {
@@ -93,13 +109,24 @@ app.get("/jobs/:id", async (c) => {
     }
   }
 
+  if (partial) {
+    return c.json({
+      ...job,
+      progress: partial.progress ?? null,
+      check_results: (partial.check_results || []).map((cr: any) => ({ ...cr, job_id: job.id })),
+    });
+  }
+
   const checks = await c.env.DB.prepare("SELECT * FROM check_results WHERE job_id = ?").bind(job.id).all();
+  const checkResults = (checks.results ?? []).map((cr: any) => ({
+    ...cr, status_counts: cr.status_counts ? JSON.parse(cr.status_counts) : undefined,
+  }));
   // Use subquery instead of IN(...) to avoid D1 bind param limit
   const elements = await c.env.DB.prepare(
     "SELECT * FROM element_results WHERE check_result_id IN (SELECT id FROM check_results WHERE job_id = ?)"
   ).bind(job.id).all();
 
-  return c.json({ ...job, check_results: checks.results ?? [], element_results: elements.results ?? [] });
+  return c.json({ ...job, check_results: checkResults, element_results: elements.results ?? [] });
 });
 
 export default app;